@@ -0,0 +1,28 @@
+"""add partial index for generating messages
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_messages_generating_updated_at', 'messages', ['updated_at'],
+        postgresql_where=sa.text("status = 'generating'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_generating_updated_at', table_name='messages')
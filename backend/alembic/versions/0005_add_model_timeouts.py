@@ -0,0 +1,31 @@
+"""add per-model llm timeouts
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('models', sa.Column('connect_timeout', sa.Float(), nullable=True))
+    op.add_column('models', sa.Column('first_token_timeout', sa.Float(), nullable=True))
+    op.add_column('models', sa.Column('idle_timeout', sa.Float(), nullable=True))
+    op.add_column('models', sa.Column('total_timeout', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('models', 'total_timeout')
+    op.drop_column('models', 'idle_timeout')
+    op.drop_column('models', 'first_token_timeout')
+    op.drop_column('models', 'connect_timeout')
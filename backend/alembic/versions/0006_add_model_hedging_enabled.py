@@ -0,0 +1,28 @@
+"""add hedging flag to models
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'models',
+        sa.Column('hedging_enabled', sa.Boolean(), server_default='false', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('models', 'hedging_enabled')
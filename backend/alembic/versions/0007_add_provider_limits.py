@@ -0,0 +1,29 @@
+"""add provider rate and concurrency limits
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('providers', sa.Column('rpm_limit', sa.Integer(), nullable=True))
+    op.add_column('providers', sa.Column('tpm_limit', sa.Integer(), nullable=True))
+    op.add_column('providers', sa.Column('max_concurrency', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('providers', 'max_concurrency')
+    op.drop_column('providers', 'tpm_limit')
+    op.drop_column('providers', 'rpm_limit')
@@ -0,0 +1,28 @@
+"""add response cache flag to models
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'models',
+        sa.Column('cache_enabled', sa.Boolean(), server_default='false', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('models', 'cache_enabled')
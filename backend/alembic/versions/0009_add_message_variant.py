@@ -0,0 +1,35 @@
+"""add variant to messages for multi-model comparisons
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'messages',
+        sa.Column('variant', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.drop_constraint('uq_messages_conversation_id_order', 'messages', type_='unique')
+    op.create_unique_constraint(
+        'uq_messages_conversation_id_order_variant', 'messages', ['conversation_id', 'order', 'variant'],
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM messages WHERE variant > 0")
+    op.drop_constraint('uq_messages_conversation_id_order_variant', 'messages', type_='unique')
+    op.create_unique_constraint('uq_messages_conversation_id_order', 'messages', ['conversation_id', 'order'])
+    op.drop_column('messages', 'variant')
@@ -0,0 +1,28 @@
+"""add sampling temperature to models
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'models',
+        sa.Column('temperature', sa.Float(), server_default='1', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('models', 'temperature')
@@ -1,10 +1,25 @@
-import sys
 from fastapi import FastAPI
 from loguru import logger
 from config.environment import Environment
 from config.lifecycle import LifeSpan
+from config.log_sink import AsyncLogSink
 from config.redis import redis_manager
 from config.postgres import postgres_manager
+from config.query_inspector import query_inspector, QueryStatsMiddleware
+from config.metrics import HTTPMetricsMiddleware
+from config.loop_monitor import loop_monitor
+from config.tracing import tracer, TracingMiddleware
+from config.profiling import request_profiler, ProfilingMiddleware
+from modules.chat.stream_store import chat_stream_store
+from modules.chat.generation import generation_manager
+from modules.chat.checkpoint import message_checkpointer
+from modules.chat.hedging import request_hedger
+from modules.chat.provider_governor import provider_governor
+from modules.chat.user_limiter import user_rate_limiter
+from modules.chat.admission import admission_scheduler
+from modules.chat.response_cache import llm_response_cache
+from modules.llm.http_client import llm_http_client, local_llm_http_client
+from modules.llm.registry import register_http_adapters
 # 注册业务路由
 from modules.user.router import router as user_router
 from modules.provider_management.router import router as provider_management_router
@@ -12,22 +27,59 @@ from modules.model_management.router import router as model_management_router
 from modules.chat.router import router as chat_router
 from modules.general_chat.router import router as general_chat_router
 from modules.model.router import router as model_router
+from modules.metrics.router import router as metrics_router
+from modules.profiling.router import router as profiling_router
 
 env = Environment()
 # 在 lifespan 初始化前配置日志级别，因为 lifespan 也需要使用 logger
 # 如果在 lifespan 初始化后配置，在不使用lifespan的情况下就无法正确初始化日志系统
+# 格式化与写入在后台线程批量完成，事件循环线程上只做限流判断和入队
 logger.remove()
-logger.add(sys.stderr, level=env.log_level)
+logger.add(AsyncLogSink(env.log_sink_configuration), level=env.log_level, format="{message}")
 
 # 连接参数配置
 redis_manager.setup(env.redis_configuration)
 postgres_manager.setup(env.postgres_configuration)
+query_inspector.setup(env.sql_instrumentation_configuration)
+tracer.setup(env.tracing_configuration)
+request_profiler.setup(env.profiling_configuration)
+loop_monitor.setup(env.loop_monitor_configuration)
+chat_stream_store.setup(env.chat_stream_configuration)
+generation_manager.setup(env.chat_stream_configuration)
+message_checkpointer.setup(env.chat_checkpoint_configuration)
+request_hedger.setup(env.chat_hedging_configuration)
+provider_governor.setup(env.provider_governor_configuration)
+user_rate_limiter.setup(env.chat_user_limit_configuration)
+admission_scheduler.setup(env.chat_admission_configuration)
+llm_response_cache.setup(env.llm_response_cache_configuration)
+llm_http_client.setup(env.llm_http_configuration)
+local_llm_http_client.setup(env.local_llm_http_configuration)
+if env.llm_http_configuration["raw_adapters"]:
+    register_http_adapters()
 
 # FastAPI 生命周期管理注册
 lifespan = LifeSpan()
 lifespan.register(postgres_manager)
 lifespan.register(redis_manager)
+lifespan.register(loop_monitor)
+lifespan.register(tracer)
+lifespan.register(message_checkpointer)
+lifespan.register(request_hedger)
+lifespan.register(provider_governor)
+lifespan.register(user_rate_limiter)
+lifespan.register(admission_scheduler)
+lifespan.register(llm_response_cache)
+lifespan.register(llm_http_client)
+lifespan.register(local_llm_http_client)
+# 按注册的逆序关闭：先取消进行中的生成（需要写库和 Redis），再关闭订阅连接
+lifespan.register(chat_stream_store)
+lifespan.register(generation_manager)
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(HTTPMetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+# 最后注册的中间件位于最外层，根 span 覆盖其余中间件
+app.add_middleware(TracingMiddleware)
 
 app.include_router(user_router)
 app.include_router(provider_management_router)
@@ -35,6 +87,8 @@ app.include_router(model_management_router)
 app.include_router(chat_router)
 app.include_router(general_chat_router)
 app.include_router(model_router)
+app.include_router(metrics_router)
+app.include_router(profiling_router)
 
 if __name__ == "__main__":
     import uvicorn
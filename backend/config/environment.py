@@ -12,6 +12,21 @@ class PostgresConfiguration(TypedDict):
     password: str
     database: str
 
+    # 连接池参数
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    pool_pre_ping: bool
+
+    # 连接池中间件模式（PgBouncer transaction pooling）：
+    # 连接由 PgBouncer 复用，应用侧不再维护连接池，且禁用 asyncpg 预编译语句缓存
+    pooler_mode: bool
+
+    # 只读副本（未配置时读请求也走主库）
+    replica_host: NotRequired[str]
+    replica_port: NotRequired[int]
+
 
 class RedisConfiguration(TypedDict):
     mode: Literal["STANDALONE", "SENTINEL"]
@@ -28,6 +43,148 @@ class RedisConfiguration(TypedDict):
     sentinel_username: NotRequired[str | None]
     sentinel_password: NotRequired[str | None]
 
+    # 客户端缓存（RESP3 tracking），未配置前缀时不启用
+    client_cache_prefixes: NotRequired[list[str]]
+    client_cache_max_size: NotRequired[int]
+
+
+class SQLInstrumentationConfiguration(TypedDict):
+    enabled: bool
+    # OFF: 只统计；LOG: 超出预算 / 疑似 N+1 时记录告警；RAISE: 直接抛错（仅用于开发调试）
+    debug_mode: Literal["OFF", "LOG", "RAISE"]
+    query_budget: int
+    repeat_threshold: int
+    slow_query_ms: float
+    explain_slow: bool
+    explain_analyze: bool
+
+
+class TracingConfiguration(TypedDict):
+    enabled: bool
+    # 根 span 采样率（0~1），携带 traceparent 的请求沿用上游的采样决定
+    sample_ratio: float
+    export_path: str
+    service_name: str
+
+
+class ProfilingConfiguration(TypedDict):
+    enabled: bool
+    output_dir: str
+    # 采样间隔（秒）
+    interval: float
+    # 每个 worker 每分钟最多分析的请求数
+    max_per_minute: int
+
+
+class LoopMonitorConfiguration(TypedDict):
+    enabled: bool
+    # 心跳 / 采样间隔（秒）
+    interval: float
+    # 事件循环停滞超过该值（毫秒）视为阻塞
+    block_threshold_ms: float
+
+
+class LogSinkConfiguration(TypedDict):
+    # TEXT | JSON
+    format: str
+    # 同一调用位置在每个窗口内原样输出的条数
+    rate_limit_burst: int
+    # 限流窗口（秒）
+    rate_limit_window: float
+    # 超出 burst 后的采样率（0~1）
+    sample_rate: float
+    # 日志队列上限，写入跟不上时丢弃新日志
+    queue_size: int
+
+
+class ChatStreamConfiguration(TypedDict):
+    # 生成结束后事件流的保留时间（秒），期间可断线续传
+    ttl: int
+    # 所有订阅者离开超过该时长（秒）后取消生成
+    orphan_grace: float
+    # 每个订阅者最多缓冲的事件数
+    subscriber_buffer: int
+    # 缓冲区写满时的处理方式：COALESCE（合并增量事件）/ DROP（清空后从 Stream 补读）
+    overflow_policy: str
+
+
+class ChatCheckpointConfiguration(TypedDict):
+    # 生成过程中写入部分回复的最小间隔（秒）
+    interval: float
+    # 累积超过该字符数时立即写入
+    max_chars: int
+    # GENERATING 消息超过该时长（秒）未更新视为中断，标记为 ABORTED
+    stale_after: float
+
+
+class ChatHedgingConfiguration(TypedDict):
+    # 对冲阈值取该供应商首 token 耗时的分位数（如 0.9 即 p90）
+    quantile: float
+    # 每个模型 + 供应商保留的最近样本数
+    window: int
+    # 样本不足该数量时使用 default_delay
+    min_samples: int
+    default_delay: float
+    # 阈值的上下限（秒）
+    min_delay: float
+    max_delay: float
+    # 单次生成最多同时发起的请求数（含首个请求）
+    max_attempts: int
+
+
+class ProviderGovernorConfiguration(TypedDict):
+    # 等待供应商调用许可的最长时间（秒），超过后放弃本次请求
+    max_wait: float
+    # 并发已满时重新检查的间隔（秒）
+    retry_interval: float
+
+
+class UserRoleLimits(TypedDict):
+    # 每个窗口内的请求数 / token 数上限，0 表示不限制
+    requests: int
+    tokens: int
+    # 同时进行中的生成数上限，0 表示不限制
+    streams: int
+
+
+class ChatUserLimitConfiguration(TypedDict):
+    # 滑动窗口长度（秒）
+    window: float
+    # 角色 -> 限额
+    roles: dict[str, UserRoleLimits]
+
+
+class ChatAdmissionConfiguration(TypedDict):
+    # 本 worker 同时进行的上游调用数上限，0 表示不排队
+    concurrency: int
+    # 排队请求数上限，超出时直接拒绝
+    max_queue: int
+    # 最长排队时间（秒）
+    max_wait: float
+    # 角色 -> 公平队列权重，权重越大分到的名额越多
+    weights: dict[str, float]
+
+
+class LLMResponseCacheConfiguration(TypedDict):
+    # 缓存条目的有效期（秒）
+    ttl: int
+    # 缓存条目数上限，超出时淘汰最早写入的条目
+    max_entries: int
+    # 单个条目的大小上限（字节），更大的响应不缓存
+    max_entry_bytes: int
+
+
+class LLMHttpPoolConfiguration(TypedDict):
+    # 连接池：最大连接数、保持空闲的连接数、空闲连接的保留时长（秒）
+    max_connections: int
+    max_keepalive: int
+    keepalive_expiry: float
+
+
+class LLMHttpConfiguration(LLMHttpPoolConfiguration):
+    # 为 True 时流式调用改用直连 HTTP 的适配器（见 llm.http_client），非流式调用仍使用 SDK
+    raw_adapters: bool
+
 
 class JWTConfiguration(TypedDict):
     secret: str
@@ -80,14 +237,27 @@ class Environment:
         if not self.isLoaded:
             raise RuntimeError("环境变量未加载")
 
-        return PostgresConfiguration(
+        config = PostgresConfiguration(
             host=os.getenv("POSTGRES_HOST", "localhost"),
             port=int(os.getenv("POSTGRES_PORT", "5432")),
             user=os.getenv("POSTGRES_USER", "alpha_kanban"),
             password=os.getenv("POSTGRES_PASSWORD", "alpha_kanban_dev"),
             database=os.getenv("POSTGRES_DB", "alpha_kanban"),
+            pool_size=int(os.getenv("POSTGRES_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("POSTGRES_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("POSTGRES_POOL_TIMEOUT", "30")),
+            pool_recycle=int(os.getenv("POSTGRES_POOL_RECYCLE", "1800")),
+            pool_pre_ping=os.getenv("POSTGRES_POOL_PRE_PING", "false").lower() == "true",
+            pooler_mode=os.getenv("POSTGRES_POOLER_MODE", "false").lower() == "true",
         )
 
+        replica_host = os.getenv("POSTGRES_REPLICA_HOST")
+        if replica_host:
+            config["replica_host"] = replica_host
+            config["replica_port"] = int(os.getenv("POSTGRES_REPLICA_PORT", str(config["port"])))
+
+        return config
+
     @property
     def redis_configuration(self) -> RedisConfiguration:
         if not self.isLoaded:
@@ -118,8 +288,221 @@ class Environment:
             config["sentinel_username"] = os.getenv("REDIS_SENTINEL_USERNAME")
             config["sentinel_password"] = os.getenv("REDIS_SENTINEL_PASSWORD")
 
+        prefixes_str = os.getenv("REDIS_CLIENT_CACHE_PREFIXES", "")
+        prefixes = [p.strip() for p in prefixes_str.split(",") if p.strip()]
+        if prefixes:
+            config["client_cache_prefixes"] = prefixes
+            config["client_cache_max_size"] = int(os.getenv("REDIS_CLIENT_CACHE_MAX_SIZE", "10000"))
+
         return config
 
+    @property
+    def sql_instrumentation_configuration(self) -> SQLInstrumentationConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        debug_mode = os.getenv("SQL_DEBUG_MODE", "OFF").upper()
+        if debug_mode not in ("OFF", "LOG", "RAISE"):
+            raise ValueError(f"不支持的 SQL_DEBUG_MODE: {debug_mode}")
+
+        return SQLInstrumentationConfiguration(
+            enabled=os.getenv("SQL_INSTRUMENTATION_ENABLED", "true").lower() == "true",
+            debug_mode=debug_mode,
+            query_budget=int(os.getenv("SQL_QUERY_BUDGET", "20")),
+            repeat_threshold=int(os.getenv("SQL_REPEAT_THRESHOLD", "3")),
+            slow_query_ms=float(os.getenv("SQL_SLOW_QUERY_MS", "200")),
+            explain_slow=os.getenv("SQL_EXPLAIN_SLOW", "false").lower() == "true",
+            explain_analyze=os.getenv("SQL_EXPLAIN_ANALYZE", "false").lower() == "true",
+        )
+
+    @property
+    def tracing_configuration(self) -> TracingConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        sample_ratio = float(os.getenv("TRACING_SAMPLE_RATIO", "0.1"))
+        if not 0 <= sample_ratio <= 1:
+            raise ValueError(f"TRACING_SAMPLE_RATIO 必须在 0~1 之间: {sample_ratio}")
+
+        return TracingConfiguration(
+            enabled=os.getenv("TRACING_ENABLED", "false").lower() == "true",
+            sample_ratio=sample_ratio,
+            export_path=os.getenv("TRACING_EXPORT_PATH", "traces.jsonl"),
+            service_name=os.getenv("TRACING_SERVICE_NAME", "alpha-kanban-backend"),
+        )
+
+    @property
+    def profiling_configuration(self) -> ProfilingConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        return ProfilingConfiguration(
+            enabled=os.getenv("PROFILING_ENABLED", "false").lower() == "true",
+            output_dir=os.getenv("PROFILING_OUTPUT_DIR", "profiles"),
+            interval=float(os.getenv("PROFILING_INTERVAL", "0.001")),
+            max_per_minute=int(os.getenv("PROFILING_MAX_PER_MINUTE", "5")),
+        )
+
+    @property
+    def loop_monitor_configuration(self) -> LoopMonitorConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        return LoopMonitorConfiguration(
+            enabled=os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true",
+            interval=float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1")),
+            block_threshold_ms=float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100")),
+        )
+
+    @property
+    def log_sink_configuration(self) -> LogSinkConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        log_format = os.getenv("LOG_FORMAT", "TEXT").upper()
+        if log_format not in ("TEXT", "JSON"):
+            raise ValueError(f"不支持的 LOG_FORMAT: {log_format}")
+
+        sample_rate = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+        if not 0 <= sample_rate <= 1:
+            raise ValueError(f"LOG_SAMPLE_RATE 必须在 0~1 之间: {sample_rate}")
+
+        return LogSinkConfiguration(
+            format=log_format,
+            rate_limit_burst=int(os.getenv("LOG_RATE_LIMIT_BURST", "20")),
+            rate_limit_window=float(os.getenv("LOG_RATE_LIMIT_WINDOW", "10")),
+            sample_rate=sample_rate,
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        )
+
+    @property
+    def chat_stream_configuration(self) -> ChatStreamConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        overflow_policy = os.getenv("CHAT_SUBSCRIBER_OVERFLOW_POLICY", "COALESCE").upper()
+        if overflow_policy not in ("COALESCE", "DROP"):
+            raise ValueError(f"不支持的 CHAT_SUBSCRIBER_OVERFLOW_POLICY: {overflow_policy}")
+
+        return ChatStreamConfiguration(
+            ttl=int(os.getenv("CHAT_STREAM_TTL", "600")),
+            orphan_grace=float(os.getenv("CHAT_GENERATION_ORPHAN_GRACE", "5")),
+            subscriber_buffer=int(os.getenv("CHAT_SUBSCRIBER_BUFFER_EVENTS", "256")),
+            overflow_policy=overflow_policy,
+        )
+
+    @property
+    def chat_checkpoint_configuration(self) -> ChatCheckpointConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        return ChatCheckpointConfiguration(
+            interval=float(os.getenv("CHAT_CHECKPOINT_INTERVAL", "5")),
+            max_chars=int(os.getenv("CHAT_CHECKPOINT_MAX_CHARS", "8192")),
+            stale_after=float(os.getenv("CHAT_ORPHAN_STALE_AFTER", "300")),
+        )
+
+    @property
+    def chat_hedging_configuration(self) -> ChatHedgingConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        quantile = float(os.getenv("CHAT_HEDGE_QUANTILE", "0.9"))
+        if not 0 < quantile < 1:
+            raise ValueError(f"CHAT_HEDGE_QUANTILE 必须在 0~1 之间: {quantile}")
+
+        return ChatHedgingConfiguration(
+            quantile=quantile,
+            window=int(os.getenv("CHAT_HEDGE_WINDOW", "200")),
+            min_samples=int(os.getenv("CHAT_HEDGE_MIN_SAMPLES", "20")),
+            default_delay=float(os.getenv("CHAT_HEDGE_DEFAULT_DELAY", "3")),
+            min_delay=float(os.getenv("CHAT_HEDGE_MIN_DELAY", "0.5")),
+            max_delay=float(os.getenv("CHAT_HEDGE_MAX_DELAY", "10")),
+            max_attempts=int(os.getenv("CHAT_HEDGE_MAX_ATTEMPTS", "2")),
+        )
+
+    @property
+    def provider_governor_configuration(self) -> ProviderGovernorConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        return ProviderGovernorConfiguration(
+            max_wait=float(os.getenv("PROVIDER_LIMIT_MAX_WAIT", "5")),
+            retry_interval=float(os.getenv("PROVIDER_LIMIT_RETRY_INTERVAL", "0.2")),
+        )
+
+    @property
+    def chat_user_limit_configuration(self) -> ChatUserLimitConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        defaults = {
+            "user": ("20", "200000", "3"),
+            "admin": ("60", "1000000", "10"),
+        }
+        roles = {
+            role: UserRoleLimits(
+                requests=int(os.getenv(f"CHAT_LIMIT_{role.upper()}_REQUESTS", requests)),
+                tokens=int(os.getenv(f"CHAT_LIMIT_{role.upper()}_TOKENS", tokens)),
+                streams=int(os.getenv(f"CHAT_LIMIT_{role.upper()}_STREAMS", streams)),
+            )
+            for role, (requests, tokens, streams) in defaults.items()
+        }
+        return ChatUserLimitConfiguration(
+            window=float(os.getenv("CHAT_LIMIT_WINDOW", "60")),
+            roles=roles,
+        )
+
+    @property
+    def chat_admission_configuration(self) -> ChatAdmissionConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        return ChatAdmissionConfiguration(
+            concurrency=int(os.getenv("CHAT_ADMISSION_CONCURRENCY", "64")),
+            max_queue=int(os.getenv("CHAT_ADMISSION_MAX_QUEUE", "256")),
+            max_wait=float(os.getenv("CHAT_ADMISSION_MAX_WAIT", "30")),
+            weights={
+                "user": float(os.getenv("CHAT_ADMISSION_USER_WEIGHT", "1")),
+                "admin": float(os.getenv("CHAT_ADMISSION_ADMIN_WEIGHT", "4")),
+            },
+        )
+
+    @property
+    def llm_response_cache_configuration(self) -> LLMResponseCacheConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        return LLMResponseCacheConfiguration(
+            ttl=int(os.getenv("LLM_CACHE_TTL", "86400")),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000")),
+            max_entry_bytes=int(os.getenv("LLM_CACHE_MAX_ENTRY_BYTES", "262144")),
+        )
+
+    @property
+    def llm_http_configuration(self) -> LLMHttpConfiguration:
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        return LLMHttpConfiguration(
+            raw_adapters=os.getenv("LLM_RAW_HTTP_ADAPTERS", "false").lower() == "true",
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "200")),
+            max_keepalive=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "50")),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30")),
+        )
+
+    @property
+    def local_llm_http_configuration(self) -> LLMHttpPoolConfiguration:
+        """自建推理服务（OpenAI 兼容接口）的连接池：局域网内建连便宜但首包敏感，连接尽量全部保持复用"""
+        if not self.isLoaded:
+            raise RuntimeError("环境变量未加载")
+
+        return LLMHttpPoolConfiguration(
+            max_connections=int(os.getenv("LOCAL_LLM_HTTP_MAX_CONNECTIONS", "512")),
+            max_keepalive=int(os.getenv("LOCAL_LLM_HTTP_MAX_KEEPALIVE", "512")),
+            keepalive_expiry=float(os.getenv("LOCAL_LLM_HTTP_KEEPALIVE_EXPIRY", "300")),
+        )
+
     @property
     def jwt_configuration(self) -> JWTConfiguration:
         if not self.isLoaded:
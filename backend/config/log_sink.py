@@ -0,0 +1,190 @@
+"""
+异步批量日志 sink（loguru）
+
+loguru 默认的 stderr sink 在调用线程上同步写入，也就是在事件循环线程上做 IO 和格式化。
+本 sink 在调用线程只做两件事：按调用位置限流 / 采样，以及把 record 放入有界队列；
+格式化（文本或 JSON）和写入都由后台线程批量完成。
+
+限流规则：同一调用位置（模块:函数:行号）在每个时间窗口内最多原样输出 burst 条，
+超出部分按 sample_rate 采样输出，其余丢弃，写入线程每个窗口输出一条丢弃数汇总。
+供应商故障时的错误日志风暴因此不会拖慢正常的流。
+
+使用方式（app.py）：
+    sink = AsyncLogSink(env.log_sink_configuration)
+    logger.add(sink, level=env.log_level, format="{message}")
+"""
+
+import atexit
+import json
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+
+from config.environment import LogSinkConfiguration
+
+_BATCH_SIZE = 256
+_FLUSH_INTERVAL = 0.2
+
+
+class _RateLimitState:
+    __slots__ = ("window_start", "count", "suppressed")
+
+    def __init__(self, window_start: float):
+        self.window_start = window_start
+        self.count = 0
+        self.suppressed = 0
+
+
+class AsyncLogSink:
+    """loguru 文件型 sink：write() 入队，后台线程批量写 stderr"""
+
+    def __init__(self, config: LogSinkConfiguration, stream=None):
+        self._config = config
+        self._stream = stream or sys.stderr
+        self._queue: queue.Queue = queue.Queue(maxsize=config["queue_size"])
+        self._rate_limits: dict[tuple, _RateLimitState] = {}
+        self._dropped = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        # 进程退出前把队列中剩余的日志写完
+        atexit.register(self.stop)
+
+    # ── loguru sink 接口 ──
+
+    def write(self, message) -> None:
+        record = message.record
+        if self._allow(record):
+            self._put(record)
+
+    def stop(self) -> None:
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join(timeout=2)
+
+    # ── 调用线程 ──
+
+    def _allow(self, record) -> bool:
+        key = (record["name"], record["function"], record["line"])
+        now = time.monotonic()
+        state = self._rate_limits.get(key)
+        if state is None:
+            state = self._rate_limits[key] = _RateLimitState(now)
+        elif now - state.window_start >= self._config["rate_limit_window"]:
+            # suppressed 不在这里清零，由写入线程汇总输出后清零
+            state.window_start = now
+            state.count = 0
+
+        state.count += 1
+        if state.count <= self._config["rate_limit_burst"] or random.random() < self._config["sample_rate"]:
+            return True
+        state.suppressed += 1
+        return False
+
+    def _put(self, item) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._dropped += 1
+
+    # ── 写入线程 ──
+
+    def _run(self) -> None:
+        last_sweep = time.monotonic()
+        while True:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=_FLUSH_INTERVAL))
+                while len(batch) < _BATCH_SIZE:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if self._dropped:
+                dropped, self._dropped = self._dropped, 0
+                batch.append(_internal_record("WARNING", f"日志队列已满，丢弃 {dropped} 条日志"))
+            now = time.monotonic()
+            if now - last_sweep >= self._config["rate_limit_window"]:
+                last_sweep = now
+                batch.extend(self._collect_suppressed())
+
+            if batch:
+                self._write_batch(batch)
+            elif self._stopped.is_set():
+                return
+
+    def _collect_suppressed(self) -> list[dict]:
+        """每个窗口汇总一次被限流丢弃的日志数（list() 复制在 CPython 下不会与调用线程的插入冲突）"""
+        summaries = []
+        window = self._config["rate_limit_window"]
+        for (name, function, line), state in list(self._rate_limits.items()):
+            if state.suppressed:
+                suppressed, state.suppressed = state.suppressed, 0
+                summaries.append(_internal_record(
+                    "WARNING", f"{name}:{function}:{line} 在过去 {window:g}s 内有 {suppressed} 条日志被限流丢弃",
+                ))
+        return summaries
+
+    def _write_batch(self, batch: list) -> None:
+        formatter = _format_json if self._config["format"] == "JSON" else _format_text
+        lines = []
+        for record in batch:
+            try:
+                lines.append(formatter(record))
+            except Exception as e:
+                lines.append(f"日志格式化失败: {e!r}")
+        try:
+            self._stream.write("\n".join(lines) + "\n")
+            self._stream.flush()
+        except Exception:
+            pass
+
+
+def _internal_record(level: str, message: str) -> dict:
+    """sink 自身产生的日志，字段与 loguru record 中用到的部分保持一致"""
+    return {"internal": True, "time": time.time(), "level": level, "message": message}
+
+
+def _exception_text(record) -> str | None:
+    exception = record.get("exception")
+    if not exception:
+        return None
+    return "".join(traceback.format_exception(exception.type, exception.value, exception.traceback))
+
+
+def _format_text(record) -> str:
+    if record.get("internal"):
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["time"]))
+        return f"{timestamp} | {record['level']:<8} | log_sink - {record['message']}"
+
+    line = (
+        f"{record['time']:%Y-%m-%d %H:%M:%S.%f}"[:-3]
+        + f" | {record['level'].name:<8} | {record['name']}:{record['function']}:{record['line']} - {record['message']}"
+    )
+    exception = _exception_text(record)
+    return f"{line}\n{exception.rstrip()}" if exception else line
+
+
+def _format_json(record) -> str:
+    if record.get("internal"):
+        data = {"time": record["time"], "level": record["level"], "logger": "log_sink", "message": record["message"]}
+        return json.dumps(data, ensure_ascii=False)
+
+    data = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    if record["extra"]:
+        data["extra"] = record["extra"]
+    exception = _exception_text(record)
+    if exception:
+        data["exception"] = exception
+    return json.dumps(data, ensure_ascii=False, default=str)
@@ -0,0 +1,132 @@
+"""
+Module-level Singleton: loop_monitor
+
+事件循环阻塞检测：每个 worker 只有一个事件循环，任何同步热点（bcrypt、大对象 json.dumps、
+Pydantic 校验长历史、同步日志写入等）都会让所有并发的流同时卡住。
+
+    - 事件循环侧：按固定间隔 sleep 并刷新心跳，实际醒来时间超出预期的部分即调度延迟（loop lag），
+      写入 event_loop_lag_seconds 指标；超过阈值的延迟计入 event_loop_block_seconds 直方图
+    - 看门狗线程：定期检查心跳，心跳停滞超过阈值时说明事件循环正被同步代码占用，
+      此时直接抓取事件循环线程的调用栈（即"正在阻塞的代码"），输出告警日志并按阻塞位置计数
+
+看门狗线程大部分时间在 Event.wait 中休眠，常驻生产环境的开销可以忽略。
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+from loguru import logger
+
+from config.environment import LoopMonitorConfiguration
+from config.lifecycle import Manageable
+from config.metrics import (
+    EVENT_LOOP_LAG_SECONDS,
+    EVENT_LOOP_LAG_MAX_SECONDS,
+    EVENT_LOOP_BLOCK_SECONDS,
+    EVENT_LOOP_BLOCKS_TOTAL,
+)
+
+# 用于从调用栈中找出"业务代码"里的阻塞位置
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LoopLagMonitor(Manageable):
+    """事件循环延迟采样器 + 阻塞看门狗"""
+
+    def __init__(self):
+        self._config: LoopMonitorConfiguration | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._loop_thread_id: int | None = None
+        self._heartbeat = 0.0
+        self._lag = EVENT_LOOP_LAG_SECONDS.labels()
+        self._max_lag = EVENT_LOOP_LAG_MAX_SECONDS.labels()
+        self._block_seconds = EVENT_LOOP_BLOCK_SECONDS.labels()
+
+    def setup(self, config: LoopMonitorConfiguration) -> None:
+        self._config = config
+
+    async def start(self) -> None:
+        if self._config is None:
+            raise RuntimeError("LoopLagMonitor 未配置，请先调用 setup()")
+        if not self._config["enabled"]:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            "事件循环阻塞检测已启动 (采样间隔={}s, 阻塞阈值={}ms)",
+            self._config["interval"], self._config["block_threshold_ms"],
+        )
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+        self._watchdog = None
+
+    async def _run(self) -> None:
+        interval = self._config["interval"]
+        threshold = self._config["block_threshold_ms"] / 1000
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            self._heartbeat = time.monotonic()
+            lag = max(time.perf_counter() - expected, 0.0)
+            self._lag.set(lag)
+            if lag > self._max_lag.value:
+                self._max_lag.set(lag)
+            if lag >= threshold:
+                self._block_seconds.observe(lag)
+
+    def _watch(self) -> None:
+        """看门狗线程：同一次阻塞只报告一次"""
+        interval = self._config["interval"]
+        threshold = self._config["block_threshold_ms"] / 1000
+        reported_heartbeat = None
+        while not self._stop.wait(interval):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - interval
+            if stalled < threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            location = _blocking_location(frame)
+            EVENT_LOOP_BLOCKS_TOTAL.labels(location).inc()
+            logger.warning(
+                "事件循环已阻塞超过 {:.0f}ms，阻塞位置 {}，调用栈:\n{}",
+                stalled * 1000, location, "".join(traceback.format_stack(frame)),
+            )
+
+
+def _blocking_location(frame) -> str:
+    """取调用栈中最内层的项目代码位置（file:function），找不到时取最内层帧"""
+    innermost = frame
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_ROOT) and "site-packages" not in filename:
+            return f"{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return f"{os.path.basename(innermost.f_code.co_filename)}:{innermost.f_code.co_name}"
+
+
+loop_monitor = LoopLagMonitor()
@@ -0,0 +1,383 @@
+"""
+Module-level Singleton: metrics
+
+进程内指标注册表，按 Prometheus 文本格式（0.0.4）输出，由 /metrics 路由暴露。
+
+设计约束：指标更新位于流式输出的热循环中，必须足够廉价。
+    - 整个应用运行在单个事件循环线程上，子指标直接做属性加法，不加锁
+    - 调用方在循环外先通过 labels(...) 取得绑定好标签的子指标，循环内只调用 inc / observe
+    - 连接池等"状态型"指标不在业务路径上更新，而是注册 collector 在抓取时读取
+
+多 worker 部署时每个进程各自暴露一份指标，由 Prometheus 按实例聚合。
+
+使用方式：
+    ttft = LLM_TTFT_SECONDS.labels(model, provider)   # 循环外绑定
+    ttft.observe(elapsed)                             # 热路径
+"""
+
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 时延类直方图默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class HistogramChild:
+    __slots__ = ("_upper_bounds", "counts", "sum", "count")
+
+    def __init__(self, upper_bounds: tuple[float, ...]):
+        self._upper_bounds = upper_bounds
+        # 最后一个桶对应 +Inf
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self._upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """带标签的指标族，labels(...) 返回（并缓存）对应的子指标"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        if len(values) != len(self.label_names):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.label_names}，实际传入 {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _label_str(self, values: tuple[str, ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+        pairs = [*zip(self.label_names, values), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        for values, child in list(self._children.items()):
+            yield from self._render_child(values, child)
+
+    def _render_child(self, values, child) -> Iterable[str]:
+        yield f"{self.name}{self._label_str(values)} {_format(child.value)}"
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def _render_child(self, values, child: HistogramChild) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else _format(bound)
+            yield f"{self.name}_bucket{self._label_str(values, (('le', le),))} {cumulative}"
+        yield f"{self.name}_sum{self._label_str(values)} {_format(child.sum)}"
+        yield f"{self.name}_count{self._label_str(values)} {child.count}"
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标重复注册: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        """注册抓取时执行的回调，用于把外部状态（连接池等）同步到 Gauge"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+metrics = MetricsRegistry()
+
+
+# ── 指标定义 ──
+
+HTTP_REQUEST_DURATION_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时（流式响应包含整个流）", ("method", "route", "status"),
+)
+
+LLM_TTFT_SECONDS = metrics.histogram(
+    "llm_time_to_first_token_seconds", "从发起上游请求到收到首个数据块的耗时", ("model", "provider"),
+)
+LLM_GENERATION_SECONDS = metrics.histogram(
+    "llm_generation_seconds", "单次流式生成总耗时", ("model", "provider", "outcome"),
+)
+LLM_STREAM_CHUNKS_TOTAL = metrics.counter(
+    "llm_stream_chunks_total", "流式输出的数据块数", ("model", "provider", "type"),
+)
+LLM_TOKENS_TOTAL = metrics.counter(
+    "llm_tokens_total", "上游返回的 token 用量", ("model", "provider", "direction"),
+)
+LLM_ACTIVE_STREAMS = metrics.gauge(
+    "llm_active_streams", "进行中的流式生成数", ("model", "provider"),
+)
+LLM_PROVIDER_WAIT_SECONDS = metrics.histogram(
+    "llm_provider_limit_wait_seconds", "获得供应商调用许可前的排队耗时", ("provider",),
+)
+LLM_PROVIDER_REJECTIONS_TOTAL = metrics.counter(
+    "llm_provider_limit_rejections_total", "排队超时被拒绝的调用数（按限制类型）", ("provider", "reason"),
+)
+LLM_PROVIDER_INFLIGHT = metrics.gauge(
+    "llm_provider_inflight_requests", "所有 worker 上进行中的上游调用数（最近一次获取 / 释放许可时）", ("provider",),
+)
+LLM_PROVIDER_BUDGET = metrics.gauge(
+    "llm_provider_limit_budget", "令牌桶中剩余的请求数 / token 数（最近一次检查时）", ("provider", "kind"),
+)
+CHAT_USER_LIMIT_REJECTIONS_TOTAL = metrics.counter(
+    "chat_user_limit_rejections_total", "被用户级限流拒绝的聊天请求数（按限制类型）", ("role", "reason"),
+)
+CHAT_ADMISSION_QUEUE_DEPTH = metrics.gauge(
+    "chat_admission_queue_depth", "本 worker 等待上游调用名额的请求数", ("priority",),
+)
+CHAT_ADMISSION_WAIT_SECONDS = metrics.histogram(
+    "chat_admission_wait_seconds", "获得上游调用名额前的排队耗时", ("priority",),
+)
+CHAT_ADMISSION_REJECTIONS_TOTAL = metrics.counter(
+    "chat_admission_rejections_total", "排队被拒绝的请求数（queue_full / timeout）", ("priority", "reason"),
+)
+LLM_CACHE_REQUESTS_TOTAL = metrics.counter(
+    "llm_response_cache_requests_total", "可缓存的模型调用按是否命中计数（hit / miss）", ("model", "kind", "result"),
+)
+LLM_HEDGED_REQUESTS_TOTAL = metrics.counter(
+    "llm_hedged_requests_total", "开启对冲的生成按结果计数（not_hedged / primary_won / hedge_won）", ("model", "outcome"),
+)
+
+DB_POOL_CHECKED_OUT = metrics.gauge(
+    "db_pool_checked_out_connections", "SQLAlchemy 连接池已借出的连接数", ("pool",),
+)
+DB_POOL_OVERFLOW = metrics.gauge(
+    "db_pool_overflow_connections", "SQLAlchemy 连接池溢出连接数（超出 pool_size 的部分）", ("pool",),
+)
+DB_POOL_CHECKOUT_SECONDS_TOTAL = metrics.counter(
+    "db_pool_checkout_wait_seconds_total", "SQLAlchemy 连接池取连接累计等待时间", ("pool",),
+)
+DB_POOL_CHECKOUTS_TOTAL = metrics.counter(
+    "db_pool_checkouts_total", "SQLAlchemy 连接池累计取连接次数", ("pool",),
+)
+
+REDIS_POOL_IN_USE = metrics.gauge(
+    "redis_pool_in_use_connections", "Redis 连接池使用中的连接数", ("pool",),
+)
+REDIS_POOL_AVAILABLE = metrics.gauge(
+    "redis_pool_available_connections", "Redis 连接池空闲连接数", ("pool",),
+)
+REDIS_CLIENT_CACHE = metrics.gauge(
+    "redis_client_cache", "Redis 客户端缓存统计", ("stat",),
+)
+
+EVENT_LOOP_LAG_SECONDS = metrics.gauge(
+    "event_loop_lag_seconds", "最近一次采样的事件循环调度延迟",
+)
+EVENT_LOOP_LAG_MAX_SECONDS = metrics.gauge(
+    "event_loop_lag_max_seconds", "启动以来事件循环调度延迟的最大值",
+)
+EVENT_LOOP_BLOCK_SECONDS = metrics.histogram(
+    "event_loop_block_seconds", "超过阻塞阈值的事件循环调度延迟",
+)
+EVENT_LOOP_BLOCKS_TOTAL = metrics.counter(
+    "event_loop_blocks_total", "看门狗检测到的事件循环阻塞次数（按阻塞位置）", ("location",),
+)
+
+CHAT_SUBSCRIBER_OVERFLOWS_TOTAL = metrics.counter(
+    "chat_subscriber_buffer_overflows_total", "慢客户端订阅缓冲区写满的次数（按处理方式）", ("action",),
+)
+
+
+class LLMStreamMetrics:
+    """单次流式生成的指标，构造时绑定好标签，热循环内只做属性加法"""
+
+    __slots__ = (
+        "_model", "_provider", "_ttft", "_chunks", "_input_tokens", "_output_tokens",
+        "_active", "_start", "_first_token_seen",
+    )
+
+    def __init__(self, model: str, provider: str):
+        self._model = model
+        self._bind(provider)
+        self._start = 0.0
+        self._first_token_seen = False
+
+    def _bind(self, provider: str) -> None:
+        model = self._model
+        self._provider = provider
+        self._ttft = LLM_TTFT_SECONDS.labels(model, provider)
+        self._chunks = {
+            chunk_type: LLM_STREAM_CHUNKS_TOTAL.labels(model, provider, chunk_type)
+            for chunk_type in ("text", "thinking")
+        }
+        self._input_tokens = LLM_TOKENS_TOTAL.labels(model, provider, "input")
+        self._output_tokens = LLM_TOKENS_TOTAL.labels(model, provider, "output")
+        self._active = LLM_ACTIVE_STREAMS.labels(model, provider)
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+        self._active.inc()
+
+    def rebind(self, provider: str) -> None:
+        """对冲请求由其他供应商胜出时，在首个数据块之前把指标改记到胜出的供应商"""
+        if provider == self._provider:
+            return
+        self._active.dec()
+        self._bind(provider)
+        self._active.inc()
+
+    def on_chunk(self, chunk_type: str) -> None:
+        if not self._first_token_seen:
+            self._first_token_seen = True
+            self._ttft.observe(time.perf_counter() - self._start)
+        self._chunks[chunk_type].inc()
+
+    def on_usage(self, usage: dict) -> None:
+        self._input_tokens.inc(usage.get("input_tokens") or 0)
+        self._output_tokens.inc(usage.get("output_tokens") or 0)
+
+    def finish(self, outcome: str) -> None:
+        """outcome: completed / error / timeout / busy / aborted"""
+        self._active.dec()
+        LLM_GENERATION_SECONDS.labels(self._model, self._provider, outcome).observe(
+            time.perf_counter() - self._start
+        )
+
+
+class HTTPMetricsMiddleware:
+    """按路由模板（而非实际路径）统计 HTTP 请求耗时，避免路径参数造成标签爆炸"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 路由匹配后 FastAPI 会把 route 写回 scope
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_DURATION_SECONDS.labels(scope["method"], path, status).observe(
+                time.perf_counter() - start
+            )
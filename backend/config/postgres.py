@@ -6,14 +6,82 @@ Module-level Singleton: postgres_manager
 使用方式：
     1. app.py 启动时调用 postgres_manager.setup(config) 注入配置
     2. LifeSpan 生命周期中调用 postgres_manager.start() / close() 管理连接池
-    3. 业务代码通过 () 依赖注入获取数据库会话
+    3. 业务代码通过 get_postgres_session() 依赖注入获取数据库会话
+    4. 只读接口可改用 get_postgres_read_session()，配置了只读副本时会路由到副本
 """
 
+import time
+import uuid
+from dataclasses import dataclass
+
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from loguru import logger
 from config.environment import PostgresConfiguration
 from config.lifecycle import Manageable
+from config.metrics import (
+    metrics,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_CHECKOUT_SECONDS_TOTAL,
+    DB_POOL_CHECKOUTS_TOTAL,
+)
+from config.query_inspector import query_inspector
+
+# 取连接等待超过该阈值（秒）时输出告警日志，通常意味着连接池过小或有慢事务占用连接
+SLOW_CHECKOUT_THRESHOLD = 0.1
+
+
+@dataclass
+class PoolCheckoutStats:
+    """连接池取连接（checkout）耗时统计"""
+    name: str
+    count: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    slow_count: int = 0
+
+    def record(self, wait: float) -> None:
+        self.count += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+        if wait > SLOW_CHECKOUT_THRESHOLD:
+            self.slow_count += 1
+            logger.warning("PostgreSQL 连接池({}) 取连接等待 {:.3f}s", self.name, wait)
+
+
+class _CheckoutTimingMixin:
+    """记录 checkout 等待时间，需与 SQLAlchemy Pool 子类组合使用"""
+
+    checkout_stats: PoolCheckoutStats | None = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            if self.checkout_stats is not None:
+                self.checkout_stats.record(time.perf_counter() - start)
+
+    def recreate(self):
+        # dispose / 连接失效时 SQLAlchemy 会重建连接池实例，需要沿用统计对象
+        pool = super().recreate()
+        pool.checkout_stats = self.checkout_stats
+        return pool
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    """记录 checkout 等待时间的连接池"""
+
+
+class InstrumentedNullPool(_CheckoutTimingMixin, NullPool):
+    """PgBouncer 模式下使用：不复用连接，checkout 耗时即建连耗时"""
+
+
+def _random_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
 
 
 class PostgresManager(Manageable):
@@ -21,8 +89,10 @@ class PostgresManager(Manageable):
 
     def __init__(self):
         self._config: PostgresConfiguration | None = None
-        self._engine = None
+        self._engine: AsyncEngine | None = None
+        self._replica_engine: AsyncEngine | None = None
         self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._read_session_factory: async_sessionmaker[AsyncSession] | None = None
 
     def setup(self, config: PostgresConfiguration) -> None:
         self._config = config
@@ -33,46 +103,135 @@ class PostgresManager(Manageable):
             raise RuntimeError("PostgreSQL 还未连接，无法获取 session_factory")
         return self._session_factory
 
-    async def start(self):
-        if self._config is None:
-            raise RuntimeError("PostgresManager 未配置，请先调用 setup()")
+    @property
+    def read_session_factory(self) -> async_sessionmaker[AsyncSession]:
+        """只读会话工厂，未配置只读副本时与 session_factory 相同"""
+        if self._read_session_factory is None:
+            raise RuntimeError("PostgreSQL 还未连接，无法获取 read_session_factory")
+        return self._read_session_factory
+
+    @property
+    def checkout_stats(self) -> list[PoolCheckoutStats]:
+        """各连接池的 checkout 等待统计"""
+        stats = []
+        for engine in (self._engine, self._replica_engine):
+            if engine is not None and isinstance(engine.pool, _CheckoutTimingMixin):
+                stats.append(engine.pool.checkout_stats)
+        return stats
+
+    def collect_metrics(self) -> None:
+        """/metrics 抓取时同步连接池状态"""
+        for engine in (self._engine, self._replica_engine):
+            if engine is None:
+                continue
+            pool = engine.pool
+            stats = pool.checkout_stats
+            # NullPool（PgBouncer 模式）没有 checkedout / overflow
+            if hasattr(pool, "checkedout"):
+                DB_POOL_CHECKED_OUT.labels(stats.name).set(pool.checkedout())
+                DB_POOL_OVERFLOW.labels(stats.name).set(max(pool.overflow(), 0))
+            DB_POOL_CHECKOUT_SECONDS_TOTAL.labels(stats.name).value = stats.total_wait
+            DB_POOL_CHECKOUTS_TOTAL.labels(stats.name).value = stats.count
 
+    def _create_engine(self, name: str, host: str, port: int) -> AsyncEngine:
         config = self._config
         # asyncpg 驱动的连接字符串格式
         url = (
             f"postgresql+asyncpg://{config['user']}:{config['password']}"
-            f"@{config['host']}:{config['port']}/{config['database']}"
+            f"@{host}:{port}/{config['database']}"
         )
 
-        self._engine = create_async_engine(
-            url,
-            echo=False,
-        )
+        if config["pooler_mode"]:
+            # PgBouncer transaction pooling 下同一会话的语句可能落到不同的后端连接：
+            #   - prepared_statement_cache_size=0 关闭 SQLAlchemy 侧的预编译语句缓存
+            #   - statement_cache_size=0 关闭 asyncpg 侧的语句缓存
+            #   - 预编译语句使用随机名称，避免不同客户端在同一后端连接上重名冲突
+            # 连接复用交给 PgBouncer，应用侧使用 NullPool
+            engine = create_async_engine(
+                f"{url}?prepared_statement_cache_size=0",
+                echo=False,
+                poolclass=InstrumentedNullPool,
+                connect_args={
+                    "statement_cache_size": 0,
+                    "prepared_statement_name_func": _random_statement_name,
+                },
+            )
+        else:
+            engine = create_async_engine(
+                url,
+                echo=False,
+                poolclass=InstrumentedQueuePool,
+                pool_size=config["pool_size"],
+                max_overflow=config["max_overflow"],
+                pool_timeout=config["pool_timeout"],
+                pool_recycle=config["pool_recycle"],
+                pool_pre_ping=config["pool_pre_ping"],
+            )
+        engine.pool.checkout_stats = PoolCheckoutStats(name=name)
+        query_inspector.instrument(engine.sync_engine)
+        return engine
+
+    async def start(self):
+        if self._config is None:
+            raise RuntimeError("PostgresManager 未配置，请先调用 setup()")
 
+        config = self._config
+
+        self._engine = self._create_engine("primary", config["host"], config["port"])
         self._session_factory = async_sessionmaker(
             bind=self._engine,
             expire_on_commit=False,
         )
 
+        if config.get("replica_host"):
+            self._replica_engine = self._create_engine(
+                "replica", config["replica_host"], config["replica_port"],
+            )
+            self._read_session_factory = async_sessionmaker(
+                bind=self._replica_engine,
+                expire_on_commit=False,
+            )
+        else:
+            self._read_session_factory = self._session_factory
+
         # 验证连接是否可用
-        async with self._engine.connect() as conn:
-            await conn.execute(text("SELECT 1"))
+        for engine in (self._engine, self._replica_engine):
+            if engine is None:
+                continue
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
 
-        logger.debug(
-            "PostgreSQL 已连接 ({}:{}/{})",
-            config["host"], config["port"], config["database"],
-        )
+        if config["pooler_mode"]:
+            logger.debug(
+                "PostgreSQL 已连接 ({}:{}/{}, PgBouncer 模式)",
+                config["host"], config["port"], config["database"],
+            )
+        else:
+            logger.debug(
+                "PostgreSQL 已连接 ({}:{}/{}, pool_size={}, max_overflow={})",
+                config["host"], config["port"], config["database"],
+                config["pool_size"], config["max_overflow"],
+            )
+        if self._replica_engine is not None:
+            logger.debug(
+                "PostgreSQL 只读副本已连接 ({}:{})",
+                config["replica_host"], config["replica_port"],
+            )
         logger.info("PostgreSQL 连接初始化成功")
 
     async def close(self):
-        if self._engine:
-            await self._engine.dispose()
+        for engine in (self._replica_engine, self._engine):
+            if engine:
+                await engine.dispose()
         self._engine = None
+        self._replica_engine = None
         self._session_factory = None
+        self._read_session_factory = None
         logger.info("PostgreSQL 连接已关闭")
 
 
 postgres_manager = PostgresManager()
+metrics.register_collector(postgres_manager.collect_metrics)
 
 
 async def get_postgres_session():
@@ -80,8 +239,18 @@ async def get_postgres_session():
 
     使用方式：
         @router.get("/example")
-        async def example(session: AsyncSession = Depends(get_session)):
+        async def example(session: AsyncSession = Depends(get_postgres_session)):
             ...
     """
     async with postgres_manager.session_factory() as session:
         yield session
+
+
+async def get_postgres_read_session():
+    """FastAPI 依赖注入：获取只读数据库会话
+
+    仅用于不写库的查询接口。副本存在复制延迟，刚写入的数据可能读不到，
+    需要"写后立即读"的场景请继续使用 get_postgres_session。
+    """
+    async with postgres_manager.read_session_factory() as session:
+        yield session
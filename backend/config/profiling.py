@@ -0,0 +1,211 @@
+"""
+Module-level Singleton: request_profiler
+
+管理员按需对单个请求做采样分析（基于 pyinstrument），覆盖整个请求生命周期（包括 SSE 流），
+结果以 speedscope 格式写入配置目录，可直接拖入 https://www.speedscope.app 查看火焰图。
+
+请求派生的后台任务（聊天生成：调用上游、解析适配器输出、序列化 SSE 事件）比请求活得久，
+由任务自己用 profile_task() 包裹：发起它的请求在分析中时，任务单独采样并另存一份结果。
+
+触发方式（均需管理员 access token，校验逻辑复用 require_roles(UserRole.ADMIN)）：
+    1. 单次：请求头 ``X-Profile: 1`` 或查询参数 ``?profile=1``
+    2. 预约：POST /api/profiling/arm 指定路由模板和次数，接下来命中该路由的 N 个请求（任意用户）都会被分析
+
+两种方式共享每分钟次数上限，避免误操作拖慢线上。预约状态保存在当前 worker 进程内。
+"""
+
+import asyncio
+import re
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from loguru import logger
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config.environment import Environment, ProfilingConfiguration
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+    from pyinstrument.stack_sampler import active_profiler_context_var
+except ImportError:  # pragma: no cover - 可选依赖
+    Profiler = None
+    SpeedscopeRenderer = None
+    active_profiler_context_var = None
+
+# 当前上下文是否处于请求分析中；后台任务复制发起请求的上下文，据此决定是否一并分析
+_profiling: ContextVar[bool] = ContextVar("request_profiling", default=False)
+
+
+class RequestProfiler:
+    """请求级采样分析的开关与限流"""
+
+    def __init__(self):
+        self._config: ProfilingConfiguration | None = None
+        # 路由模板 -> (匹配正则, 剩余次数)
+        self._armed: dict[str, tuple[re.Pattern, int]] = {}
+        self._recent: deque[float] = deque()
+
+    def setup(self, config: ProfilingConfiguration) -> None:
+        self._config = config
+        if config["enabled"] and Profiler is None:
+            logger.warning("PROFILING_ENABLED=true 但未安装 pyinstrument，请求分析不可用")
+
+    @property
+    def enabled(self) -> bool:
+        return self._config is not None and self._config["enabled"] and Profiler is not None
+
+    @property
+    def armed(self) -> dict[str, int]:
+        return {route: remaining for route, (_, remaining) in self._armed.items()}
+
+    def arm(self, route: str, count: int) -> None:
+        """预约分析接下来命中 route（路由模板，如 /api/chat/conversations）的 count 个请求"""
+        regex, _, _ = compile_path(route)
+        self._armed[route] = (regex, count)
+
+    def disarm(self, route: str | None = None) -> None:
+        if route is None:
+            self._armed.clear()
+        else:
+            self._armed.pop(route, None)
+
+    def take_armed(self, path: str) -> bool:
+        """路径命中预约且拿到限流名额时消耗一次次数；被限流的请求不占用预约次数"""
+        for route, (regex, remaining) in self._armed.items():
+            if regex.match(path):
+                if not self.acquire_slot():
+                    return False
+                if remaining <= 1:
+                    del self._armed[route]
+                else:
+                    self._armed[route] = (regex, remaining - 1)
+                return True
+        return False
+
+    def acquire_slot(self) -> bool:
+        """每分钟分析次数限流（滑动窗口）"""
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        if len(self._recent) >= self._config["max_per_minute"]:
+            return False
+        self._recent.append(now)
+        return True
+
+    def new_profiler(self) -> "Profiler":
+        return Profiler(interval=self._config["interval"], async_mode="enabled")
+
+    @asynccontextmanager
+    async def profile(self, method: str, path: str) -> AsyncIterator[None]:
+        """在采样下执行代码块，结束后保存结果；调用方负责判断是否需要分析及限流"""
+        profiler = self.new_profiler()
+        token = _profiling.set(True)
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            _profiling.reset(token)
+            try:
+                target = await self.save(profiler, method, path)
+                logger.info("请求分析结果已保存: {} {} -> {}", method, path, target)
+            except Exception as e:
+                logger.warning("保存请求分析结果失败: {}", str(e))
+
+    @asynccontextmanager
+    async def profile_task(self, name: str) -> AsyncIterator[None]:
+        """后台任务入口处使用：发起任务的请求在分析中时，对任务单独采样，结果以 TASK-{name} 保存
+
+        不另占限流名额，属于同一次分析。
+        """
+        if not (self.enabled and _profiling.get()):
+            yield
+            return
+        # 复制来的上下文里仍登记着请求的 profiler，清除后任务才能启动自己的 profiler，
+        # 任务的采样也不再混入请求的结果（只影响任务自己的上下文）
+        active_profiler_context_var.set(None)
+        async with self.profile("TASK", name):
+            yield
+
+    async def save(self, profiler: "Profiler", method: str, path: str) -> Path:
+        output_dir = Path(self._config["output_dir"])
+        safe_path = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+        filename = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{method}-{safe_path}.speedscope.json"
+        output = profiler.output(renderer=SpeedscopeRenderer())
+        target = output_dir / filename
+
+        def _write() -> None:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            target.write_text(output, encoding="utf-8")
+
+        await asyncio.to_thread(_write)
+        return target
+
+
+request_profiler = RequestProfiler()
+
+
+class ProfilingMiddleware:
+    """命中触发条件的请求在 pyinstrument 采样下执行"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not request_profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        if not await _should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async with request_profiler.profile(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+
+
+async def _should_profile(scope: Scope) -> bool:
+    """命中触发条件且拿到限流名额"""
+    if _profile_requested(scope):
+        return await _is_admin(scope) and request_profiler.acquire_slot()
+    return request_profiler.take_armed(scope["path"])
+
+
+def _profile_requested(scope: Scope) -> bool:
+    for key, value in scope["headers"]:
+        if key == b"x-profile":
+            return value.strip() in (b"1", b"true")
+    query = scope.get("query_string", b"")
+    return b"profile=1" in query.split(b"&") or b"profile=true" in query.split(b"&")
+
+
+async def _is_admin(scope: Scope) -> bool:
+    """复用 require_roles(UserRole.ADMIN) 的校验逻辑，校验失败时正常处理请求但不做分析"""
+    # 延迟导入：modules.user 依赖 config 包，避免循环导入
+    from models.user import UserRole
+    from modules.user.dependencies import require_roles
+
+    authorization = None
+    for key, value in scope["headers"]:
+        if key == b"authorization":
+            authorization = value.decode("latin-1")
+            break
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return False
+
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=authorization[7:].strip())
+    checker = require_roles(UserRole.ADMIN)
+    try:
+        await checker(credentials=credentials, jwt_config=Environment().jwt_configuration)
+    except HTTPException:
+        return False
+    return True
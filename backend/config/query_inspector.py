@@ -0,0 +1,198 @@
+"""
+Module-level Singleton: query_inspector
+
+按 HTTP 请求统计 SQL 执行情况：
+    - 查询次数、数据库总耗时、最慢语句，通过 Server-Timing 响应头返回
+    - 调试模式下检查查询预算与重复语句（N+1），按配置记录日志或直接抛错
+    - 超过阈值的慢查询自动捕获 EXPLAIN（可选 ANALYZE）
+
+使用方式：
+    1. app.py 启动时调用 query_inspector.setup(config)，并注册 QueryStatsMiddleware
+    2. PostgresManager 创建引擎时调用 query_inspector.instrument(engine.sync_engine)
+    3. 在请求中启动、比请求活得久的后台任务使用 detached_context() 创建（asyncio.create_task(..., context=...)）
+"""
+
+import time
+from collections import Counter
+from contextvars import Context, ContextVar, copy_context
+from dataclasses import dataclass, field
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.environment import SQLInstrumentationConfiguration
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """调试模式（RAISE）下请求的 SQL 执行超出预算"""
+
+
+@dataclass
+class RequestQueryStats:
+    """单个请求内的 SQL 统计"""
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: str | None = None
+    shapes: Counter = field(default_factory=Counter)
+    # 已报告过的问题，避免同一请求内重复刷日志
+    reported: set[str] = field(default_factory=set)
+
+
+# EXPLAIN 慢查询时使用的保存点，隔离诊断语句的失败
+_EXPLAIN_SAVEPOINT = "query_inspector_explain"
+
+_current_stats: ContextVar[RequestQueryStats | None] = ContextVar("request_query_stats", default=None)
+
+
+def detached_context() -> Context:
+    """复制当前上下文并去掉请求的 SQL 统计
+
+    asyncio.create_task 默认复制发起方的上下文，在请求中启动的后台任务（如聊天生成）会继续计入已经返回的请求，
+    调试模式下误报预算超限 / N+1，RAISE 时直接在后台任务中抛错。其余 contextvar（如 trace span）照常继承。
+    """
+    context = copy_context()
+    context.run(_current_stats.set, None)
+    return context
+
+
+class QueryInspector:
+    """SQLAlchemy 引擎事件钩子"""
+
+    def __init__(self):
+        self._config: SQLInstrumentationConfiguration | None = None
+
+    def setup(self, config: SQLInstrumentationConfiguration) -> None:
+        self._config = config
+
+    @property
+    def enabled(self) -> bool:
+        return self._config is not None and self._config["enabled"]
+
+    @property
+    def debug_mode(self) -> str:
+        return self._config["debug_mode"] if self._config is not None else "OFF"
+
+    def instrument(self, engine: Engine) -> None:
+        if not self.enabled:
+            return
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    # ── 事件回调 ──
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        config = self._config
+
+        if elapsed * 1000 >= config["slow_query_ms"]:
+            logger.warning("慢查询 {:.1f}ms: {}", elapsed * 1000, statement)
+            if config["explain_slow"] and not executemany:
+                self._explain(conn, statement, parameters)
+
+        stats = _current_stats.get()
+        if stats is None:
+            return
+
+        stats.count += 1
+        stats.total_time += elapsed
+        if elapsed > stats.slowest_time:
+            stats.slowest_time = elapsed
+            stats.slowest_statement = statement
+        stats.shapes[statement] += 1
+
+        if self.debug_mode != "OFF":
+            self._check_budget(stats, statement)
+
+    # ── 内部方法 ──
+
+    def _check_budget(self, stats: RequestQueryStats, statement: str) -> None:
+        config = self._config
+        problem = None
+        if stats.count > config["query_budget"] and "budget" not in stats.reported:
+            stats.reported.add("budget")
+            problem = f"请求内 SQL 次数超出预算 ({stats.count} > {config['query_budget']})"
+        elif stats.shapes[statement] == config["repeat_threshold"]:
+            problem = f"同一语句在请求内重复执行 {config['repeat_threshold']} 次，疑似 N+1: {statement}"
+
+        if problem is None:
+            return
+        if self.debug_mode == "RAISE":
+            raise QueryBudgetExceeded(problem)
+        logger.warning(problem)
+
+    def _explain(self, conn, statement: str, parameters) -> None:
+        """在同一连接上用独立游标执行 EXPLAIN，不影响原语句的结果集
+
+        EXPLAIN 运行在请求自己的事务中，包在保存点里：失败时（参数绑定、语句不支持 EXPLAIN、超时等）
+        只回滚到保存点，请求的事务不会因此进入 aborted 状态；成功时同样回滚，撤销 ANALYZE 可能产生的副作用。
+        """
+        # ANALYZE 会真实执行语句，只允许用于 SELECT
+        analyze = self._config["explain_analyze"] and statement.lstrip().upper().startswith("SELECT")
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            try:
+                cursor.execute(prefix + statement, parameters)
+                plan = "\n".join(str(row[0]) for row in cursor.fetchall())
+            finally:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+                cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            logger.warning("慢查询执行计划:\n{}", plan)
+        except Exception as e:
+            logger.warning("慢查询 EXPLAIN 失败: {}", str(e))
+        finally:
+            cursor.close()
+
+
+query_inspector = QueryInspector()
+
+
+class QueryStatsMiddleware:
+    """为每个 HTTP 请求建立 SQL 统计上下文，并写入 Server-Timing 响应头
+
+    流式响应（SSE）的响应头在生成器开始前就已发出，因此头中只包含发出响应前的 SQL，
+    完整统计在请求结束时按调试模式输出。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not query_inspector.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and stats.count:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats).encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            if query_inspector.debug_mode != "OFF" and stats.count:
+                logger.debug(
+                    "{} {} SQL 统计: {} 次, 共 {:.1f}ms, 最慢 {:.1f}ms: {}",
+                    scope["method"], scope["path"], stats.count,
+                    stats.total_time * 1000, stats.slowest_time * 1000, stats.slowest_statement,
+                )
+
+
+def _server_timing(stats: RequestQueryStats) -> str:
+    return (
+        f'db;dur={stats.total_time * 1000:.1f};desc="{stats.count} queries", '
+        f"db-slowest;dur={stats.slowest_time * 1000:.1f}"
+    )
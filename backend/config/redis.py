@@ -9,6 +9,7 @@ Python 模块只会被导入一次，因此无论多少处 ``from config.redis i
     1. app.py 启动时调用 redis_manager.setup(config) 注入配置
     2. LifeSpan 生命周期中调用 redis_manager.start() / close() 管理连接
     3. 业务代码通过 get_redis() 依赖注入获取客户端
+    4. 配置了 client_cache_prefixes 时，可通过 redis_manager.cache 读取热点 key（见 config.redis_cache）
 """
 
 from redis.asyncio import Redis
@@ -16,6 +17,8 @@ from redis.asyncio.sentinel import Sentinel
 from loguru import logger
 from config.environment import RedisConfiguration
 from config.lifecycle import Manageable
+from config.metrics import metrics, REDIS_POOL_IN_USE, REDIS_POOL_AVAILABLE, REDIS_CLIENT_CACHE
+from config.redis_cache import RedisClientCache
 
 
 class RedisManager(Manageable):
@@ -27,6 +30,7 @@ class RedisManager(Manageable):
         self._sentinel: Sentinel | None = None
         self._master: Redis | None = None
         self._slave: Redis | None = None
+        self._cache: RedisClientCache | None = None
 
     def setup(self, config: RedisConfiguration) -> None:
         self._config = config
@@ -46,6 +50,28 @@ class RedisManager(Manageable):
             raise RuntimeError("Slave 连接不可用")
         return self._slave
 
+    @property
+    def cache(self) -> RedisClientCache:
+        if self._cache is None:
+            raise RuntimeError("Redis 客户端缓存未启用，请配置 REDIS_CLIENT_CACHE_PREFIXES")
+        return self._cache
+
+    @property
+    def cache_enabled(self) -> bool:
+        return self._cache is not None
+
+    def collect_metrics(self) -> None:
+        """/metrics 抓取时同步连接池与客户端缓存状态"""
+        for name, client in (("master", self._master), ("slave", self._slave)):
+            if client is None:
+                continue
+            pool = client.connection_pool
+            REDIS_POOL_IN_USE.labels(name).set(len(pool._in_use_connections))
+            REDIS_POOL_AVAILABLE.labels(name).set(len(pool._available_connections))
+        if self._cache is not None:
+            for stat, value in self._cache.stats.items():
+                REDIS_CLIENT_CACHE.labels(stat).set(value)
+
     async def start(self):
         if self._config is None:
             raise RuntimeError("RedisManager 未配置，请先调用 setup()")
@@ -86,9 +112,36 @@ class RedisManager(Manageable):
         else:
             logger.debug("Redis 已连接 (standalone 模式, {}:{})", config["host"], config["port"])
 
+        prefixes = config.get("client_cache_prefixes")
+        if prefixes:
+            self._cache = RedisClientCache(
+                reader=self._master,
+                tracker=self._create_tracker(),
+                prefixes=prefixes,
+                max_size=config.get("client_cache_max_size", 10000),
+            )
+            await self._cache.start()
+
         logger.info("Redis 连接初始化成功")
 
+    def _create_tracker(self) -> Redis:
+        """客户端缓存的失效推送依赖 RESP3，需要单独建立 protocol=3 的连接"""
+        config = self._config
+        connection_kwargs = dict(
+            username=config["username"],
+            password=config["password"],
+            db=config["db"],
+            decode_responses=True,
+            protocol=3,
+        )
+        if self._mode == "SENTINEL":
+            return self._sentinel.master_for(config.get("sentinel_name"), **connection_kwargs)
+        return Redis(host=config["host"], port=config["port"], **connection_kwargs)
+
     async def close(self):
+        if self._cache:
+            await self._cache.close()
+        self._cache = None
         for conn in (self._slave, self._master):
             if conn:
                 await conn.close()
@@ -100,3 +153,4 @@ class RedisManager(Manageable):
 
 
 redis_manager = RedisManager()
+metrics.register_collector(redis_manager.collect_metrics)
@@ -0,0 +1,163 @@
+"""
+Redis 客户端缓存（RESP3 client-side caching）
+
+基于 Redis 6+ 的 CLIENT TRACKING 广播模式（BCAST）：
+    1. 单独维护一条 RESP3 连接，开启 ``CLIENT TRACKING ON BCAST PREFIX ...``
+    2. 服务端上任何匹配前缀的 key 被修改 / 删除 / 过期时，会向该连接推送 invalidate 消息
+    3. 本地缓存收到推送后立即剔除对应 key，从而与服务端保持一致
+
+只有 tracking 连接处于可用状态时才会读写本地缓存；连接断开期间会清空本地缓存并直接回源，
+重连成功后再恢复缓存，保证不会读到过期数据。
+
+使用方式：
+    value = await redis_manager.cache.get(key)
+    exists = await redis_manager.cache.exists(key)
+"""
+
+import asyncio
+from collections import OrderedDict
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+
+class RedisClientCache:
+    """带容量上限（LRU）的本地只读缓存，由 Redis 服务端推送失效消息"""
+
+    def __init__(
+        self,
+        reader: Redis,
+        tracker: Redis,
+        prefixes: list[str],
+        max_size: int = 10000,
+    ):
+        # reader: 回源读取使用的普通客户端；tracker: 专用于接收失效推送的 RESP3 客户端
+        self._reader = reader
+        self._tracker = tracker
+        self._prefixes = tuple(prefixes)
+        self._max_size = max_size
+        self._entries: OrderedDict[str, str | None] = OrderedDict()
+        self._ready = False
+        # 每收到一次失效推送自增，用于丢弃"回源期间已被修改"的读取结果
+        self._epoch = 0
+        self._task: asyncio.Task | None = None
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """命中统计"""
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "size": len(self._entries),
+        }
+
+    def is_cacheable(self, key: str) -> bool:
+        return key.startswith(self._prefixes)
+
+    async def get(self, key: str) -> str | None:
+        """读取字符串 key，命中本地缓存时不产生网络往返"""
+        if not self._ready or not self.is_cacheable(key):
+            return await self._reader.get(key)
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return self._entries[key]
+
+        self._misses += 1
+        epoch = self._epoch
+        value = await self._reader.get(key)
+        # 回源期间收到过失效推送，无法确认读到的值是否仍然有效，不写入本地缓存
+        if self._ready and epoch == self._epoch:
+            self._store(key, value)
+        return value
+
+    async def exists(self, key: str) -> bool:
+        """判断字符串 key 是否存在（不存在的结果同样会被缓存）"""
+        return await self.get(key) is not None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._track())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._reset()
+        await self._tracker.close()
+
+    # ── 内部方法 ──
+
+    def _store(self, key: str, value: str | None) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _reset(self) -> None:
+        self._ready = False
+        self._epoch += 1
+        self._entries.clear()
+
+    async def _on_invalidate(self, response: list) -> list:
+        """处理服务端推送：["invalidate", [key, ...]]，key 列表为空表示 FLUSHDB/FLUSHALL"""
+        self._epoch += 1
+        self._invalidations += 1
+        keys = response[1] if len(response) > 1 else None
+        if keys is None:
+            self._entries.clear()
+        else:
+            for key in keys:
+                self._entries.pop(key, None)
+        return response
+
+    async def _track(self) -> None:
+        """维持 tracking 连接，断线后清空缓存并指数退避重连"""
+        pool = self._tracker.connection_pool
+        backoff = 0.5
+        while True:
+            conn = None
+            try:
+                conn = await pool.get_connection()
+                # redis-py 的异步客户端没有公开设置失效回调的接口，只能挂到解析器上
+                conn._parser.set_invalidation_push_handler(self._on_invalidate)
+
+                args: list[str] = ["CLIENT", "TRACKING", "ON", "BCAST"]
+                for prefix in self._prefixes:
+                    args.extend(("PREFIX", prefix))
+                await conn.send_command(*args)
+                reply = await conn.read_response()
+                if isinstance(reply, ResponseError):
+                    raise reply
+
+                self._ready = True
+                backoff = 0.5
+                logger.debug("Redis 客户端缓存已启用, 前缀={}", list(self._prefixes))
+
+                while True:
+                    await conn.read_response(push_request=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Redis 客户端缓存 tracking 连接异常，{}s 后重连: {}", backoff, str(e))
+            finally:
+                self._reset()
+                if conn is not None:
+                    await conn.disconnect()
+                    await pool.release(conn)
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
@@ -0,0 +1,316 @@
+"""
+Module-level Singleton: tracer
+
+轻量级 span 追踪，输出 OTLP/JSON 格式（每行一个 ExportTraceServiceRequest），
+可直接被 OpenTelemetry Collector 的 otlpjsonfile receiver 读取，或用 jq 本地分析。
+
+    - 当前 span 保存在 contextvar 中：asyncio.create_task 会复制上下文，后台任务自动挂到发起方的 trace 下
+    - 采样在 trace 根节点决定（head sampling），未采样的 trace 下所有 span 都是空操作
+    - 结束的 span 先进入内存缓冲，由后台任务批量写入文件，不在请求路径上做文件 IO
+    - 入站请求携带 W3C traceparent 头时沿用其 trace_id
+
+使用方式：
+    1. app.py 启动时调用 tracer.setup(config)，注册 TracingMiddleware，并交给 LifeSpan 管理
+    2. 业务代码：
+        with tracer.span("chat.resolve_model", model=name) as span:
+            ...
+            span.add_event("first_token")
+"""
+
+import asyncio
+import json
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections.abc import Iterator
+
+from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.environment import TracingConfiguration
+from config.lifecycle import Manageable
+
+# 缓冲区上限，超出后丢弃新 span，避免导出跟不上时内存无限增长
+_MAX_BUFFERED_SPANS = 10000
+_FLUSH_INTERVAL = 2.0
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """已采样的 span"""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "attributes", "events",
+        "start_ns", "end_ns", "error",
+    )
+
+    sampled = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.events: list[tuple[str, int, dict]] = []
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes) -> None:
+        self.events.append((name, time.time_ns(), attributes))
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+        self.add_event("exception", type=type(exc).__name__, message=str(exc))
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "events": [
+                {"name": name, "timeUnixNano": str(ts), "attributes": _otlp_attributes(attrs)}
+                for name, ts, attrs in self.events
+            ],
+            # 1: OK, 2: ERROR
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """未采样或未启用追踪时使用，所有操作为空"""
+
+    __slots__ = ()
+
+    sampled = False
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Span | _NoopSpan | None] = ContextVar("current_span", default=None)
+
+
+class Tracer(Manageable):
+    """span 创建、采样与批量导出"""
+
+    def __init__(self):
+        self._config: TracingConfiguration | None = None
+        self._buffer: list[Span] = []
+        self._dropped = 0
+        self._task: asyncio.Task | None = None
+
+    def setup(self, config: TracingConfiguration) -> None:
+        self._config = config
+
+    @property
+    def enabled(self) -> bool:
+        return self._config is not None and self._config["enabled"]
+
+    @staticmethod
+    def current_span() -> Span | _NoopSpan:
+        return _current_span.get() or NOOP_SPAN
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        remote_parent: tuple[str, str, bool] | None = None,
+        **attributes,
+    ) -> Iterator[Span | _NoopSpan]:
+        """开启一个 span，并在退出时结束它
+
+        remote_parent: (trace_id, parent_span_id, sampled)，来自上游的 traceparent
+        """
+        parent = _current_span.get()
+        if not self.enabled or (parent is not None and not parent.sampled):
+            yield NOOP_SPAN
+            return
+
+        if parent is not None:
+            span = Span(name, parent.trace_id, parent.span_id, attributes)
+        elif remote_parent is not None:
+            trace_id, parent_id, sampled = remote_parent
+            if not sampled:
+                yield from self._noop_root()
+                return
+            span = Span(name, trace_id, parent_id, attributes)
+        elif random.random() < self._config["sample_ratio"]:
+            span = Span(name, f"{random.getrandbits(128):032x}", None, attributes)
+        else:
+            yield from self._noop_root()
+            return
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            # GeneratorExit / CancelledError 代表客户端断开，不算错误
+            if isinstance(e, Exception):
+                span.record_exception(e)
+            else:
+                span.set_attribute("cancelled", True)
+            raise
+        finally:
+            _reset_span(token)
+            span.end_ns = time.time_ns()
+            self._enqueue(span)
+
+    def _noop_root(self) -> Iterator[_NoopSpan]:
+        # 未采样的根节点也要写入 contextvar，保证其子 span 同样跳过
+        token = _current_span.set(NOOP_SPAN)
+        try:
+            yield NOOP_SPAN
+        finally:
+            _reset_span(token)
+
+    def _enqueue(self, span: Span) -> None:
+        if len(self._buffer) >= _MAX_BUFFERED_SPANS:
+            self._dropped += 1
+            return
+        self._buffer.append(span)
+
+    # ── 生命周期与导出 ──
+
+    async def start(self) -> None:
+        if not self.enabled:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            "链路追踪已启用 (采样率={}, 输出={})",
+            self._config["sample_ratio"], self._config["export_path"],
+        )
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self._flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(_FLUSH_INTERVAL)
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.warning("链路追踪导出失败: {}", str(e))
+
+    async def _flush(self) -> None:
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        if self._dropped:
+            logger.warning("链路追踪缓冲区已满，丢弃 {} 个 span", self._dropped)
+            self._dropped = 0
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self._config["service_name"]})},
+                "scopeSpans": [{
+                    "scope": {"name": "alpha-kanban"},
+                    "spans": [span.to_otlp() for span in batch],
+                }],
+            }],
+        }
+        line = json.dumps(payload, ensure_ascii=False)
+        await asyncio.to_thread(self._write_line, line)
+
+    def _write_line(self, line: str) -> None:
+        with open(self._config["export_path"], "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+tracer = Tracer()
+
+
+class TracingMiddleware:
+    """为每个 HTTP 请求创建根 span（流式响应的 span 覆盖整个流）"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        remote_parent = _parse_traceparent(scope)
+        with tracer.span(
+            f"HTTP {scope['method']}",
+            remote_parent=remote_parent,
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        ) as span:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None and span.sampled:
+                    span.name = f"HTTP {scope['method']} {route}"
+                    span.set_attribute("http.route", route)
+
+
+def _reset_span(token) -> None:
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # 异步生成器被事件循环在其他上下文中 aclose（如客户端断开后的回收）时，
+        # token 不属于当前上下文，此时无需恢复
+        pass
+
+
+def _parse_traceparent(scope: Scope) -> tuple[str, str, bool] | None:
+    for key, value in scope["headers"]:
+        if key == b"traceparent":
+            match = _TRACEPARENT_RE.match(value.decode("latin-1").strip())
+            if match is None:
+                return None
+            trace_id, parent_id, flags = match.groups()
+            return trace_id, parent_id, bool(int(flags, 16) & 0x01)
+    return None
+
+
+def _otlp_attributes(attributes: dict) -> list[dict]:
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        result.append({"key": key, "value": typed})
+    return result
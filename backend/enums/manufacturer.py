@@ -9,3 +9,5 @@ from enum import Enum
 class Manufacturer(str, Enum):
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
+    # 自建推理服务等 OpenAI 兼容的 Chat Completions 接口
+    OPENAI_COMPATIBLE = "openai_compatible"
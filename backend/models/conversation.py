@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, Uuid, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, Uuid, func, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from models.base import Base
@@ -18,6 +18,8 @@ class MessageStatus(str, Enum):
     GENERATING = "generating"
     COMPLETED = "completed"
     ABORTED = "aborted"
+    # 多模型对比中未被选中的回复，不再作为上下文
+    DISCARDED = "discarded"
 
 
 class Conversation(Base):
@@ -43,7 +45,13 @@ class Conversation(Base):
 class Message(Base):
     __tablename__ = "messages"
     __table_args__ = (
-        UniqueConstraint("conversation_id", "order", name="uq_messages_conversation_id_order"),
+        # 多模型对比的回复共用同一个 order，以 variant 区分
+        UniqueConstraint("conversation_id", "order", "variant", name="uq_messages_conversation_id_order_variant"),
+        # 孤儿 GENERATING 消息清理只扫描生成中的行
+        Index(
+            "ix_messages_generating_updated_at", "updated_at",
+            postgresql_where=text("status = 'generating'"),
+        ),
     )
 
     conversation_id: Mapped[uuid.UUID] = mapped_column(
@@ -56,6 +64,9 @@ class Message(Base):
     order: Mapped[int] = mapped_column(
         Integer(), nullable=False,
     )
+    variant: Mapped[int] = mapped_column(
+        Integer(), nullable=False, server_default="0",
+    )
     role: Mapped[str] = mapped_column(
         String(20), nullable=False,
     )
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, String, UniqueConstraint
+from sqlalchemy import Boolean, Float, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from models.base import Base
@@ -22,6 +22,31 @@ class Model(Base):
     is_enabled: Mapped[bool] = mapped_column(
         Boolean(), nullable=False, server_default="true",
     )
+    # 关联多个供应商时，首个供应商出 token 过慢则向下一个供应商发起对冲请求（见 chat.hedging）
+    hedging_enabled: Mapped[bool] = mapped_column(
+        Boolean(), nullable=False, server_default="false",
+    )
+    # 缓存确定性调用（temperature 为 0 且未开启 thinking）的响应，相同输入直接返回（见 chat.response_cache）
+    cache_enabled: Mapped[bool] = mapped_column(
+        Boolean(), nullable=False, server_default="false",
+    )
+    # 采样温度，对话与标题生成共用
+    temperature: Mapped[float] = mapped_column(
+        Float(), nullable=False, server_default="1",
+    )
+    # 调用期限（秒），为空时使用 LLMConfig 的默认值
+    connect_timeout: Mapped[float | None] = mapped_column(
+        Float(), nullable=True,
+    )
+    first_token_timeout: Mapped[float | None] = mapped_column(
+        Float(), nullable=True,
+    )
+    idle_timeout: Mapped[float | None] = mapped_column(
+        Float(), nullable=True,
+    )
+    total_timeout: Mapped[float | None] = mapped_column(
+        Float(), nullable=True,
+    )
     provider_links: Mapped[list["ModelProviderLink"]] = relationship(
         back_populates="model", cascade="all, delete-orphan",
     )
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, String
+from sqlalchemy import Boolean, Integer, String
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -20,3 +20,13 @@ class Provider(Base):
     is_enabled: Mapped[bool] = mapped_column(
         Boolean(), nullable=False, server_default="true",
     )
+    # 供应商侧限额（所有 worker 共享，见 chat.provider_governor），为空表示不限制
+    rpm_limit: Mapped[int | None] = mapped_column(
+        Integer(), nullable=True,
+    )
+    tpm_limit: Mapped[int | None] = mapped_column(
+        Integer(), nullable=True,
+    )
+    max_concurrency: Mapped[int | None] = mapped_column(
+        Integer(), nullable=True,
+    )
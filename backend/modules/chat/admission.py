@@ -0,0 +1,230 @@
+"""
+Module-level Singleton: admission_scheduler
+
+上游调用的准入队列：总需求超过上游容量时让请求排队，而不是同时涌向供应商后各自失败。
+
+    - 每个 worker 最多同时进行 concurrency 个上游调用，占满时新请求进入队列
+    - 按优先级严格排序：对话（INTERACTIVE）优先于标题生成等后台调用（BACKGROUND）
+    - 同一优先级内按用户做加权公平排队（start-time fair queuing）：每个用户的请求依次获得虚拟完成时间，
+      步长为 1 / 角色权重，单个用户连续提交的大量请求不会挤占其他用户；队列清空时重置虚拟时间
+    - 队列长度与排队时长有上限，超出时抛出 AdmissionRejectedError；排队期间按位置变化回调，由调用方推送 queued 事件
+
+名额只在本进程内统计，跨 worker 的供应商级限流见 provider_governor。
+"""
+
+import asyncio
+import itertools
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from enum import IntEnum
+
+from config.environment import ChatAdmissionConfiguration
+from config.lifecycle import Manageable
+from config.metrics import (
+    CHAT_ADMISSION_QUEUE_DEPTH,
+    CHAT_ADMISSION_REJECTIONS_TOTAL,
+    CHAT_ADMISSION_WAIT_SECONDS,
+)
+
+# 排队期间检查位置变化的间隔（秒）
+_POSITION_INTERVAL = 1.0
+
+
+class AdmissionPriority(IntEnum):
+    """数值越小越优先"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+_REASON_LABELS = {
+    "queue_full": "排队请求过多",
+    "timeout": "排队超时",
+}
+
+
+class AdmissionRejectedError(Exception):
+    """未能获得上游调用名额，reason 为 queue_full / timeout"""
+
+    def __init__(self, reason: str, waited: float):
+        self.reason = reason
+        super().__init__(f"服务繁忙（{_REASON_LABELS[reason]}，已等待 {waited:.0f} 秒），请稍后重试")
+
+
+class _Waiter:
+    __slots__ = ("priority", "user_id", "start", "finish", "seq", "future")
+
+    def __init__(
+        self,
+        priority: AdmissionPriority,
+        user_id: uuid.UUID,
+        start: float,
+        finish: float,
+        seq: int,
+        future: asyncio.Future,
+    ):
+        self.priority = priority
+        self.user_id = user_id
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+        self.future = future
+
+    def key(self) -> tuple[int, float, int]:
+        return self.priority, self.finish, self.seq
+
+
+class AdmissionScheduler(Manageable):
+    """本进程内上游调用名额的分配"""
+
+    def __init__(self):
+        self._config: ChatAdmissionConfiguration | None = None
+        self._inflight = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        # 用户 -> 其最后一个请求的虚拟完成时间
+        self._finish_tags: dict[uuid.UUID, float] = {}
+
+    def setup(self, config: ChatAdmissionConfiguration) -> None:
+        self._config = config
+
+    async def start(self) -> None:
+        if self._config is None:
+            raise RuntimeError("AdmissionScheduler 未配置，请先调用 setup()")
+
+    async def close(self) -> None:
+        # 进程关闭时生成任务已被取消，排队者随之退出
+        self._waiters.clear()
+        self._finish_tags.clear()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: uuid.UUID,
+        role: str,
+        priority: AdmissionPriority,
+        on_queued: Callable[[int], Awaitable[None]] | None = None,
+    ) -> AsyncIterator[None]:
+        """占用一个上游调用名额直到退出上下文
+
+        需要排队时，排队位置（从 1 开始）变化时调用 on_queued(位置)，排队结束获得名额时调用 on_queued(0)。
+        """
+        if not self._config["concurrency"]:
+            yield
+            return
+        await self._acquire(user_id, role, priority, on_queued)
+        try:
+            yield
+        finally:
+            self._release()
+
+    # ── 内部方法 ──
+
+    async def _acquire(
+        self,
+        user_id: uuid.UUID,
+        role: str,
+        priority: AdmissionPriority,
+        on_queued: Callable[[int], Awaitable[None]] | None,
+    ) -> None:
+        label = priority.name.lower()
+        if self._inflight < self._config["concurrency"] and not self._waiters:
+            self._inflight += 1
+            CHAT_ADMISSION_WAIT_SECONDS.labels(label).observe(0)
+            return
+        if len(self._waiters) >= self._config["max_queue"]:
+            CHAT_ADMISSION_REJECTIONS_TOTAL.labels(label, "queue_full").inc()
+            raise AdmissionRejectedError("queue_full", 0)
+
+        loop = asyncio.get_running_loop()
+        waiter = self._enqueue(user_id, role, priority, loop.create_future())
+        started = loop.time()
+        deadline = started + self._config["max_wait"]
+        reported = None
+        try:
+            while not waiter.future.done():
+                position = self._position(waiter)
+                if on_queued is not None and position != reported:
+                    reported = position
+                    await on_queued(position)
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    CHAT_ADMISSION_REJECTIONS_TOTAL.labels(label, "timeout").inc()
+                    raise AdmissionRejectedError("timeout", loop.time() - started)
+                try:
+                    async with asyncio.timeout(min(remaining, _POSITION_INTERVAL)):
+                        await asyncio.shield(waiter.future)
+                except TimeoutError:
+                    pass
+            CHAT_ADMISSION_WAIT_SECONDS.labels(label).observe(loop.time() - started)
+            if on_queued is not None:
+                await on_queued(0)
+        except BaseException:
+            if waiter.future.done():
+                # 放弃时恰好已分到名额，交还给下一个排队者
+                self._release()
+            else:
+                self._remove(waiter)
+            raise
+
+    def _enqueue(
+        self,
+        user_id: uuid.UUID,
+        role: str,
+        priority: AdmissionPriority,
+        future: asyncio.Future,
+    ) -> _Waiter:
+        weight = self._config["weights"].get(role, 1.0)
+        start = max(self._virtual_time, self._finish_tags.get(user_id, 0.0))
+        waiter = _Waiter(priority, user_id, start, start + 1 / weight, next(self._seq), future)
+        self._finish_tags[user_id] = waiter.finish
+        self._waiters.append(waiter)
+        self._update_depth()
+        return waiter
+
+    def _remove(self, waiter: _Waiter) -> None:
+        self._waiters.remove(waiter)
+        # 放弃的是该用户最后一个请求时，退回其虚拟完成时间
+        if self._finish_tags.get(waiter.user_id) == waiter.finish:
+            self._finish_tags[waiter.user_id] = waiter.start
+        self._update_depth()
+        self._dispatch()
+
+    def _release(self) -> None:
+        self._inflight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        dispatched = False
+        while self._waiters and self._inflight < self._config["concurrency"]:
+            waiter = min(self._waiters, key=_Waiter.key)
+            self._waiters.remove(waiter)
+            self._virtual_time = max(self._virtual_time, waiter.start)
+            self._inflight += 1
+            waiter.future.set_result(None)
+            dispatched = True
+
+        if not self._waiters:
+            self._virtual_time = 0.0
+            self._finish_tags.clear()
+        elif len(self._finish_tags) > self._config["max_queue"]:
+            self._finish_tags = {
+                user_id: finish for user_id, finish in self._finish_tags.items() if finish > self._virtual_time
+            }
+        if dispatched:
+            self._update_depth()
+
+    def _position(self, waiter: _Waiter) -> int:
+        key = waiter.key()
+        return 1 + sum(1 for other in self._waiters if other.key() < key)
+
+    def _update_depth(self) -> None:
+        for priority in AdmissionPriority:
+            CHAT_ADMISSION_QUEUE_DEPTH.labels(priority.name.lower()).set(
+                sum(1 for waiter in self._waiters if waiter.priority == priority)
+            )
+
+
+admission_scheduler = AdmissionScheduler()
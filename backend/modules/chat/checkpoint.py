@@ -0,0 +1,153 @@
+"""
+Module-level Singleton: message_checkpointer
+
+生成过程中的部分回复定期落库，worker 崩溃时最多丢失一个检查点间隔的内容：
+
+    - ReplyBuffer：以列表累积分片（线性时间），每隔 interval 秒或累积 max_chars 字符后，
+      用 ``content = content || :delta`` 只追加新增部分，每次回复的写库次数有上限
+    - 孤儿消息清理：启动时及之后每隔 stale_after 秒，把超过 stale_after 秒未更新的 GENERATING 消息标记为 ABORTED。
+      进行中的生成会持续刷新 updated_at，因此多 worker 滚动重启时不会误伤其他 worker 上的生成
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import timedelta
+
+from loguru import logger
+from sqlalchemy import func, update
+
+from config.environment import ChatCheckpointConfiguration
+from config.lifecycle import Manageable
+from config.postgres import postgres_manager
+from models.conversation import Message, MessageStatus
+
+
+class ReplyBuffer:
+    """回复内容 / 思考过程的累积器，按时间或数据量节流写入助手消息"""
+
+    def __init__(self, message_id: uuid.UUID, interval: float, max_chars: int):
+        self._message_id = message_id
+        self._interval = interval
+        self._max_chars = max_chars
+        self._content: list[str] = []
+        self._thinking: list[str] = []
+        # 已落库的分片数
+        self._flushed_content = 0
+        self._flushed_thinking = 0
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
+
+    def append_content(self, text: str) -> None:
+        self._content.append(text)
+        self._pending_chars += len(text)
+
+    def append_thinking(self, text: str) -> None:
+        self._thinking.append(text)
+        self._pending_chars += len(text)
+
+    @property
+    def content(self) -> str:
+        return "".join(self._content)
+
+    @property
+    def thinking(self) -> str:
+        return "".join(self._thinking)
+
+    def due(self) -> bool:
+        """是否需要写检查点（由调用方在每个分片后检查）"""
+        if not self._pending_chars:
+            return False
+        return (
+            self._pending_chars >= self._max_chars
+            or time.monotonic() - self._last_flush >= self._interval
+        )
+
+    async def checkpoint(self) -> None:
+        """把上次检查点之后的新增内容追加到消息行
+
+        使用独立的短会话：生成方的会话在提交消息行后不持有连接，检查点失败也不会影响其 ORM 状态。
+        """
+        content_delta = "".join(self._content[self._flushed_content:])
+        thinking_delta = "".join(self._thinking[self._flushed_thinking:])
+        values = {}
+        if content_delta:
+            values["content"] = Message.content + content_delta
+        if thinking_delta:
+            values["thinking"] = func.coalesce(Message.thinking, "") + thinking_delta
+
+        self._last_flush = time.monotonic()
+        try:
+            async with postgres_manager.session_factory() as session:
+                await session.execute(
+                    update(Message)
+                    .where(Message.id == self._message_id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+        except Exception as e:
+            # 检查点失败不影响生成，新增内容保留到下一个检查点或最终写入
+            logger.warning("写入回复检查点失败: {}", str(e))
+            return
+
+        self._flushed_content = len(self._content)
+        self._flushed_thinking = len(self._thinking)
+        self._pending_chars = 0
+
+
+class MessageCheckpointer(Manageable):
+    """检查点配置与孤儿 GENERATING 消息的定期清理"""
+
+    def __init__(self):
+        self._config: ChatCheckpointConfiguration | None = None
+        self._task: asyncio.Task | None = None
+
+    def setup(self, config: ChatCheckpointConfiguration) -> None:
+        self._config = config
+
+    def buffer(self, message_id: uuid.UUID) -> ReplyBuffer:
+        return ReplyBuffer(message_id, self._config["interval"], self._config["max_chars"])
+
+    async def start(self) -> None:
+        if self._config is None:
+            raise RuntimeError("MessageCheckpointer 未配置，请先调用 setup()")
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sweep(self) -> int:
+        """把长时间未更新的 GENERATING 消息标记为 ABORTED，返回处理的条数"""
+        stale_before = func.now() - timedelta(seconds=self._config["stale_after"])
+        async with postgres_manager.session_factory() as session:
+            result = await session.execute(
+                update(Message)
+                .where(
+                    Message.status == MessageStatus.GENERATING.value,
+                    Message.updated_at < stale_before,
+                )
+                .values(status=MessageStatus.ABORTED.value)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        return result.rowcount
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                count = await self.sweep()
+                if count:
+                    logger.warning("已将 {} 条中断的生成中消息标记为中止", count)
+            except Exception as e:
+                logger.warning("清理中断的生成中消息失败: {}", str(e))
+            await asyncio.sleep(self._config["stale_after"])
+
+
+message_checkpointer = MessageCheckpointer()
@@ -1,16 +1,29 @@
-"""聊天模块依赖：会话所有权校验"""
+"""聊天模块依赖：会话所有权校验、生成请求的准入（幂等键、用户级限流）"""
 
+import hashlib
+import json
 import uuid
+from dataclasses import dataclass
 
-from fastapi import Depends, HTTPException
+import anyio
+from fastapi import Depends, HTTPException, Request
+from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.postgres import get_postgres_session
 from models.conversation import Conversation
 from models.user import User
+from modules.chat.stream_store import chat_stream_store
+from modules.chat.user_limiter import user_rate_limiter
 from modules.user.dependencies import get_current_user
 
+_LIMIT_REASON_LABELS = {
+    "requests": "请求过于频繁",
+    "tokens": "token 用量已达上限",
+    "streams": "进行中的生成过多",
+}
+
 
 async def get_user_conversation(
     conversation_id: uuid.UUID,
@@ -30,3 +43,68 @@ async def get_user_conversation(
         raise HTTPException(status_code=403, detail="无权访问该会话")
 
     return conversation
+
+
+@dataclass(frozen=True)
+class ChatAdmission:
+    # 本次请求对应的助手消息 ID（多模型对比时为事件流 ID）
+    message_id: uuid.UUID
+    # 为 True 时是同一 Idempotency-Key 的重试，message_id 为原请求的生成，只需订阅
+    replayed: bool = False
+    # 新请求登记的幂等键（Redis key），交给生成方随事件流续期
+    idempotency_key: str | None = None
+
+
+def _body_fingerprint(body: BaseModel) -> str:
+    """校验后请求体的指纹，与幂等键一起登记，用于识别复用同一个键的不同请求"""
+    canonical = json.dumps(body.model_dump(mode="json"), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def admit_generation(
+    request: Request,
+    current_user: User,
+    body: BaseModel,
+    idempotency_key: str | None,
+) -> ChatAdmission:
+    """生成请求的准入：按 Idempotency-Key 去重，再按用户限制请求数 / token 数 / 同时进行中的生成数
+
+    新请求预留助手消息 ID（即生成租约），交给 generation_manager.submit()，生成结束时释放租约；
+    重试的请求不计入限额，直接订阅原生成（进行中的跟随，已结束的完整补发）。超限时返回 429。
+    幂等键连同请求体指纹登记，复用同一个键但请求体不同（如换了模型或消息）时返回 422，不会补发原生成。
+    不作为依赖使用：FastAPI 先解析依赖再校验请求体，请求体不合法（422）时预留的租约无人释放。
+    由接口函数在请求体与其他依赖校验通过后调用，之后必须提交生成。
+    """
+    message_id = uuid.uuid4()
+    path = request.url.path
+    if idempotency_key is not None:
+        fingerprint = _body_fingerprint(body)
+        existing = await chat_stream_store.claim_idempotency_key(
+            current_user.id, path, idempotency_key, message_id, fingerprint,
+        )
+        if existing is not None:
+            existing_id, existing_fingerprint = existing
+            if existing_fingerprint != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key 已用于其他请求内容，请使用新的键")
+            return ChatAdmission(existing_id, replayed=True)
+
+    try:
+        rejection = await user_rate_limiter.admit(current_user.id, current_user.role, message_id)
+        if rejection is not None:
+            reason, retry_after = rejection
+            raise HTTPException(
+                status_code=429,
+                detail=f"{_LIMIT_REASON_LABELS[reason]}，请 {retry_after} 秒后重试",
+                headers={"Retry-After": str(retry_after)},
+            )
+    except BaseException:
+        # 未能启动生成（限流、异常、请求被取消）时撤销幂等键，否则用同一个键的重试会订阅一个不存在的生成
+        if idempotency_key is not None:
+            with anyio.CancelScope(shield=True):
+                await chat_stream_store.release_idempotency_key(current_user.id, path, idempotency_key, message_id)
+        raise
+    return ChatAdmission(
+        message_id,
+        idempotency_key=chat_stream_store.idempotency_key(current_user.id, path, idempotency_key)
+        if idempotency_key is not None else None,
+    )
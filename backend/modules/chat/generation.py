@@ -0,0 +1,175 @@
+"""
+Module-level Singleton: generation_manager
+
+生成与 HTTP 请求解耦：每次回复在服务端后台任务中生成（以助手消息 ID 为键），
+事件写入续传流并通过 Redis pub/sub 推送（见 stream_store）。/api/chat 的接口只是订阅者，
+任意数量的标签页 / 设备、任意 worker 都可以观看同一次生成，而不会重复调用上游。
+
+    - 后台任务使用独立的数据库会话，不随请求结束而关闭
+    - 所有 worker 上都没有订阅者持续超过 orphan_grace 秒时取消生成：关闭上游流，部分内容标记为 ABORTED。
+      宽限期内重连（续传）的客户端可以继续观看
+    - 进程关闭时取消所有进行中的生成，同样保存部分内容
+    - 多模型对比（submit_comparison）作为一次生成：各模型的回复共用一个事件流与一份生成租约
+"""
+
+import asyncio
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from functools import partial
+
+import anyio
+from loguru import logger
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.environment import ChatStreamConfiguration
+from config.lifecycle import Manageable
+from config.postgres import postgres_manager
+from config.profiling import request_profiler
+from config.query_inspector import detached_context
+from models.user import UserRole
+from modules.chat.service import generate_chat_reply, generate_comparison_replies
+from modules.chat.stream_store import chat_stream_store
+from modules.chat.user_limiter import user_rate_limiter
+
+_ORPHAN_CHECK_INTERVAL = 1.0
+
+
+class GenerationManager(Manageable):
+    """本进程内进行中的生成任务"""
+
+    def __init__(self):
+        self._config: ChatStreamConfiguration | None = None
+        self._tasks: dict[uuid.UUID, asyncio.Task] = {}
+
+    def setup(self, config: ChatStreamConfiguration) -> None:
+        self._config = config
+
+    async def start(self) -> None:
+        if self._config is None:
+            raise RuntimeError("GenerationManager 未配置，请先调用 setup()")
+
+    async def close(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def submit(
+        self,
+        user_id: uuid.UUID,
+        model: str,
+        content: str,
+        thinking_enabled: bool = False,
+        conversation_id: uuid.UUID | None = None,
+        message_id: uuid.UUID | None = None,
+        idempotency_key: str | None = None,
+        user_role: str = UserRole.USER.value,
+    ) -> uuid.UUID:
+        """启动一次生成并立即返回助手消息 ID，调用方随后通过 chat_stream_store.subscribe() 观看
+
+        message_id 为准入时预留的 ID（即用户的生成租约，见 user_limiter），生成结束时释放；
+        idempotency_key 为准入时登记的幂等键，生成期间随事件流续期。
+        """
+        message_id = message_id or uuid.uuid4()
+        return self._spawn(message_id, user_id, partial(
+            generate_chat_reply,
+            message_id=message_id,
+            user_id=user_id,
+            model=model,
+            content=content,
+            thinking_enabled=thinking_enabled,
+            conversation_id=conversation_id,
+            idempotency_key=idempotency_key,
+            user_role=user_role,
+        ))
+
+    def submit_comparison(
+        self,
+        user_id: uuid.UUID,
+        models: list[str],
+        content: str,
+        thinking_enabled: bool = False,
+        conversation_id: uuid.UUID | None = None,
+        stream_id: uuid.UUID | None = None,
+        idempotency_key: str | None = None,
+        user_role: str = UserRole.USER.value,
+    ) -> uuid.UUID:
+        """启动一次多模型对比并立即返回事件流 ID，各模型的助手消息 ID 在事件流的 message_created 事件中给出
+
+        stream_id 为准入时预留的 ID（生成租约），与 submit() 的 message_id 相同，只是不对应某条消息。
+        """
+        stream_id = stream_id or uuid.uuid4()
+        return self._spawn(stream_id, user_id, partial(
+            generate_comparison_replies,
+            stream_id=stream_id,
+            user_id=user_id,
+            models=models,
+            content=content,
+            thinking_enabled=thinking_enabled,
+            conversation_id=conversation_id,
+            idempotency_key=idempotency_key,
+            user_role=user_role,
+        ))
+
+    def _spawn(
+        self,
+        stream_id: uuid.UUID,
+        user_id: uuid.UUID,
+        generate: Callable[[AsyncSession], Awaitable[None]],
+    ) -> uuid.UUID:
+        # 生成比发起它的请求活得久，不计入该请求的 SQL 统计
+        task = asyncio.create_task(
+            self._run(stream_id, user_id, generate),
+            name=f"chat-generation-{stream_id}",
+            context=detached_context(),
+        )
+        self._tasks[stream_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(stream_id, None))
+        return stream_id
+
+    async def _run(
+        self,
+        message_id: uuid.UUID,
+        user_id: uuid.UUID,
+        generate: Callable[[AsyncSession], Awaitable[None]],
+    ) -> None:
+        watchdog = asyncio.create_task(self._cancel_when_orphaned(message_id, asyncio.current_task()))
+        try:
+            # 发起生成的请求在分析中时一并分析生成过程（上游调用、适配器解析、SSE 序列化）
+            async with request_profiler.profile_task(f"chat-generation-{message_id}"):
+                async with postgres_manager.session_factory() as session:
+                    await generate(session)
+        except Exception as e:
+            # 生成过程中的异常已转为 error 事件，这里只会是收尾（写库 / 写流）失败
+            logger.error("生成任务 {} 异常: {}", message_id, str(e))
+        finally:
+            watchdog.cancel()
+            with anyio.CancelScope(shield=True):
+                await user_rate_limiter.release(user_id, message_id)
+
+    async def _cancel_when_orphaned(self, message_id: uuid.UUID, task: asyncio.Task) -> None:
+        grace = self._config["orphan_grace"]
+        orphaned_since = None
+        while True:
+            await asyncio.sleep(_ORPHAN_CHECK_INTERVAL)
+            try:
+                watched = await chat_stream_store.has_subscribers(message_id)
+            except RedisError:
+                continue
+            if watched:
+                orphaned_since = None
+                continue
+
+            now = time.monotonic()
+            if orphaned_since is None:
+                orphaned_since = now
+            if now - orphaned_since >= grace:
+                logger.info("生成 {} 已无订阅者，取消生成", message_id)
+                task.cancel()
+                return
+
+
+generation_manager = GenerationManager()
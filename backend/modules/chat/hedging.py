@@ -0,0 +1,180 @@
+"""
+Module-level Singleton: request_hedger
+
+请求对冲：降低偶发的供应商排队对首 token 耗时（TTFT）长尾的影响。
+
+    - 模型开启 hedging_enabled 且关联多个启用的供应商时，先向第一个供应商发起请求
+    - 超过该供应商近期 TTFT 的分位数（默认 p90）仍未收到任何数据块时，向下一个供应商再发起一次请求
+    - 先产出数据块的请求胜出，其余请求立即取消（关闭上游 HTTP 流）；某个请求在出 token 前失败时立即启动下一个
+    - 每次尝试在独立任务中读取上游，写入有界队列；胜出后调用方只从胜出者的队列读取
+
+TTFT 样本只在本进程内按 (模型, 供应商) 滚动统计。被取消的请求记录其已等待的时长，
+作为 TTFT 的下界，避免慢供应商因为总被取消而显得更快。
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import aclosing
+
+from loguru import logger
+
+from config.environment import ChatHedgingConfiguration
+from config.lifecycle import Manageable
+from config.metrics import LLM_HEDGED_REQUESTS_TOTAL
+from modules.llm.adapter import StreamChunk
+
+# 每次尝试读取上游的缓冲块数，胜出者之外的请求在出 token 后即被取消，不会写满
+_QUEUE_SIZE = 256
+# 队列中的结束标记
+_END = object()
+
+
+class _Attempt:
+    """对一个供应商的一次请求，在独立任务中把数据块搬运到队列"""
+
+    def __init__(self, provider: str, chunks: AsyncIterator[StreamChunk]):
+        self.provider = provider
+        self.started = time.monotonic()
+        # 元素为 StreamChunk、_END 或上游抛出的异常
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        self.task = asyncio.create_task(self._pump(chunks))
+
+    async def _pump(self, chunks: AsyncIterator[StreamChunk]) -> None:
+        try:
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    await self.queue.put(chunk)
+        except Exception as e:
+            await self.queue.put(e)
+            return
+        await self.queue.put(_END)
+
+    async def cancel(self) -> None:
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+
+class RequestHedger(Manageable):
+    """按 (模型, 供应商) 统计 TTFT，并在多个供应商之间对冲流式请求"""
+
+    def __init__(self):
+        self._config: ChatHedgingConfiguration | None = None
+        self._samples: dict[tuple[str, str], deque[float]] = {}
+
+    def setup(self, config: ChatHedgingConfiguration) -> None:
+        self._config = config
+
+    async def start(self) -> None:
+        if self._config is None:
+            raise RuntimeError("RequestHedger 未配置，请先调用 setup()")
+
+    async def close(self) -> None:
+        self._samples.clear()
+
+    def threshold(self, model: str, provider: str) -> float:
+        """发起对冲请求前等待的时长：近期 TTFT 的分位数，限制在 [min_delay, max_delay]"""
+        config = self._config
+        samples = self._samples.get((model, provider))
+        if samples is None or len(samples) < config["min_samples"]:
+            delay = config["default_delay"]
+        else:
+            ordered = sorted(samples)
+            delay = ordered[min(len(ordered) - 1, math.ceil(config["quantile"] * len(ordered)) - 1)]
+        return min(max(delay, config["min_delay"]), config["max_delay"])
+
+    def record(self, model: str, provider: str, ttft: float) -> None:
+        samples = self._samples.get((model, provider))
+        if samples is None:
+            samples = self._samples[(model, provider)] = deque(maxlen=self._config["window"])
+        samples.append(ttft)
+
+    async def stream(
+        self,
+        model: str,
+        candidates: list[tuple[str, Callable[[], AsyncIterator[StreamChunk]]]],
+        on_winner: Callable[[str], None] | None = None,
+    ) -> AsyncIterator[StreamChunk]:
+        """按顺序对冲 candidates（供应商名, 创建上游流的函数），产出胜出请求的数据块
+
+        胜出者确定后、产出第一个数据块之前调用 on_winner(供应商名)。
+        所有请求都在出 token 前失败时抛出最后一个异常。
+        """
+        pending = list(candidates[:self._config["max_attempts"]])
+        launched = 0
+        running: list[_Attempt] = []
+        winner: _Attempt | None = None
+        first = None
+        last_error: Exception | None = None
+
+        def launch() -> None:
+            nonlocal launched
+            provider, factory = pending.pop(0)
+            running.append(_Attempt(provider, factory()))
+            launched += 1
+
+        try:
+            launch()
+            while winner is None:
+                if not running:
+                    if not pending:
+                        raise last_error
+                    launch()
+                # 还有备选供应商时，最早发起的请求超过其阈值就再发起一个
+                timeout = None
+                if pending:
+                    oldest = running[0]
+                    deadline = oldest.started + self.threshold(model, oldest.provider)
+                    timeout = max(deadline - time.monotonic(), 0)
+
+                getters = {asyncio.ensure_future(attempt.queue.get()): attempt for attempt in running}
+                done, not_done = await asyncio.wait(getters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for getter in not_done:
+                    getter.cancel()
+                if not done:
+                    logger.info("模型 {} 的供应商 {} 首 token 超过阈值，发起对冲请求", model, running[0].provider)
+                    launch()
+                    continue
+
+                for getter in done:
+                    attempt, item = getters[getter], getter.result()
+                    if isinstance(item, Exception):
+                        logger.warning("模型 {} 的供应商 {} 请求失败: {}", model, attempt.provider, str(item))
+                        running.remove(attempt)
+                        last_error = item
+                    elif winner is None:
+                        winner, first = attempt, item
+
+            self.record(model, winner.provider, time.monotonic() - winner.started)
+            for attempt in running:
+                if attempt is not winner:
+                    self.record(model, attempt.provider, time.monotonic() - attempt.started)
+                    await attempt.cancel()
+            running = [winner]
+            if launched == 1:
+                outcome = "not_hedged"
+            elif winner.provider == candidates[0][0]:
+                outcome = "primary_won"
+            else:
+                outcome = "hedge_won"
+            LLM_HEDGED_REQUESTS_TOTAL.labels(model, outcome).inc()
+            if on_winner is not None:
+                on_winner(winner.provider)
+
+            item = first
+            while item is not _END:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                item = await winner.queue.get()
+        finally:
+            for attempt in running:
+                await attempt.cancel()
+
+
+request_hedger = RequestHedger()
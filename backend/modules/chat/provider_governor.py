@@ -0,0 +1,240 @@
+"""
+Module-level Singleton: provider_governor
+
+按供应商（API Key）限制上游调用，所有 worker 通过 Redis 共享状态，在触发供应商 429 之前排队：
+
+    - 令牌桶：每分钟请求数（rpm_limit）与 token 数（tpm_limit），按 Redis 服务器时间连续补充
+    - 并发上限（max_concurrency）：有序集合中的租约，score 为过期时间；进程崩溃未释放的租约到期后自动回收
+    - 发起请求前原子地检查三项并扣减（Lua 脚本，一次往返）；不满足时按提示的时长重试，
+      最多等待 max_wait 秒，仍未获得许可则抛出 ProviderBusyError
+    - token 按输入字符数与 max_tokens 预估扣减，结束时按上游返回的实际用量多退少补
+
+Redis 不可用时放行（记录日志），限流不应成为聊天的单点故障。
+"""
+
+import asyncio
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from contextlib import aclosing
+
+import anyio
+from loguru import logger
+from redis.exceptions import RedisError
+
+from config.environment import ProviderGovernorConfiguration
+from config.lifecycle import Manageable
+from config.metrics import (
+    LLM_PROVIDER_BUDGET,
+    LLM_PROVIDER_INFLIGHT,
+    LLM_PROVIDER_REJECTIONS_TOTAL,
+    LLM_PROVIDER_WAIT_SECONDS,
+)
+from config.redis import redis_manager
+from models.provider import Provider
+from modules.llm.adapter import ChunkType, LLMConfig, LLMMessage, StreamChunk
+
+# 同一供应商的两个 key 使用相同的 hash tag，保证 Lua 脚本在集群模式下也落在同一个槽
+_KEY_FORMAT = "llm:limit:{{{provider_id}}}:{kind}"
+# 租约在调用总期限之外额外保留的时长（秒）
+_LEASE_MARGIN = 30
+
+# KEYS: 令牌桶 hash, 租约 zset
+# ARGV: rpm, tpm, 并发上限（0 表示不限制）, 预估 token 数, 租约 ID, 租约时长（毫秒）
+# 返回: {是否获得许可, 建议等待毫秒数, 原因, 当前并发数, 剩余请求数, 剩余 token 数}
+_ACQUIRE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local concurrency = tonumber(ARGV[3])
+local cost = math.min(tonumber(ARGV[4]), tpm)
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+local inflight = redis.call('ZCARD', KEYS[2])
+
+local bucket = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts')
+local req = tonumber(bucket[1]) or rpm
+local tok = tonumber(bucket[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(bucket[3]) or now))
+req = math.min(rpm, req + elapsed * rpm / 60000)
+tok = math.min(tpm, tok + elapsed * tpm / 60000)
+
+local wait, reason = 0, ''
+if rpm > 0 and req < 1 then
+    wait, reason = math.ceil((1 - req) * 60000 / rpm), 'requests'
+end
+if tpm > 0 and tok < cost then
+    local token_wait = math.ceil((cost - tok) * 60000 / tpm)
+    if token_wait > wait then
+        wait, reason = token_wait, 'tokens'
+    end
+end
+if concurrency > 0 and inflight >= concurrency and reason == '' then
+    reason = 'concurrency'
+end
+if reason ~= '' then
+    return {0, wait, reason, inflight, math.floor(req), math.floor(tok)}
+end
+
+if rpm > 0 then req = req - 1 end
+if tpm > 0 then tok = tok - cost end
+redis.call('HSET', KEYS[1], 'req', req, 'tok', tok, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+if concurrency > 0 then
+    redis.call('ZADD', KEYS[2], now + tonumber(ARGV[6]), ARGV[5])
+    redis.call('PEXPIRE', KEYS[2], tonumber(ARGV[6]))
+    inflight = inflight + 1
+end
+return {1, 0, '', inflight, math.floor(req), math.floor(tok)}
+"""
+
+# KEYS: 令牌桶 hash, 租约 zset
+# ARGV: 租约 ID, 需要退还的 token 数（实际用量超出预估时为负）, tpm
+# 返回: 当前并发数
+_RELEASE_SCRIPT = """
+redis.call('ZREM', KEYS[2], ARGV[1])
+local refund = tonumber(ARGV[2])
+local tpm = tonumber(ARGV[3])
+if refund ~= 0 and tpm > 0 then
+    local tok = tonumber(redis.call('HGET', KEYS[1], 'tok'))
+    if tok then
+        redis.call('HSET', KEYS[1], 'tok', math.min(tpm, tok + refund))
+    end
+end
+return redis.call('ZCARD', KEYS[2])
+"""
+
+
+_REASON_LABELS = {
+    "requests": "每分钟请求数已达上限",
+    "tokens": "每分钟 token 数已达上限",
+    "concurrency": "并发请求数已达上限",
+}
+
+
+class ProviderBusyError(Exception):
+    """在最大等待时间内未获得供应商的调用许可，reason 为 requests / tokens / concurrency"""
+
+    def __init__(self, provider: str, reason: str, waited: float):
+        self.provider = provider
+        self.reason = reason
+        super().__init__(f"供应商 {provider} 繁忙（{_REASON_LABELS[reason]}），已等待 {waited:.1f} 秒，请稍后重试")
+
+
+def estimate_tokens(messages: list[LLMMessage], config: LLMConfig) -> int:
+    """预估一次调用占用的 token 数：输入按约 3 字符 / token（中英文混合的折中），输出按 max_tokens"""
+    return sum(len(m.content) for m in messages) // 3 + config.max_tokens
+
+
+class ProviderGovernor(Manageable):
+    """供应商调用许可的获取与释放"""
+
+    def __init__(self):
+        self._config: ProviderGovernorConfiguration | None = None
+        self._acquire_script = None
+        self._release_script = None
+
+    def setup(self, config: ProviderGovernorConfiguration) -> None:
+        self._config = config
+
+    async def start(self) -> None:
+        if self._config is None:
+            raise RuntimeError("ProviderGovernor 未配置，请先调用 setup()")
+        self._acquire_script = redis_manager.client.register_script(_ACQUIRE_SCRIPT)
+        self._release_script = redis_manager.client.register_script(_RELEASE_SCRIPT)
+
+    async def close(self) -> None:
+        self._acquire_script = None
+        self._release_script = None
+
+    async def stream(
+        self,
+        provider: Provider,
+        estimated_tokens: int,
+        lease_ttl: float,
+        open_stream: Callable[[], AsyncIterator[StreamChunk]],
+    ) -> AsyncIterator[StreamChunk]:
+        """获得 provider 的调用许可后再调用 open_stream()，结束（含取消）时释放并按实际用量结算 token"""
+        if not (provider.rpm_limit or provider.tpm_limit or provider.max_concurrency):
+            async with aclosing(open_stream()) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+
+        keys = [
+            _KEY_FORMAT.format(provider_id=provider.id, kind="bucket"),
+            _KEY_FORMAT.format(provider_id=provider.id, kind="leases"),
+        ]
+        lease_id = uuid.uuid4().hex
+        acquired = await self._acquire(provider, keys, lease_id, estimated_tokens, lease_ttl)
+        used_tokens = None
+        try:
+            async with aclosing(open_stream()) as chunks:
+                async for chunk in chunks:
+                    if chunk.type == ChunkType.USAGE:
+                        used_tokens = (chunk.usage.get("input_tokens") or 0) + (chunk.usage.get("output_tokens") or 0)
+                    yield chunk
+        finally:
+            if acquired:
+                # 被取消时同样需要释放租约
+                with anyio.CancelScope(shield=True):
+                    refund = estimated_tokens - used_tokens if used_tokens is not None else 0
+                    await self._release(provider, keys, lease_id, refund)
+
+    # ── 内部方法 ──
+
+    async def _acquire(
+        self,
+        provider: Provider,
+        keys: list[str],
+        lease_id: str,
+        estimated_tokens: int,
+        lease_ttl: float,
+    ) -> bool:
+        """等待调用许可，返回是否实际持有租约（Redis 不可用时放行但不持有）"""
+        args = [
+            provider.rpm_limit or 0,
+            provider.tpm_limit or 0,
+            provider.max_concurrency or 0,
+            estimated_tokens,
+            lease_id,
+            int((lease_ttl + _LEASE_MARGIN) * 1000),
+        ]
+        max_wait = self._config["max_wait"]
+        started = time.monotonic()
+        while True:
+            try:
+                granted, wait_ms, reason, inflight, requests_left, tokens_left = await self._acquire_script(
+                    keys=keys, args=args,
+                )
+            except RedisError as e:
+                logger.warning("供应商 {} 限流检查失败，直接放行: {}", provider.name, str(e))
+                return False
+
+            LLM_PROVIDER_INFLIGHT.labels(provider.name).set(inflight)
+            LLM_PROVIDER_BUDGET.labels(provider.name, "requests").set(requests_left)
+            LLM_PROVIDER_BUDGET.labels(provider.name, "tokens").set(tokens_left)
+            waited = time.monotonic() - started
+            if granted:
+                LLM_PROVIDER_WAIT_SECONDS.labels(provider.name).observe(waited)
+                return True
+
+            # 并发已满时没有确定的等待时长，按固定间隔重试
+            delay = wait_ms / 1000 if wait_ms else self._config["retry_interval"]
+            if waited + delay > max_wait:
+                LLM_PROVIDER_REJECTIONS_TOTAL.labels(provider.name, reason).inc()
+                raise ProviderBusyError(provider.name, reason, waited)
+            await asyncio.sleep(delay)
+
+    async def _release(self, provider: Provider, keys: list[str], lease_id: str, refund: int) -> None:
+        try:
+            inflight = await self._release_script(keys=keys, args=[lease_id, refund, provider.tpm_limit or 0])
+        except RedisError as e:
+            # 租约到期后会被自动回收
+            logger.warning("释放供应商 {} 的调用许可失败: {}", provider.name, str(e))
+            return
+        LLM_PROVIDER_INFLIGHT.labels(provider.name).set(inflight)
+
+
+provider_governor = ProviderGovernor()
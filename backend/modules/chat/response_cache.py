@@ -0,0 +1,201 @@
+"""
+Module-level Singleton: llm_response_cache
+
+确定性模型调用的精确匹配缓存（按模型的 cache_enabled 开启）：
+
+    - 只缓存确定性的调用：temperature 为 0 且未开启 thinking（开启后 Anthropic 不接受 temperature、
+      OpenAI 固定为 1），非流式（chat）与流式调用相同。对话按模型配置的 temperature 调用，默认值 1 不缓存；
+      会话标题在开启缓存的模型上固定以 temperature 0 生成（见 chat.service._generate_title），相同对话复用标题
+    - 缓存键：(调用方式, 模型, 规范化后的消息, 影响输出的 LLMConfig 字段) 的 SHA-256；
+      凭证、base_url 和期限不影响输出，不计入，同一模型的不同供应商共享缓存
+    - 查询与调用分为两步：调用方先 get_chat / get_stream 查询，命中时直接使用，不占用准入名额，
+      也不经过上游、限流与对冲；未命中时在获得准入名额后调用 chat / stream，由其调用上游并写入缓存
+    - 流式调用缓存相邻同类块合并后的块序列，命中时一次性全部产出
+    - 只缓存正常结束的调用；超过 max_entry_bytes 的响应不缓存
+    - 条目按 TTL 过期，条目数超过 max_entries 时淘汰最早写入的条目（写入与淘汰在一个 Lua 脚本中完成）
+
+所有条目使用同一个 hash tag，保证淘汰脚本在集群模式下落在同一个槽。Redis 不可用时直接调用上游。
+"""
+
+import hashlib
+import json
+import unicodedata
+from collections.abc import AsyncIterator, Callable
+from contextlib import aclosing
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from config.environment import LLMResponseCacheConfiguration
+from config.lifecycle import Manageable
+from config.metrics import LLM_CACHE_REQUESTS_TOTAL
+from config.redis import redis_manager
+from modules.llm.adapter import ChunkType, LLMAdapter, LLMConfig, LLMMessage, LLMResponse, StreamChunk
+
+_KEY_PREFIX = "llm:cache:{response}:"
+_INDEX_KEY = "llm:cache:{response}:index"
+
+# KEYS: 条目, 写入时间索引 zset
+# ARGV: 条目内容, TTL（秒）, 条目数上限
+_STORE_SCRIPT = """
+local _DEL_BATCH = 500
+local now = tonumber(redis.call('TIME')[1])
+local ttl = tonumber(ARGV[2])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+redis.call('ZADD', KEYS[2], now, KEYS[1])
+redis.call('EXPIRE', KEYS[2], ttl)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - ttl)
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[3])
+if excess > 0 then
+    local evicted = redis.call('ZRANGE', KEYS[2], 0, excess - 1)
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+    -- 分批删除：unpack 的参数个数受 Lua 栈大小限制，调小 max_entries 后一次淘汰的条目可能很多
+    for i = 1, #evicted, _DEL_BATCH do
+        redis.call('DEL', unpack(evicted, i, math.min(i + _DEL_BATCH - 1, #evicted)))
+    end
+end
+"""
+
+
+class LLMResponseCache(Manageable):
+    """模型响应缓存的读取与写入"""
+
+    def __init__(self):
+        self._config: LLMResponseCacheConfiguration | None = None
+        self._store_script = None
+
+    def setup(self, config: LLMResponseCacheConfiguration) -> None:
+        self._config = config
+
+    async def start(self) -> None:
+        if self._config is None:
+            raise RuntimeError("LLMResponseCache 未配置，请先调用 setup()")
+        self._store_script = redis_manager.client.register_script(_STORE_SCRIPT)
+
+    async def close(self) -> None:
+        self._store_script = None
+
+    async def get_chat(
+        self,
+        enabled: bool,
+        messages: list[LLMMessage],
+        config: LLMConfig,
+    ) -> LLMResponse | None:
+        """查询非流式调用的缓存，未开启、调用不确定或未命中时返回 None；命中的响应不带 usage（没有产生上游用量）"""
+        if not enabled or not _deterministic(config):
+            return None
+        cached = await self._get(self._key("chat", messages, config), "chat", config.model)
+        if cached is None:
+            return None
+        return LLMResponse(content=cached["content"], model=cached["model"], thinking=cached["thinking"])
+
+    async def chat(
+        self,
+        enabled: bool,
+        adapter: LLMAdapter,
+        messages: list[LLMMessage],
+        config: LLMConfig,
+    ) -> LLMResponse:
+        """未命中缓存时的非流式调用（先用 get_chat 查询）：调用上游，enabled 且调用是确定性的时写入缓存"""
+        response = await adapter.chat(messages, config)
+        if enabled and _deterministic(config):
+            await self._put(
+                self._key("chat", messages, config),
+                {"content": response.content, "model": response.model, "thinking": response.thinking},
+            )
+        return response
+
+    async def get_stream(
+        self,
+        enabled: bool,
+        messages: list[LLMMessage],
+        config: LLMConfig,
+    ) -> list[StreamChunk] | None:
+        """查询流式调用的缓存，命中时返回合并后的块序列，未开启、调用不确定或未命中时返回 None"""
+        if not enabled or not _deterministic(config):
+            return None
+        cached = await self._get(self._key("stream", messages, config), "stream", config.model)
+        if cached is None:
+            return None
+        return [StreamChunk(ChunkType(chunk_type), content) for chunk_type, content in cached["chunks"]]
+
+    async def stream(
+        self,
+        enabled: bool,
+        messages: list[LLMMessage],
+        config: LLMConfig,
+        open_stream: Callable[[], AsyncIterator[StreamChunk]],
+    ) -> AsyncIterator[StreamChunk]:
+        """未命中缓存时的流式调用（先用 get_stream 查询）：调用 open_stream()，enabled 且调用是确定性的时记录块序列"""
+        if not enabled or not _deterministic(config):
+            async with aclosing(open_stream()) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+
+        key = self._key("stream", messages, config)
+
+        # [[类型, 内容], ...]，超过大小上限后放弃记录（置为 None）
+        recorded: list[list[str]] | None = []
+        size = 0
+        async with aclosing(open_stream()) as chunks:
+            async for chunk in chunks:
+                if recorded is not None and chunk.type != ChunkType.USAGE:
+                    size += len(chunk.content)
+                    if size > self._config["max_entry_bytes"]:
+                        recorded = None
+                    elif recorded and recorded[-1][0] == chunk.type.value:
+                        recorded[-1][1] += chunk.content
+                    else:
+                        recorded.append([chunk.type.value, chunk.content])
+                yield chunk
+        if recorded:
+            await self._put(key, {"chunks": recorded})
+
+    # ── 内部方法 ──
+
+    @staticmethod
+    def _key(kind: str, messages: list[LLMMessage], config: LLMConfig) -> str:
+        material = {
+            "kind": kind,
+            "model": config.model,
+            "messages": [[m.role, _normalize(m.content)] for m in messages],
+            "temperature": config.temperature,
+            "max_tokens": config.max_tokens,
+            "thinking": config.thinking_budget_tokens if config.thinking_enabled else None,
+        }
+        digest = hashlib.sha256(json.dumps(material, ensure_ascii=False, sort_keys=True).encode()).hexdigest()
+        return f"{_KEY_PREFIX}{digest}"
+
+    async def _get(self, key: str, kind: str, model: str) -> dict | None:
+        try:
+            value = await redis_manager.client.get(key)
+        except RedisError as e:
+            logger.warning("读取模型响应缓存失败: {}", str(e))
+            return None
+        LLM_CACHE_REQUESTS_TOTAL.labels(model, kind, "miss" if value is None else "hit").inc()
+        return None if value is None else json.loads(value)
+
+    async def _put(self, key: str, entry: dict) -> None:
+        value = json.dumps(entry, ensure_ascii=False)
+        if len(value.encode()) > self._config["max_entry_bytes"]:
+            return
+        try:
+            await self._store_script(
+                keys=[key, _INDEX_KEY],
+                args=[value, self._config["ttl"], self._config["max_entries"]],
+            )
+        except RedisError as e:
+            logger.warning("写入模型响应缓存失败: {}", str(e))
+
+
+def _deterministic(config: LLMConfig) -> bool:
+    return config.temperature == 0 and not config.thinking_enabled
+
+
+def _normalize(content: str) -> str:
+    """统一 Unicode 形式与换行符，去掉首尾空白，仅在这些方面不同的输入视为相同"""
+    return unicodedata.normalize("NFC", content).replace("\r\n", "\n").strip()
+
+
+llm_response_cache = LLMResponseCache()
@@ -1,16 +1,22 @@
-"""聊天模块路由 — 只保留 SSE 流式对话"""
+"""聊天模块路由 — SSE 流式对话（生成在后台任务中进行，接口只负责订阅事件流）"""
 
-from fastapi import APIRouter, Depends
+import uuid
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.postgres import get_postgres_session
+
 from models.conversation import Conversation
 from models.user import User
 from modules.user.dependencies import get_current_user
-from modules.chat.dependencies import get_user_conversation
-from modules.chat.schema import NewChatRequest, ContinueChatRequest
-from modules.chat.service import stream_chat
+from modules.chat.dependencies import ChatAdmission, admit_generation, get_user_conversation
+from modules.chat.schema import NewChatRequest, ContinueChatRequest, CompareChatRequest
+from modules.chat.generation import generation_manager
+from modules.chat.service import select_variant
+from modules.chat.stream_store import chat_stream_store
+from modules.chat.streaming import cancel_on_disconnect
 
 router = APIRouter(
     prefix="/api/chat",
@@ -22,41 +28,150 @@ router = APIRouter(
 @router.post("/conversations")
 async def api_new_chat(
     data: NewChatRequest,
+    request: Request,
     current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_postgres_session),
+    idempotency_key: str | None = Header(None, min_length=1, max_length=255),
 ):
-    """创建新会话并发送首条消息"""
-    return StreamingResponse(
-        stream_chat(
-            session=session,
+    """创建新会话并发送首条消息（支持 Idempotency-Key）"""
+    admission = await admit_generation(request, current_user, data, idempotency_key)
+    if not admission.replayed:
+        generation_manager.submit(
             user_id=current_user.id,
             model=data.model,
             content=data.content,
             thinking_enabled=data.thinking_enabled,
             conversation_id=None,
-        ),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
-    )
+            message_id=admission.message_id,
+            idempotency_key=admission.idempotency_key,
+            user_role=current_user.role,
+        )
+    return _generation_response(request, admission)
 
 
 @router.post("/conversations/{conversation_id}/messages")
 async def api_continue_chat(
     data: ContinueChatRequest,
+    request: Request,
     conversation: Conversation = Depends(get_user_conversation),
     current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_postgres_session),
+    idempotency_key: str | None = Header(None, min_length=1, max_length=255),
 ):
-    """在已有会话中续聊"""
-    return StreamingResponse(
-        stream_chat(
-            session=session,
+    """在已有会话中续聊（支持 Idempotency-Key）"""
+    admission = await admit_generation(request, current_user, data, idempotency_key)
+    if not admission.replayed:
+        generation_manager.submit(
             user_id=current_user.id,
             model=data.model,
             content=data.content,
             thinking_enabled=data.thinking_enabled,
             conversation_id=conversation.id,
-        ),
+            message_id=admission.message_id,
+            idempotency_key=admission.idempotency_key,
+            user_role=current_user.role,
+        )
+    return _generation_response(request, admission)
+
+
+@router.post("/comparisons")
+async def api_new_comparison(
+    data: CompareChatRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    idempotency_key: str | None = Header(None, min_length=1, max_length=255),
+):
+    """创建新会话，同一条消息并发发给多个模型；各模型的事件带 model 字段，在同一个事件流中推送"""
+    admission = await admit_generation(request, current_user, data, idempotency_key)
+    if not admission.replayed:
+        generation_manager.submit_comparison(
+            user_id=current_user.id,
+            models=data.models,
+            content=data.content,
+            thinking_enabled=data.thinking_enabled,
+            conversation_id=None,
+            stream_id=admission.message_id,
+            idempotency_key=admission.idempotency_key,
+            user_role=current_user.role,
+        )
+    return _generation_response(request, admission)
+
+
+@router.post("/conversations/{conversation_id}/comparisons")
+async def api_continue_comparison(
+    data: CompareChatRequest,
+    request: Request,
+    conversation: Conversation = Depends(get_user_conversation),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: str | None = Header(None, min_length=1, max_length=255),
+):
+    """在已有会话中发起多模型对比"""
+    admission = await admit_generation(request, current_user, data, idempotency_key)
+    if not admission.replayed:
+        generation_manager.submit_comparison(
+            user_id=current_user.id,
+            models=data.models,
+            content=data.content,
+            thinking_enabled=data.thinking_enabled,
+            conversation_id=conversation.id,
+            stream_id=admission.message_id,
+            idempotency_key=admission.idempotency_key,
+            user_role=current_user.role,
+        )
+    return _generation_response(request, admission)
+
+
+@router.post("/messages/{message_id}/select")
+async def api_select_variant(
+    message_id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_postgres_session),
+):
+    """选定多模型对比中的一条回复：其余回复被舍弃，仍在生成的随即取消"""
+    discarded = await select_variant(session, message_id, current_user.id)
+    return {"message_id": message_id, "discarded": discarded}
+
+
+@router.get("/conversations/{conversation_id}/generation")
+async def api_get_active_generation(
+    conversation: Conversation = Depends(get_user_conversation),
+):
+    """查询会话中进行中的生成，返回的 message_id 可用于订阅其事件流"""
+    message_id = await chat_stream_store.active_generation(conversation.id)
+    if message_id is None:
+        raise HTTPException(status_code=404, detail="该会话没有进行中的生成")
+    return {"message_id": message_id}
+
+
+@router.get("/messages/{message_id}/stream")
+async def api_resume_stream(
+    message_id: uuid.UUID,
+    request: Request,
+    last_event_id: int = Header(0, ge=0),
+    current_user: User = Depends(get_current_user),
+):
+    """订阅一次生成：补发 Last-Event-ID 之后的事件，并跟随进行中的生成直到结束
+
+    用于断线续传，以及在其他标签页 / 设备上观看同一次生成。
+    """
+    owner = await chat_stream_store.owner(message_id)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="生成流不存在或已过期")
+    if owner != str(current_user.id):
+        raise HTTPException(status_code=403, detail="无权访问该消息")
+
+    return StreamingResponse(
+        cancel_on_disconnect(request, chat_stream_store.subscribe(message_id, last_event_id)),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+def _generation_response(request: Request, admission: ChatAdmission) -> StreamingResponse:
+    """从头订阅本次生成；幂等重试时附带 Idempotent-Replayed 头"""
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if admission.replayed:
+        headers["Idempotent-Replayed"] = "true"
+    return StreamingResponse(
+        cancel_on_disconnect(request, chat_stream_store.subscribe(admission.message_id)),
+        media_type="text/event-stream",
+        headers=headers,
+    )
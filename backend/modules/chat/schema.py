@@ -1,6 +1,8 @@
 """聊天模块请求模型"""
 
-from pydantic import BaseModel, Field
+from typing import Annotated
+
+from pydantic import BaseModel, Field, field_validator
 
 
 class _ChatRequestBase(BaseModel):
@@ -18,3 +20,17 @@ class NewChatRequest(_ChatRequestBase):
 class ContinueChatRequest(_ChatRequestBase):
     """续聊请求（conversation_id 从路径参数获取）"""
     pass
+
+
+class CompareChatRequest(BaseModel):
+    """多模型对比请求：同一条消息并发发给多个模型（新会话或续聊，conversation_id 从路径参数获取）"""
+    models: list[Annotated[str, Field(min_length=1, max_length=100)]] = Field(min_length=2, max_length=4)
+    content: str = Field(min_length=1, max_length=50000)
+    thinking_enabled: bool = False
+
+    @field_validator("models")
+    @classmethod
+    def _unique_models(cls, models: list[str]) -> list[str]:
+        if len(set(models)) != len(models):
+            raise ValueError("对比的模型不能重复")
+        return models
@@ -1,47 +1,77 @@
 """聊天业务逻辑 — 流式聊天编排"""
 
-import json
+import asyncio
+import dataclasses
 import uuid
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import aclosing
 from datetime import datetime, timezone
+from functools import partial
 
 from fastapi import HTTPException
 from loguru import logger
-from sqlalchemy import select, func
+from redis.exceptions import RedisError
+from sqlalchemy import select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
+from config.metrics import LLMStreamMetrics
+from config.postgres import postgres_manager
+from config.tracing import tracer
 from models.conversation import Conversation, Message, MessageRole, MessageStatus
 from models.model import Model
 from models.model_provider_link import ModelProviderLink
 from models.provider import Provider
-from modules.llm.adapter import ChunkType, LLMConfig, LLMMessage
+from models.user import UserRole
+from modules.chat import sse
+from modules.chat.admission import AdmissionPriority, AdmissionRejectedError, admission_scheduler
+from modules.chat.checkpoint import ReplyBuffer, message_checkpointer
+from modules.chat.hedging import request_hedger
+from modules.chat.provider_governor import ProviderBusyError, estimate_tokens, provider_governor
+from modules.chat.response_cache import llm_response_cache
+from modules.chat.stream_store import ChatStreamWriter, chat_stream_store
+from modules.chat.user_limiter import user_rate_limiter
+from modules.llm.adapter import ChunkType, LLMAdapter, LLMConfig, LLMMessage, StreamChunk
+from modules.llm.deadline import LLMTimeoutError
 from modules.llm.registry import get_adapter
 
+# 检查对比回复是否已被舍弃的间隔（秒）
+_DISCARD_CHECK_INTERVAL = 1.0
 
-async def stream_chat(
+
+async def generate_chat_reply(
     session: AsyncSession,
+    message_id: uuid.UUID,
     user_id: uuid.UUID,
     model: str,
     content: str,
     thinking_enabled: bool = False,
     conversation_id: uuid.UUID | None = None,
-) -> AsyncIterator[str]:
-    """流式聊天核心流程，yield SSE 格式事件
+    idempotency_key: str | None = None,
+    user_role: str = UserRole.USER.value,
+) -> None:
+    """聊天生成核心流程，在后台任务中运行（见 generation），事件写入 message_id 对应的事件流
 
     conversation_id 为空时自动创建新会话。
+    被取消（无订阅者或进程关闭）时关闭上游流，
+    已生成的部分内容标记为 ABORTED 后提交，尚未开始的标题生成直接跳过。
+    生成过程中按检查点节流写入部分内容（见 checkpoint），worker 崩溃时不会丢失全部回复。
+    上游容量不足时先在准入队列中排队（见 admission），排队位置以 queued 事件推送。
     """
     assistant_msg = None
-    full_content = ""
-    full_thinking = ""
+    stream = chat_stream_store.writer(message_id, user_id, idempotency_key)
+    reply = message_checkpointer.buffer(message_id)
 
     try:
         # 1. 解析模型和供应商
-        resolved_model, provider = await _resolve_model(session, model)
+        with tracer.span("chat.resolve_model", model=model):
+            resolved_model, providers = await _resolve_model(session, model)
+        provider = providers[0]
 
         # 2. 获取或创建会话
         if conversation_id is not None:
-            conversation = await _get_user_conversation(session, conversation_id, user_id)
+            with tracer.span("chat.ownership_check"):
+                conversation = await _get_user_conversation(session, conversation_id, user_id)
         else:
             conversation = Conversation(
                 user_id=user_id,
@@ -51,77 +81,65 @@ async def stream_chat(
             session.add(conversation)
             await session.flush()
             # 通知前端新会话 ID
-            yield _sse_event({
-                "type": "conversation_created",
-                "conversation_id": str(conversation.id),
-            })
+            await stream.emit(sse.conversation_created_event(str(conversation.id)))
 
         # 3. 获取适配器
         adapter = get_adapter(resolved_model.manufacturer)
 
-        # 4. 计算下一个 order
-        next_order = await _get_next_order(session, conversation.id)
-
-        # 5. 保存用户消息
-        user_msg = Message(
-            conversation_id=conversation.id,
-            user_id=user_id,
-            order=next_order,
-            role=MessageRole.USER.value,
-            content=content,
-            status=MessageStatus.COMPLETED.value,
-        )
-        session.add(user_msg)
-        await session.flush()
+        with tracer.span("chat.insert_messages"):
+            # 4. 计算下一个 order
+            next_order = await _get_next_order(session, conversation.id)
 
-        # 6. 创建助手消息占位
-        assistant_msg = Message(
-            conversation_id=conversation.id,
-            user_id=user_id,
-            order=next_order + 1,
-            role=MessageRole.ASSISTANT.value,
-            content="",
-            model=resolved_model.name,
-            status=MessageStatus.GENERATING.value,
-        )
-        session.add(assistant_msg)
-        await session.flush()
+            # 5. 保存用户消息
+            user_msg = Message(
+                conversation_id=conversation.id,
+                user_id=user_id,
+                order=next_order,
+                role=MessageRole.USER.value,
+                content=content,
+                status=MessageStatus.COMPLETED.value,
+            )
+            session.add(user_msg)
+            await session.flush()
+
+            # 6. 创建助手消息占位
+            assistant_msg = Message(
+                id=message_id,
+                conversation_id=conversation.id,
+                user_id=user_id,
+                order=next_order + 1,
+                role=MessageRole.ASSISTANT.value,
+                content="",
+                model=resolved_model.name,
+                status=MessageStatus.GENERATING.value,
+            )
+            session.add(assistant_msg)
+            # 提前提交消息行，生成过程中的检查点才有行可写
+            await session.commit()
+
+        await stream.mark_active(conversation.id)
+        await stream.emit(sse.message_created_event(str(assistant_msg.id), str(conversation.id)))
 
         # 7. 构建历史消息上下文
-        history = await _build_message_context(session, conversation.id)
+        with tracer.span("chat.build_context") as span:
+            history = await _build_message_context(session, conversation.id)
+            span.set_attribute("history.messages", len(history))
 
         # 8. 构建 LLM 配置
-        base_url = (provider.base_url_map or {}).get(resolved_model.manufacturer)
-        config = LLMConfig(
-            api_key=provider.api_key,
-            base_url=base_url,
-            model=resolved_model.name,
-            temperature=1.0,
-            max_tokens=4096,
-            thinking_enabled=thinking_enabled,
-        )
+        config = _llm_config(resolved_model, provider, thinking_enabled)
 
-        # 9. 流式调用 LLM
-        async for chunk in adapter.stream(history, config):
-            if chunk.type == ChunkType.THINKING:
-                full_thinking += chunk.content
-                yield _sse_event({"type": "thinking", "content": chunk.content})
-            else:
-                full_content += chunk.content
-                yield _sse_event({"type": "chunk", "content": chunk.content})
+        # 9. 获得上游调用名额后流式调用 LLM（名额不足时排队）
+        await _stream_reply(stream.emit, reply, adapter, resolved_model, providers, history, config, user_id, user_role)
 
         # 10. 完成：更新助手消息
+        full_content = reply.content
+        full_thinking = reply.thinking
         assistant_msg.content = full_content
         assistant_msg.thinking = full_thinking or None
         assistant_msg.status = MessageStatus.COMPLETED.value
         await session.flush()
 
-        yield _sse_event({
-            "type": "done",
-            "message_id": str(assistant_msg.id),
-            "full_content": full_content,
-            "thinking": full_thinking or None,
-        })
+        await stream.emit(sse.done_event(str(assistant_msg.id), full_content, full_thinking or None))
 
         # 11. 更新会话元数据
         conversation.last_model = resolved_model.name
@@ -131,31 +149,502 @@ async def stream_chat(
         # 12. 首条消息时自动生成标题
         if conversation.title is None:
             try:
-                title = await _generate_title(adapter, config, content, full_content)
+                # 标题是后台调用，排在其他用户的对话之后；排队失败时跳过
+                with tracer.span("chat.generate_title"):
+                    title = await _generate_title(
+                        adapter, config, content, full_content, user_id, user_role, resolved_model.cache_enabled,
+                    )
                 conversation.title = title
                 await session.flush()
-                yield _sse_event({"type": "title", "title": title})
+                await stream.emit(sse.title_event(title))
             except Exception:
                 logger.warning("自动生成会话标题失败，跳过")
 
-        await session.commit()
+        with tracer.span("chat.commit"):
+            await session.commit()
+
+    except asyncio.CancelledError:
+        logger.info("流式聊天已取消，保存已生成的部分内容")
+        await _save_partial(session, assistant_msg, reply)
+        raise
+
+    except LLMTimeoutError as e:
+        # 上游卡住：期限内已关闭上游流，部分内容标记为 ABORTED
+        logger.warning("模型 {} 响应超时（{}）", model, e.phase)
+        await _save_partial(session, assistant_msg, reply)
+        await stream.emit(sse.error_event(str(e), code="upstream_timeout"))
+
+    except ProviderBusyError as e:
+        # 排队超时：尚未调用上游，消息标记为 ABORTED，前端可提示稍后重试
+        logger.warning("供应商 {} 繁忙（{}），放弃本次生成", e.provider, e.reason)
+        await _save_partial(session, assistant_msg, reply)
+        await stream.emit(sse.error_event(str(e), code="provider_busy"))
+
+    except AdmissionRejectedError as e:
+        # 过载：尚未调用上游，消息标记为 ABORTED，前端可提示稍后重试
+        logger.warning("准入队列拒绝本次生成（{}）", e.reason)
+        await _save_partial(session, assistant_msg, reply)
+        await stream.emit(sse.error_event(str(e), code="overloaded"))
 
     except Exception as e:
         logger.error("流式聊天异常: {}", str(e))
-        # 标记助手消息为中止（保留部分内容）
+        await _save_partial(session, assistant_msg, reply)
+        await stream.emit(sse.error_event(str(e)))
+
+    finally:
+        await stream.close()
         if assistant_msg is not None:
-            assistant_msg.content = full_content
-            assistant_msg.thinking = full_thinking or None
-            assistant_msg.status = MessageStatus.ABORTED.value
+            await chat_stream_store.clear_active(assistant_msg.conversation_id, message_id)
+
+
+@dataclasses.dataclass
+class _Variant:
+    """多模型对比中一个模型的回复"""
+    message: Message
+    model: Model
+    providers: list[Provider]
+    adapter: LLMAdapter
+    config: LLMConfig
+
+
+async def generate_comparison_replies(
+    session: AsyncSession,
+    stream_id: uuid.UUID,
+    user_id: uuid.UUID,
+    models: list[str],
+    content: str,
+    thinking_enabled: bool = False,
+    conversation_id: uuid.UUID | None = None,
+    idempotency_key: str | None = None,
+    user_role: str = UserRole.USER.value,
+) -> None:
+    """多模型对比：同一条用户消息并发请求多个模型，在后台任务中运行（见 generation）
+
+    各模型的回复保存为同一 order 下的兄弟助手消息（variant 按 models 顺序从 0 递增），
+    事件加上 model 字段后写入 stream_id 对应的同一个事件流（见 sse.with_model）。
+    单个模型失败只结束该模型的回复；用户选定回复后其余回复被舍弃（见 select_variant），仍在生成的随即取消。
+    """
+    stream = chat_stream_store.writer(stream_id, user_id, idempotency_key)
+    conversation = None
+    variants: list[_Variant] = []
+
+    try:
+        with tracer.span("chat.resolve_model", model=",".join(models)):
+            resolved = [await _resolve_model(session, name) for name in models]
+
+        if conversation_id is not None:
+            with tracer.span("chat.ownership_check"):
+                conversation = await _get_user_conversation(session, conversation_id, user_id)
+        else:
+            conversation = Conversation(
+                user_id=user_id,
+                title=None,
+                last_model=resolved[0][0].name,
+            )
+            session.add(conversation)
+            await session.flush()
+            await stream.emit(sse.conversation_created_event(str(conversation.id)))
+
+        with tracer.span("chat.insert_messages"):
+            next_order = await _get_next_order(session, conversation.id)
+            session.add(Message(
+                conversation_id=conversation.id,
+                user_id=user_id,
+                order=next_order,
+                role=MessageRole.USER.value,
+                content=content,
+                status=MessageStatus.COMPLETED.value,
+            ))
+            await session.flush()
+
+            for index, (model, providers) in enumerate(resolved):
+                message = Message(
+                    id=uuid.uuid4(),
+                    conversation_id=conversation.id,
+                    user_id=user_id,
+                    order=next_order + 1,
+                    variant=index,
+                    role=MessageRole.ASSISTANT.value,
+                    content="",
+                    model=model.name,
+                    status=MessageStatus.GENERATING.value,
+                )
+                session.add(message)
+                variants.append(_Variant(
+                    message=message,
+                    model=model,
+                    providers=providers,
+                    adapter=get_adapter(model.manufacturer),
+                    config=_llm_config(model, providers[0], thinking_enabled),
+                ))
+            await session.commit()
+
+        await stream.mark_active(conversation.id)
+        for variant in variants:
+            await stream.emit(sse.with_model(
+                sse.message_created_event(str(variant.message.id), str(conversation.id)), variant.model.name,
+            ))
+
+        with tracer.span("chat.build_context") as span:
+            history = await _build_message_context(session, conversation.id)
+            span.set_attribute("history.messages", len(history))
+
+        # 各模型独立排队、调用上游，互不等待
+        replies = await asyncio.gather(*(
+            _generate_variant(stream, variant, history, user_id, user_role) for variant in variants
+        ))
+
+        completed = [(variant, reply) for variant, reply in zip(variants, replies) if reply is not None]
+        conversation.last_chat_time = datetime.now(timezone.utc)
+        if completed:
+            conversation.last_model = completed[0][0].model.name
+        await session.flush()
+
+        # 首条消息时用第一个完成的回复生成标题
+        if conversation.title is None and completed:
+            variant, reply = completed[0]
             try:
-                await session.commit()
+                with tracer.span("chat.generate_title"):
+                    title = await _generate_title(
+                        variant.adapter, variant.config, content, reply, user_id, user_role,
+                        variant.model.cache_enabled,
+                    )
+                conversation.title = title
+                await session.flush()
+                await stream.emit(sse.title_event(title))
             except Exception:
-                logger.error("标记消息中止失败")
-        yield _sse_event({"type": "error", "detail": str(e)})
+                logger.warning("自动生成会话标题失败，跳过")
+
+        with tracer.span("chat.commit"):
+            await session.commit()
+
+    except asyncio.CancelledError:
+        logger.info("多模型对比已取消")
+        await _abort_generating(session, variants)
+        raise
+
+    except Exception as e:
+        logger.error("多模型对比异常: {}", str(e))
+        await _abort_generating(session, variants)
+        await stream.emit(sse.error_event(str(e)))
+
+    finally:
+        await stream.close()
+        if conversation is not None:
+            await chat_stream_store.clear_active(conversation.id, stream_id)
+
+
+async def select_variant(
+    session: AsyncSession,
+    message_id: uuid.UUID,
+    user_id: uuid.UUID,
+) -> list[uuid.UUID]:
+    """选定多模型对比中的一条回复，其余回复标记为 DISCARDED（不再作为上下文），返回被舍弃的消息 ID
+
+    仍在生成的回复先在 Redis 中标记，由生成方（可能在其他 worker 上）取消并落库为 DISCARDED；
+    标记先于更新写入，生成方落库后再检查标记，两边交错时回复也不会停留在 COMPLETED。
+    """
+    result = await session.execute(select(Message).where(Message.id == message_id))
+    message = result.scalar_one_or_none()
+
+    if message is None:
+        raise HTTPException(status_code=404, detail="消息不存在")
+    if message.user_id != user_id:
+        raise HTTPException(status_code=403, detail="无权访问该消息")
+    if message.status == MessageStatus.DISCARDED.value:
+        raise HTTPException(status_code=409, detail="该回复已被舍弃")
+    # 生成中 / 已中止的回复内容不完整，不能作为后续对话的上下文
+    if message.status != MessageStatus.COMPLETED.value:
+        raise HTTPException(status_code=409, detail="只能选择已完成的回复")
+
+    result = await session.execute(
+        select(Message.id).where(
+            Message.conversation_id == message.conversation_id,
+            Message.order == message.order,
+            Message.role == MessageRole.ASSISTANT.value,
+            Message.id != message.id,
+            Message.status != MessageStatus.DISCARDED.value,
+        )
+    )
+    siblings = list(result.scalars().all())
+    if not siblings:
+        return []
+
+    await chat_stream_store.discard(siblings)
+    await session.execute(
+        update(Message)
+        .where(
+            Message.id.in_(siblings),
+            Message.status != MessageStatus.GENERATING.value,
+        )
+        .values(status=MessageStatus.DISCARDED.value)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return siblings
 
 
 # ── 内部方法 ──
 
+async def _generate_variant(
+    stream: ChatStreamWriter,
+    variant: _Variant,
+    history: list[LLMMessage],
+    user_id: uuid.UUID,
+    user_role: str,
+) -> str | None:
+    """生成多模型对比中的一条回复，使用独立的数据库会话落库；完成时返回回复内容，否则返回 None
+
+    被舍弃时（见 select_variant）只取消本条回复，部分内容标记为 DISCARDED。
+    """
+    message_id = variant.message.id
+    model = variant.model.name
+    reply = message_checkpointer.buffer(message_id)
+    status = MessageStatus.ABORTED
+
+    async def emit(payload: bytes) -> None:
+        await stream.emit(sse.with_model(payload, model))
+
+    try:
+        # 不限时的 timeout 作为取消点：被舍弃时由检查任务立即触发，只取消本条回复，退出时转为 TimeoutError
+        async with asyncio.timeout(None) as discard:
+            watchdog = asyncio.create_task(_cancel_when_discarded(message_id, discard))
+            try:
+                await _stream_reply(
+                    emit, reply, variant.adapter, variant.model, variant.providers, history, variant.config,
+                    user_id, user_role,
+                )
+            finally:
+                watchdog.cancel()
+        status = MessageStatus.COMPLETED
+    except asyncio.CancelledError:
+        await _save_variant(message_id, reply, status)
+        raise
+    except Exception as e:
+        if not discard.expired():
+            logger.warning("多模型对比中模型 {} 生成失败: {}", model, str(e))
+            await _save_variant(message_id, reply, status)
+            await emit(sse.error_event(str(e), code=_error_code(e)))
+            return None
+        status = MessageStatus.DISCARDED
+
+    await _save_variant(message_id, reply, status)
+    if status == MessageStatus.DISCARDED:
+        await emit(sse.error_event("已选择其他回复", code="discarded"))
+        return None
+    await emit(sse.done_event(str(message_id), reply.content, reply.thinking or None))
+    return reply.content
+
+
+async def _cancel_when_discarded(message_id: uuid.UUID, discard: asyncio.Timeout) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(_DISCARD_CHECK_INTERVAL)
+        try:
+            discarded = await chat_stream_store.is_discarded(message_id)
+        except RedisError:
+            continue
+        if discarded:
+            logger.info("对比回复 {} 已被舍弃，取消生成", message_id)
+            discard.reschedule(loop.time())
+            return
+
+
+async def _save_variant(message_id: uuid.UUID, reply: ReplyBuffer, status: MessageStatus) -> None:
+    """写入对比回复的最终内容与状态；写入后回复已被舍弃时改为 DISCARDED（见 select_variant）"""
+    values = {"content": reply.content, "thinking": reply.thinking or None, "status": status.value}
+    try:
+        async with postgres_manager.session_factory() as session:
+            await session.execute(
+                update(Message)
+                .where(Message.id == message_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            if status != MessageStatus.DISCARDED and await chat_stream_store.is_discarded(message_id):
+                await session.execute(
+                    update(Message)
+                    .where(Message.id == message_id)
+                    .values(status=MessageStatus.DISCARDED.value)
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+    except Exception as e:
+        logger.error("保存对比回复 {} 失败: {}", message_id, str(e))
+
+
+async def _abort_generating(session: AsyncSession, variants: list[_Variant]) -> None:
+    """对比在开始生成前中断时，把仍为 GENERATING 的回复标记为中止"""
+    if not variants:
+        return
+    try:
+        await session.execute(
+            update(Message)
+            .where(
+                Message.id.in_([variant.message.id for variant in variants]),
+                Message.status == MessageStatus.GENERATING.value,
+            )
+            .values(status=MessageStatus.ABORTED.value)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+    except Exception:
+        logger.error("标记对比回复中止失败")
+
+
+def _error_code(e: Exception) -> str:
+    """生成失败的原因对应的 error 事件 code（见 sse.error_event）"""
+    if isinstance(e, LLMTimeoutError):
+        return "upstream_timeout"
+    if isinstance(e, ProviderBusyError):
+        return "provider_busy"
+    if isinstance(e, AdmissionRejectedError):
+        return "overloaded"
+    return "generation_failed"
+
+
+async def _stream_reply(
+    emit: Callable[[bytes], Awaitable[None]],
+    reply: ReplyBuffer,
+    adapter: LLMAdapter,
+    resolved_model: Model,
+    providers: list[Provider],
+    history: list[LLMMessage],
+    config: LLMConfig,
+    user_id: uuid.UUID,
+    user_role: str,
+) -> None:
+    """获得上游调用名额后流式调用 LLM，增量写入 reply 并通过 emit 推送事件
+
+    config 为首选供应商（providers[0]）的调用配置。名额不足时先排队，排队位置以 queued 事件推送。
+    """
+    provider = providers[0]
+
+    # 缓存命中时直接推送，不占用准入名额，也不经过上游、限流与对冲
+    cached = await llm_response_cache.get_stream(resolved_model.cache_enabled, history, config)
+    if cached is not None:
+        for chunk in cached:
+            await _deliver(emit, reply, chunk)
+        return
+
+    async def on_queued(position: int) -> None:
+        await emit(sse.queued_event(position))
+
+    async with admission_scheduler.slot(user_id, user_role, AdmissionPriority.INTERACTIVE, on_queued):
+        stream_metrics = LLMStreamMetrics(resolved_model.name, provider.name)
+        stream_metrics.start()
+        # 无订阅者时生成任务被取消（CancelledError），不会进入下方 except
+        outcome = "aborted"
+        used_tokens = 0
+        try:
+            with tracer.span("chat.generate", model=resolved_model.name, provider=provider.name) as span:
+                def open_stream(p: Provider) -> Callable[[], AsyncIterator[StreamChunk]]:
+                    # 先获得供应商的调用许可（限流 / 并发上限）再发起上游请求
+                    llm_config = config if p is provider else _llm_config(resolved_model, p, config.thinking_enabled)
+                    return partial(
+                        provider_governor.stream,
+                        p,
+                        estimate_tokens(history, llm_config),
+                        llm_config.total_timeout,
+                        partial(adapter.stream, history, llm_config),
+                    )
+
+                def open_upstream() -> AsyncIterator[StreamChunk]:
+                    if resolved_model.hedging_enabled and len(providers) > 1:
+                        def on_winner(provider_name: str) -> None:
+                            stream_metrics.rebind(provider_name)
+                            span.set_attribute("provider", provider_name)
+
+                        return request_hedger.stream(
+                            resolved_model.name,
+                            [(p.name, open_stream(p)) for p in providers],
+                            on_winner=on_winner,
+                        )
+                    return open_stream(provider)()
+
+                # 未命中缓存：调用上游，确定性的调用记录到缓存
+                chunks = llm_response_cache.stream(resolved_model.cache_enabled, history, config, open_upstream)
+                # aclosing 保证取消时立即关闭上游 HTTP 流，而不是等适配器生成器被回收
+                async with aclosing(chunks) as upstream:
+                    async for chunk in upstream:
+                        if chunk.type == ChunkType.USAGE:
+                            stream_metrics.on_usage(chunk.usage)
+                            used_tokens += (chunk.usage.get("input_tokens") or 0) + (chunk.usage.get("output_tokens") or 0)
+                            continue
+                        stream_metrics.on_chunk(chunk.type)
+                        await _deliver(emit, reply, chunk)
+            outcome = "completed"
+        except LLMTimeoutError:
+            outcome = "timeout"
+            raise
+        except ProviderBusyError:
+            outcome = "busy"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            stream_metrics.finish(outcome)
+            # 中止的生成同样计入用户的 token 用量（上游已按实际输出计费）
+            await user_rate_limiter.record_tokens(user_id, used_tokens)
+
+
+async def _deliver(emit: Callable[[bytes], Awaitable[None]], reply: ReplyBuffer, chunk: StreamChunk) -> None:
+    """把 thinking / text 块写入 reply 并推送事件，到达检查点间隔时落库"""
+    if chunk.type == ChunkType.THINKING:
+        reply.append_thinking(chunk.content)
+        await emit(sse.thinking_event(chunk.content))
+    else:
+        reply.append_content(chunk.content)
+        await emit(sse.chunk_event(chunk.content))
+    if reply.due():
+        await reply.checkpoint()
+
+
+def _llm_config(model: Model, provider: Provider, thinking_enabled: bool) -> LLMConfig:
+    """模型 + 供应商对应的调用配置"""
+    return LLMConfig(
+        api_key=provider.api_key,
+        base_url=(provider.base_url_map or {}).get(model.manufacturer),
+        model=model.name,
+        temperature=model.temperature,
+        max_tokens=4096,
+        thinking_enabled=thinking_enabled,
+        **_model_timeouts(model),
+    )
+
+
+def _model_timeouts(model: Model) -> dict[str, float]:
+    """模型上配置的调用期限，未配置的项使用 LLMConfig 默认值"""
+    timeouts = {
+        "connect_timeout": model.connect_timeout,
+        "first_token_timeout": model.first_token_timeout,
+        "idle_timeout": model.idle_timeout,
+        "total_timeout": model.total_timeout,
+    }
+    return {name: value for name, value in timeouts.items() if value is not None}
+
+
+async def _save_partial(
+    session: AsyncSession,
+    assistant_msg: Message | None,
+    reply: ReplyBuffer,
+) -> None:
+    """生成中断时提交已有数据：生成中的助手消息标记为中止（保留部分内容），
+    已完成的消息（如在生成标题时中断）保持原状态"""
+    if assistant_msg is None:
+        return
+    if assistant_msg.status == MessageStatus.GENERATING.value:
+        assistant_msg.content = reply.content
+        assistant_msg.thinking = reply.thinking or None
+        assistant_msg.status = MessageStatus.ABORTED.value
+    try:
+        await session.commit()
+    except Exception:
+        logger.error("标记消息中止失败")
+
+
 async def _get_user_conversation(
     session: AsyncSession,
     conversation_id: uuid.UUID,
@@ -178,8 +667,8 @@ async def _get_user_conversation(
 async def _resolve_model(
     session: AsyncSession,
     model_name: str,
-) -> tuple[Model, Provider]:
-    """通过 ModelProviderLink 查找第一个启用的模型+供应商组合"""
+) -> tuple[Model, list[Provider]]:
+    """通过 ModelProviderLink 查找启用的模型及其所有启用的供应商，第一个为首选供应商"""
     result = await session.execute(
         select(ModelProviderLink)
         .options(
@@ -194,13 +683,15 @@ async def _resolve_model(
         .join(Provider)
         .where(Provider.is_enabled.is_(True))
         .where(ModelProviderLink.is_enabled.is_(True))
+        # 按关联的创建顺序，首选供应商保持稳定
+        .order_by(ModelProviderLink.created_at)
     )
     links = result.unique().scalars().all()
 
     if not links:
         raise HTTPException(status_code=404, detail=f"无可用模型: {model_name}")
 
-    return links[0].model, links[0].provider
+    return links[0].model, [link.provider for link in links]
 
 
 async def _get_next_order(
@@ -220,17 +711,25 @@ async def _build_message_context(
     session: AsyncSession,
     conversation_id: uuid.UUID,
 ) -> list[LLMMessage]:
-    """加载会话中已完成的消息作为上下文"""
+    """加载会话中已完成的消息作为上下文
+
+    多模型对比尚未选定回复时，同一 order 下只取 variant 最小的已完成回复。
+    """
     result = await session.execute(
         select(Message)
         .where(
             Message.conversation_id == conversation_id,
             Message.status == MessageStatus.COMPLETED.value,
         )
-        .order_by(Message.order.asc())
+        .order_by(Message.order.asc(), Message.variant.asc())
     )
-    messages = result.scalars().all()
-    return [LLMMessage(role=m.role, content=m.content) for m in messages]
+    context = []
+    last_order = None
+    for m in result.scalars().all():
+        if m.order != last_order:
+            context.append(LLMMessage(role=m.role, content=m.content))
+            last_order = m.order
+    return context
 
 
 async def _generate_title(
@@ -238,27 +737,27 @@ async def _generate_title(
     config: LLMConfig,
     user_content: str,
     assistant_content: str,
+    user_id: uuid.UUID,
+    user_role: str,
+    cache_enabled: bool = False,
 ) -> str:
-    """使用 LLM 生成会话标题"""
+    """使用 LLM 生成会话标题，未命中缓存时作为后台调用排在其他用户的对话之后
+
+    模型开启缓存时标题固定以 temperature 0 生成（输出确定，可缓存），相同的对话直接复用标题，不占用准入名额；
+    未开启时沿用模型的 temperature（部分推理模型只接受默认值）。
+    """
     prompt = (
         "请根据以下对话内容，生成一个简短的会话标题（不超过20个字，不要加引号和标点）：\n\n"
         f"用户：{user_content[:500]}\n"
         f"助手：{assistant_content[:500]}"
     )
     title_messages = [LLMMessage(role="user", content=prompt)]
-    title_config = LLMConfig(
-        api_key=config.api_key,
-        base_url=config.base_url,
-        model=config.model,
-        temperature=config.temperature,
-        max_tokens=config.max_tokens,
-        thinking_enabled=False,
-    )
-    response = await adapter.chat(title_messages, title_config)
+    title_config = dataclasses.replace(config, thinking_enabled=False)
+    if cache_enabled:
+        title_config = dataclasses.replace(title_config, temperature=0)
+    response = await llm_response_cache.get_chat(cache_enabled, title_messages, title_config)
+    if response is None:
+        async with admission_scheduler.slot(user_id, user_role, AdmissionPriority.BACKGROUND):
+            response = await llm_response_cache.chat(cache_enabled, adapter, title_messages, title_config)
     title = response.content.strip().strip('"\'""''')
     return title[:200]
-
-
-def _sse_event(data: dict) -> str:
-    """构建 SSE 格式事件"""
-    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,116 @@
+"""聊天事件的序列化与 SSE 帧构建
+
+事件结构固定，热路径上（chunk / thinking，每秒可达数千次）不构造字典：
+预先编码好 JSON 的固定前缀，只对内容字符串做一次 JSON 转义后拼接为 bytes。
+字符串转义优先使用 orjson，未安装时退回标准库 json 的 C 实现。
+"""
+
+import json
+from json.encoder import encode_basestring
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+    _loads = json.loads
+
+
+def _json_str_orjson(value: str) -> bytes:
+    try:
+        return orjson.dumps(value)
+    except orjson.JSONEncodeError:
+        # 含孤立代理项等无法编码为 UTF-8 的字符串，退回 ASCII 转义
+        return json.dumps(value).encode()
+
+
+def _json_str_stdlib(value: str) -> bytes:
+    try:
+        return encode_basestring(value).encode()
+    except UnicodeEncodeError:
+        return json.dumps(value).encode()
+
+
+# 两种实现的输出逐字节一致（见 tests/test_sse.py）
+_json_str = _json_str_orjson if orjson is not None else _json_str_stdlib
+
+
+def _json_str_or_null(value: str | None) -> bytes:
+    return b"null" if value is None else _json_str(value)
+
+
+_CHUNK_PREFIX = b'{"type":"chunk","content":'
+_THINKING_PREFIX = b'{"type":"thinking","content":'
+_TITLE_PREFIX = b'{"type":"title","title":'
+_ERROR_PREFIX = b'{"type":"error","detail":'
+_CONVERSATION_CREATED_PREFIX = b'{"type":"conversation_created","conversation_id":'
+_MESSAGE_CREATED_PREFIX = b'{"type":"message_created","message_id":'
+_DONE_PREFIX = b'{"type":"done","message_id":'
+_QUEUED_PREFIX = b'{"type":"queued","position":'
+
+
+def chunk_event(content: str) -> bytes:
+    return _CHUNK_PREFIX + _json_str(content) + b"}"
+
+
+def thinking_event(content: str) -> bytes:
+    return _THINKING_PREFIX + _json_str(content) + b"}"
+
+
+def title_event(title: str) -> bytes:
+    return _TITLE_PREFIX + _json_str(title) + b"}"
+
+
+def error_event(detail: str, code: str = "generation_failed") -> bytes:
+    """code 供前端区分错误类型：upstream_timeout（上游模型超时）/ provider_busy（供应商限流排队超时）/
+    overloaded（准入队列已满或排队超时）/ discarded（对比中已选择其他回复）/ generation_failed（其他错误）"""
+    return _ERROR_PREFIX + _json_str(detail) + b',"code":' + _json_str(code) + b"}"
+
+
+def conversation_created_event(conversation_id: str) -> bytes:
+    return _CONVERSATION_CREATED_PREFIX + _json_str(conversation_id) + b"}"
+
+
+def message_created_event(message_id: str, conversation_id: str) -> bytes:
+    return (
+        _MESSAGE_CREATED_PREFIX + _json_str(message_id)
+        + b',"conversation_id":' + _json_str(conversation_id) + b"}"
+    )
+
+
+def queued_event(position: int) -> bytes:
+    """等待上游调用名额时的排队位置（从 1 开始），0 表示排队结束、开始生成"""
+    return _QUEUED_PREFIX + b"%d}" % position
+
+
+def done_event(message_id: str, full_content: str, thinking: str | None) -> bytes:
+    return (
+        _DONE_PREFIX + _json_str(message_id)
+        + b',"full_content":' + _json_str(full_content)
+        + b',"thinking":' + _json_str_or_null(thinking) + b"}"
+    )
+
+
+def with_model(payload: bytes, model: str) -> bytes:
+    """多模型对比时为事件加上 model 字段，前端据此把事件分发到对应模型的回复"""
+    return b'{"model":' + _json_str(model) + b"," + payload[1:]
+
+
+def merge_deltas(first: bytes, second: bytes) -> bytes | None:
+    """把两个相邻的同类增量事件（chunk / thinking）合并为一个，类型不同或非增量事件返回 None"""
+    for prefix, build in ((_CHUNK_PREFIX, chunk_event), (_THINKING_PREFIX, thinking_event)):
+        if first.startswith(prefix) and second.startswith(prefix):
+            return build(_loads(first)["content"] + _loads(second)["content"])
+    return None
+
+
+# ── SSE 帧 ──
+
+KEEPALIVE_FRAME = b": keep-alive\n\n"
+
+
+def frame(payload: bytes, event_id: int | None = None) -> bytes:
+    """构建 SSE 帧，payload 为已编码的 JSON"""
+    if event_id is None:
+        return b"data: " + payload + b"\n\n"
+    return b"id: %d\ndata: %s\n\n" % (event_id, payload)
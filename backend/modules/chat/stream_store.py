@@ -0,0 +1,475 @@
+"""
+Module-level Singleton: chat_stream_store
+
+聊天生成事件的存储与分发：
+
+    - 续传流：每次生成的 SSE 事件按顺序写入 Redis Stream（key: chat:stream:{message_id}），
+      事件 id 即 SSE 的 ``id:`` 字段。客户端断线后携带 Last-Event-ID 重新订阅，从断点之后补发
+    - 实时推送：写入 Stream 的同时 PUBLISH 到 chat:live:{message_id}。每个 worker 只持有一条
+      pub/sub 连接，按频道分发给本进程内的订阅者，观看者再多也不会增加 Redis 连接数
+
+    - Stream 条目 id 固定为 ``{seq}-0``，seq 从 1 递增，与 SSE id 一致
+    - 第一条事件额外写入 user_id 字段，续传时用于校验归属（生成过程中消息行尚未提交，无法查库）
+    - 每次写入都刷新 TTL（与写入在同一个 pipeline 中，不额外往返），生成持续多久事件流就保留多久；
+      生成结束（完成 / 出错 / 取消）后追加一条 end 标记，从此时起保留 ttl 秒。
+      会话的进行中标记与幂等键随事件流一起续期
+    - pub/sub 不保证送达：订阅者发现 seq 不连续或长时间无消息时，回到 Stream 补齐
+    - 生成方只写 Redis，不等待任何订阅者；每个订阅者有独立的有界缓冲区（SubscriberBuffer），
+      慢客户端写满时按策略合并增量事件，或清空缓冲区后从 Stream 补读，单个连接的内存占用有上限
+
+使用方式：
+    1. app.py 启动时调用 chat_stream_store.setup(config)，并交给 LifeSpan 管理
+    2. 生成方通过 chat_stream_store.writer(message_id, user_id, idempotency_key) 写入事件，
+       mark_active() 登记为会话中进行中的生成
+    3. 订阅方通过 owner() 校验归属、subscribe() 读取事件（客户端断开时调用 ChatSubscription.close()）；
+       active_generation() 查询会话中进行中的生成
+    4. 带 Idempotency-Key 的请求先通过 claim_idempotency_key() 登记（连同请求体指纹），
+       重试的请求得到原生成的消息 ID 与请求体指纹，指纹一致时直接订阅
+    5. 多模型对比中选定回复后，通过 discard() 标记其余回复，生成方用 is_discarded() 检查并取消（可能在其他 worker 上）
+"""
+
+import asyncio
+import hashlib
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator
+
+import anyio
+from loguru import logger
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
+
+from config.environment import ChatStreamConfiguration
+from config.lifecycle import Manageable
+from config.metrics import CHAT_SUBSCRIBER_OVERFLOWS_TOTAL
+from config.redis import redis_manager
+from modules.chat import sse
+
+_STREAM_PREFIX = "chat:stream:"
+_CHANNEL_PREFIX = "chat:live:"
+# 会话 -> 进行中的生成（助手消息 ID），供其他标签页 / 设备发现并订阅
+_ACTIVE_PREFIX = "chat:active:"
+# (用户, 接口, Idempotency-Key) -> 该请求对应的生成（助手消息 ID）
+_IDEMPOTENCY_PREFIX = "chat:idempotency:"
+# 被舍弃的对比回复（助手消息 ID），生成方检查到后取消生成
+_DISCARD_PREFIX = "chat:discard:"
+# 订阅者超过该时长未收到事件时发送 SSE 注释保活，并回到 Stream 检查是否漏收
+_KEEPALIVE_INTERVAL = 15
+# 新生成尚未写入第一条事件时，订阅者最多等待的时长
+_START_TIMEOUT = 60
+_READ_COUNT = 200
+# 合并后单个增量事件的大小上限，超过后不再合并，按 DROP 处理
+_MAX_COALESCED_BYTES = 64 * 1024
+
+
+class ChatStreamWriter:
+    """单次生成的事件写入器，写入失败时记录日志后继续生成（订阅者会在保活检查时发现流中断）
+
+    多模型对比时多个协程共用一个写入器，emit() 按顺序写入，保证 Stream 条目 id 递增。
+    """
+
+    def __init__(
+        self,
+        store: "ChatStreamStore",
+        message_id: uuid.UUID,
+        user_id: uuid.UUID,
+        idempotency_key: str | None = None,
+    ):
+        self._store = store
+        self._message_id = str(message_id)
+        self._key = f"{_STREAM_PREFIX}{message_id}"
+        self._channel = f"{_CHANNEL_PREFIX}{message_id}"
+        self._user_id = str(user_id)
+        self._seq = 0
+        self._lock = asyncio.Lock()
+        # 随事件流一起续期的 key：幂等键、会话的进行中标记
+        self._renewed = [idempotency_key] if idempotency_key else []
+
+    async def mark_active(self, conversation_id: uuid.UUID) -> None:
+        """登记为会话中进行中的生成，供其他标签页 / 设备发现并订阅"""
+        key = f"{_ACTIVE_PREFIX}{conversation_id}"
+        await redis_manager.client.set(key, self._message_id, ex=self._store.ttl)
+        self._renewed.append(key)
+
+    async def emit(self, payload: bytes) -> None:
+        """写入一条事件，payload 为 sse 模块编码好的 JSON"""
+        async with self._lock:
+            self._seq += 1
+            fields = {"event": payload}
+            if self._seq == 1:
+                fields["user_id"] = self._user_id
+            await self._append(fields, b"%d %s" % (self._seq, payload))
+
+    async def close(self) -> None:
+        """追加结束标记，订阅方读到后结束响应"""
+        async with self._lock:
+            if self._seq:
+                self._seq += 1
+                await self._append({"end": "1"}, b"%d" % self._seq)
+
+    async def _append(self, fields: dict, message: bytes) -> None:
+        redis = redis_manager.client
+        try:
+            # 同一连接上按顺序执行：订阅方收到推送时，该事件一定已经在 Stream 中
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.xadd(self._key, fields, id=f"{self._seq}-0")
+                # 每次写入都续期：生成可能比 ttl 更久（total_timeout 默认 900 秒），只在首条事件设置会在生成中途过期
+                for key in (self._key, *self._renewed):
+                    pipe.expire(key, self._store.ttl)
+                pipe.publish(self._channel, message)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("写入聊天事件失败 ({}): {}", self._key, str(e))
+
+
+class SubscriberBuffer:
+    """单个订阅者的有界缓冲区，由 pub/sub 读取循环写入、订阅者的 SSE 响应读取
+
+    元素为 (first_seq, last_seq, payload)，payload 为 None 表示结束。写满时：
+        - COALESCE：相邻的同类增量事件合并为一个（覆盖 first_seq~last_seq），无法合并时按 DROP 处理
+        - DROP：清空缓冲区并标记 overflowed，订阅者随后从 Stream 按断点补读，期间的推送直接丢弃
+    """
+
+    def __init__(self, max_events: int, policy: str):
+        self._items: deque[tuple[int, int, bytes | None]] = deque()
+        self._max_events = max_events
+        self._policy = policy
+        self._ready = asyncio.Event()
+        self.overflowed = False
+        self.closed = False
+
+    def push(self, seq: int, payload: bytes | None) -> None:
+        if self.overflowed or self.closed:
+            return
+        if len(self._items) < self._max_events:
+            self._items.append((seq, seq, payload))
+        elif self._policy == "COALESCE" and self._coalesce(seq, payload):
+            CHAT_SUBSCRIBER_OVERFLOWS_TOTAL.labels("coalesce").inc()
+        else:
+            self._items.clear()
+            self.overflowed = True
+            CHAT_SUBSCRIBER_OVERFLOWS_TOTAL.labels("drop").inc()
+        self._ready.set()
+
+    def close(self) -> None:
+        """结束订阅，唤醒正在等待的订阅者"""
+        self.closed = True
+        self._items.clear()
+        self._ready.set()
+
+    async def get(self, timeout: float) -> tuple[int, int, bytes | None] | None:
+        """取出下一个元素；超时，或因溢出 / 关闭被唤醒时返回 None"""
+        if not self._items:
+            if self.overflowed or self.closed:
+                return None
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except TimeoutError:
+                return None
+            if not self._items:
+                return None
+        return self._items.popleft()
+
+    def _coalesce(self, seq: int, payload: bytes | None) -> bool:
+        """新事件能并入队尾时直接合并；否则（如 done / 结束标记）合并离队尾最近的一对增量事件，腾出位置后追加"""
+        items = self._items
+        item = (seq, seq, payload)
+        merged = self._merge(items[-1], item)
+        if merged is not None:
+            items[-1] = merged
+            return True
+        for i in range(len(items) - 1, 0, -1):
+            merged = self._merge(items[i - 1], items[i])
+            if merged is not None:
+                items[i - 1] = merged
+                del items[i]
+                items.append(item)
+                return True
+        return False
+
+    @staticmethod
+    def _merge(
+        first: tuple[int, int, bytes | None],
+        second: tuple[int, int, bytes | None],
+    ) -> tuple[int, int, bytes] | None:
+        first_seq, first_last, first_payload = first
+        second_first, second_last, second_payload = second
+        if first_payload is None or second_payload is None or first_last != second_first - 1:
+            return None
+        if len(first_payload) + len(second_payload) > _MAX_COALESCED_BYTES:
+            return None
+        merged = sse.merge_deltas(first_payload, second_payload)
+        if merged is None:
+            return None
+        return first_seq, second_last, merged
+
+
+class ChatSubscription:
+    """一次订阅：异步迭代得到 SSE 帧，close() 可在任意时刻结束迭代（如客户端断开）"""
+
+    def __init__(self, store: "ChatStreamStore", message_id: uuid.UUID, last_event_id: int):
+        self._store = store
+        self._message_id = message_id
+        self._last_event_id = last_event_id
+        self._buffer = store._new_buffer()
+        self._frames = self._run()
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._frames
+
+    def close(self) -> None:
+        self._buffer.close()
+
+    async def aclose(self) -> None:
+        await self._frames.aclose()
+
+    async def _run(self) -> AsyncIterator[bytes]:
+        key = f"{_STREAM_PREFIX}{self._message_id}"
+        channel = f"{_CHANNEL_PREFIX}{self._message_id}"
+        buffer = self._buffer
+        # 先订阅再读 Stream，保证两者之间发布的事件不会漏掉
+        await self._store._attach(channel, buffer)
+        started = time.monotonic()
+        last = self._last_event_id
+        caught_up = False
+        try:
+            while not buffer.closed:
+                if buffer.overflowed:
+                    # 缓冲区写满后被清空，先恢复接收推送，再从 Stream 补读（重复的事件按 seq 跳过）
+                    buffer.overflowed = False
+                    caught_up = False
+                if not caught_up:
+                    entries = await self._store._read_after(key, last)
+                    for seq, payload in entries:
+                        if payload is None:
+                            return
+                        last = seq
+                        yield sse.frame(payload.encode(), seq)
+                    caught_up = len(entries) < _READ_COUNT
+                    continue
+
+                item = await buffer.get(_KEEPALIVE_INTERVAL)
+                if item is None:
+                    if buffer.closed or buffer.overflowed:
+                        continue
+                    caught_up = False
+                    if not await redis_manager.client.exists(key) and (
+                        last > 0 or time.monotonic() - started > _START_TIMEOUT
+                    ):
+                        return
+                    yield sse.KEEPALIVE_FRAME
+                    continue
+
+                first_seq, seq, payload = item
+                if seq <= last:
+                    continue
+                if first_seq != last + 1:
+                    # 推送丢失（如 pub/sub 重连）或合并事件与已发送的部分重叠，回到 Stream 补齐
+                    caught_up = False
+                    continue
+                if payload is None:
+                    return
+                last = seq
+                yield sse.frame(payload, seq)
+        finally:
+            await self._store._detach(channel, buffer)
+
+
+class ChatStreamStore(Manageable):
+    """事件流的读写入口与本进程的 pub/sub 分发"""
+
+    def __init__(self):
+        self._config: ChatStreamConfiguration | None = None
+        self._pubsub: PubSub | None = None
+        self._listener: asyncio.Task | None = None
+        # 频道 -> 本进程内订阅者的缓冲区
+        self._buffers: dict[str, set[SubscriberBuffer]] = {}
+
+    def setup(self, config: ChatStreamConfiguration) -> None:
+        self._config = config
+
+    @property
+    def ttl(self) -> int:
+        return self._config["ttl"]
+
+    async def start(self) -> None:
+        if self._config is None:
+            raise RuntimeError("ChatStreamStore 未配置，请先调用 setup()")
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._buffers.clear()
+
+    def writer(
+        self, message_id: uuid.UUID, user_id: uuid.UUID, idempotency_key: str | None = None,
+    ) -> ChatStreamWriter:
+        """idempotency_key 为本次生成登记的幂等键（见 idempotency_key()），生成期间随事件流续期"""
+        return ChatStreamWriter(self, message_id, user_id, idempotency_key)
+
+    async def owner(self, message_id: uuid.UUID) -> str | None:
+        """返回生成该消息的用户 ID，流不存在或已过期时返回 None"""
+        entries = await redis_manager.client.xrange(f"{_STREAM_PREFIX}{message_id}", count=1)
+        if not entries:
+            return None
+        _, fields = entries[0]
+        return fields.get("user_id")
+
+    async def clear_active(self, conversation_id: uuid.UUID, message_id: uuid.UUID) -> None:
+        key = f"{_ACTIVE_PREFIX}{conversation_id}"
+        # 只清除自己写入的标记，避免覆盖同一会话中更新的生成
+        if await redis_manager.client.get(key) == str(message_id):
+            await redis_manager.client.delete(key)
+
+    async def active_generation(self, conversation_id: uuid.UUID) -> str | None:
+        return await redis_manager.client.get(f"{_ACTIVE_PREFIX}{conversation_id}")
+
+    @staticmethod
+    def idempotency_key(user_id: uuid.UUID, path: str, key: str) -> str:
+        """(用户, 接口, Idempotency-Key) 对应的 Redis key"""
+        digest = hashlib.sha256(f"{path}\n{key}".encode()).hexdigest()
+        return f"{_IDEMPOTENCY_PREFIX}{user_id}:{digest}"
+
+    async def claim_idempotency_key(
+        self, user_id: uuid.UUID, path: str, key: str, message_id: uuid.UUID, fingerprint: str,
+    ) -> tuple[uuid.UUID, str] | None:
+        """登记幂等键对应的生成及请求体指纹；同一键已登记过时返回原来的 (消息 ID, 请求体指纹)，
+        Redis 不可用时按未登记处理
+
+        键在生成期间随事件流续期（见 ChatStreamWriter），生成结束后与事件流同时过期，因此键存在时原生成的事件一定还能补发。
+        """
+        redis_key = self.idempotency_key(user_id, path, key)
+        try:
+            claimed = await redis_manager.client.set(redis_key, f"{message_id} {fingerprint}", nx=True, ex=self.ttl)
+            if claimed:
+                return None
+            existing = await redis_manager.client.get(redis_key)
+        except RedisError as e:
+            logger.warning("登记幂等键失败，按新请求处理: {}", str(e))
+            return None
+        # 两次调用之间键恰好过期时，按新请求处理
+        if not existing:
+            return None
+        existing_id, _, existing_fingerprint = existing.partition(" ")
+        return uuid.UUID(existing_id), existing_fingerprint
+
+    async def release_idempotency_key(
+        self, user_id: uuid.UUID, path: str, key: str, message_id: uuid.UUID,
+    ) -> None:
+        """请求未能启动生成（如被限流）时撤销登记，客户端稍后可以用同一个键重试"""
+        redis_key = self.idempotency_key(user_id, path, key)
+        try:
+            existing = await redis_manager.client.get(redis_key)
+            if existing is not None and existing.partition(" ")[0] == str(message_id):
+                await redis_manager.client.delete(redis_key)
+        except RedisError as e:
+            logger.warning("撤销幂等键失败: {}", str(e))
+
+    async def discard(self, message_ids: list[uuid.UUID]) -> None:
+        """标记被舍弃的对比回复，进行中的生成在下一次检查时取消"""
+        if not message_ids:
+            return
+        async with redis_manager.client.pipeline(transaction=False) as pipe:
+            for message_id in message_ids:
+                pipe.set(f"{_DISCARD_PREFIX}{message_id}", "1", ex=self.ttl)
+            await pipe.execute()
+
+    async def is_discarded(self, message_id: uuid.UUID) -> bool:
+        return bool(await redis_manager.client.exists(f"{_DISCARD_PREFIX}{message_id}"))
+
+    async def has_subscribers(self, message_id: uuid.UUID) -> bool:
+        """任意 worker 上是否还有该生成的订阅者"""
+        channel = f"{_CHANNEL_PREFIX}{message_id}"
+        if self._buffers.get(channel):
+            return True
+        # 每个 worker 对同一频道最多订阅一次，NUMSUB 即正在观看的 worker 数
+        [(_, count)] = await redis_manager.client.pubsub_numsub(channel)
+        return count > 0
+
+    def subscribe(self, message_id: uuid.UUID, last_event_id: int = 0) -> ChatSubscription:
+        """补发 last_event_id 之后的事件，然后跟随实时推送直到结束标记"""
+        return ChatSubscription(self, message_id, last_event_id)
+
+    # ── 内部方法 ──
+
+    async def _read_after(self, key: str, last: int) -> list[tuple[int, str | None]]:
+        entries = await redis_manager.client.xrange(key, min=f"({last}-0", count=_READ_COUNT)
+        return [
+            (int(entry_id.split("-", 1)[0]), fields.get("event"))
+            for entry_id, fields in entries
+        ]
+
+    def _new_buffer(self) -> SubscriberBuffer:
+        return SubscriberBuffer(self._config["subscriber_buffer"], self._config["overflow_policy"])
+
+    async def _attach(self, channel: str, buffer: SubscriberBuffer) -> None:
+        buffers = self._buffers.get(channel)
+        if buffers is None:
+            buffers = self._buffers[channel] = set()
+            if self._pubsub is None:
+                self._pubsub = redis_manager.client.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(channel)
+            if self._listener is None:
+                self._listener = asyncio.create_task(self._listen())
+        buffers.add(buffer)
+
+    async def _detach(self, channel: str, buffer: SubscriberBuffer) -> None:
+        buffers = self._buffers.get(channel)
+        if buffers is None:
+            return
+        buffers.discard(buffer)
+        if not buffers:
+            del self._buffers[channel]
+            # 响应被取消时同样需要退订，否则频道一直留在本进程的 pub/sub 连接上
+            with anyio.CancelScope(shield=True):
+                try:
+                    await self._pubsub.unsubscribe(channel)
+                except RedisError as e:
+                    logger.warning("取消订阅 {} 失败: {}", channel, str(e))
+
+    async def _listen(self) -> None:
+        """本进程唯一的 pub/sub 读取循环，断线时由 redis-py 重连并恢复订阅
+
+        循环退出后本进程的所有订阅者都收不到推送，因此任何异常都只记录，不结束循环（取消除外）。
+        """
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except RedisError as e:
+                logger.warning("聊天事件订阅连接异常: {}", str(e))
+                await asyncio.sleep(1)
+                continue
+            except Exception as e:
+                logger.error("读取聊天事件订阅失败: {!r}", e)
+                await asyncio.sleep(1)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            try:
+                self._dispatch(message)
+            except Exception as e:
+                logger.error("分发聊天事件失败（频道 {}）: {!r}", message.get("channel"), e)
+
+    def _dispatch(self, message: dict) -> None:
+        """把一条推送交给订阅该频道的所有缓冲区"""
+        buffers = self._buffers.get(message["channel"])
+        if not buffers:
+            return
+        seq, _, payload = message["data"].partition(" ")
+        # 每条推送只编码一次，所有订阅者共享
+        data = payload.encode() if payload else None
+        for buffer in buffers:
+            buffer.push(int(seq), data)
+
+
+chat_stream_store = ChatStreamStore()
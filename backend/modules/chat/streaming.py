@@ -0,0 +1,48 @@
+"""SSE 响应与事件订阅之间的桥接：客户端断开时立即结束订阅"""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+from fastapi import Request
+from loguru import logger
+
+from modules.chat.stream_store import ChatSubscription
+
+
+async def cancel_on_disconnect(
+    request: Request,
+    subscription: ChatSubscription,
+) -> AsyncIterator[bytes]:
+    """逐帧转发订阅，客户端断开时立即结束订阅
+
+    只依赖 StreamingResponse 时，断开要等到下一次写入失败才会被发现（thinking 阶段可能长达数十秒）。
+    这里单独监听 http.disconnect 并立即退订，后台生成在所有订阅者离开后被取消（见 generation），
+    由 generate_chat_reply 关闭上游连接并把已生成的部分内容标记为 ABORTED。
+
+    订阅直接在响应任务中迭代，中间不再有额外队列：客户端读得慢时 send() 阻塞，
+    积压只留在订阅者的有界缓冲区中（见 SubscriberBuffer）。
+    """
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    watcher.add_done_callback(lambda _: _on_disconnect(watcher, subscription))
+
+    try:
+        async for frame in subscription:
+            yield frame
+    finally:
+        watcher.cancel()
+        await subscription.aclose()
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # 请求体已被 FastAPI 读完，此后 receive() 只会返回 http.disconnect
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+def _on_disconnect(watcher: asyncio.Task, subscription: ChatSubscription) -> None:
+    if watcher.cancelled():
+        return
+    logger.info("客户端已断开，结束订阅")
+    subscription.close()
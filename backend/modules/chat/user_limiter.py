@@ -0,0 +1,168 @@
+"""
+Module-level Singleton: user_rate_limiter
+
+按用户（限额按角色配置）限制聊天生成，所有 worker 通过 Redis 共享状态：
+
+    - 请求数 / token 数：滑动窗口计数（当前窗口计数 + 上一窗口计数按剩余比例加权），每个用户只占一个 hash
+    - token 在生成结束后按上游返回的实际用量计入（见 record_tokens），超过上限后新的请求被拒绝，直到窗口滑过
+    - 同时进行中的生成数：有序集合中的租约（租约 ID 即助手消息 ID），生成结束时释放，进程崩溃时到期回收
+    - 三项检查与扣减在一个 Lua 脚本中完成，每次请求一次往返；被拒绝时给出 Retry-After 建议
+
+Redis 不可用时放行（记录日志）。
+"""
+
+import math
+import uuid
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from config.environment import ChatUserLimitConfiguration
+from config.lifecycle import Manageable
+from config.metrics import CHAT_USER_LIMIT_REJECTIONS_TOTAL
+from config.redis import redis_manager
+
+# 同一用户的两个 key 使用相同的 hash tag，保证 Lua 脚本在集群模式下也落在同一个槽
+_KEY_FORMAT = "chat:limit:{{{user_id}}}:{kind}"
+# 生成租约的保留时长（秒），长于任何一次生成；正常情况下在生成结束时释放
+_LEASE_TTL = 1800
+# 同时进行中的生成数超限时建议的重试间隔（秒），无法预知其他生成何时结束
+_STREAMS_RETRY_AFTER = 5
+
+# KEYS: 计数 hash, 生成租约 zset
+# ARGV: 窗口毫秒数, 请求数上限, token 数上限, 生成数上限（0 表示不限制）, 租约 ID, 租约毫秒数
+# 返回: {是否放行, 原因, 建议等待毫秒数}
+_ADMIT_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[1])
+local request_limit = tonumber(ARGV[2])
+local token_limit = tonumber(ARGV[3])
+local stream_limit = tonumber(ARGV[4])
+
+local index = math.floor(now / window)
+-- 上一个窗口计入的比例，即当前窗口剩余的比例
+local weight = 1 - (now % window) / window
+
+-- 计数加上 1 后超过上限时，返回还需等待的毫秒数
+local function retry_after(current, previous, limit)
+    if current + 1 <= limit then
+        return math.ceil((weight - (limit - current - 1) / previous) * window)
+    end
+    -- 当前窗口的计数到下一个窗口才开始衰减
+    local next_weight = math.max(0, math.min(1, (limit - 1) / current))
+    return math.ceil((weight + 1 - next_weight) * window)
+end
+
+if stream_limit > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+    if redis.call('ZCARD', KEYS[2]) >= stream_limit then
+        return {0, 'streams', 0}
+    end
+end
+
+local counts = redis.call('HMGET', KEYS[1], 'r:' .. index, 'r:' .. (index - 1), 't:' .. index, 't:' .. (index - 1))
+local requests, previous_requests = tonumber(counts[1]) or 0, tonumber(counts[2]) or 0
+local tokens, previous_tokens = tonumber(counts[3]) or 0, tonumber(counts[4]) or 0
+if request_limit > 0 and previous_requests * weight + requests + 1 > request_limit then
+    return {0, 'requests', retry_after(requests, previous_requests, request_limit)}
+end
+if token_limit > 0 and previous_tokens * weight + tokens + 1 > token_limit then
+    return {0, 'tokens', retry_after(tokens, previous_tokens, token_limit)}
+end
+
+redis.call('HINCRBY', KEYS[1], 'r:' .. index, 1)
+redis.call('HDEL', KEYS[1], 'r:' .. (index - 2), 't:' .. (index - 2))
+redis.call('PEXPIRE', KEYS[1], window * 2)
+if stream_limit > 0 then
+    redis.call('ZADD', KEYS[2], now + tonumber(ARGV[6]), ARGV[5])
+    redis.call('PEXPIRE', KEYS[2], tonumber(ARGV[6]))
+end
+return {1, '', 0}
+"""
+
+# KEYS: 计数 hash
+# ARGV: 窗口毫秒数, token 数
+_RECORD_TOKENS_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[1])
+redis.call('HINCRBY', KEYS[1], 't:' .. math.floor(now / window), ARGV[2])
+redis.call('PEXPIRE', KEYS[1], window * 2)
+"""
+
+
+class UserRateLimiter(Manageable):
+    """用户级请求数 / token 数 / 并发生成数限制"""
+
+    def __init__(self):
+        self._config: ChatUserLimitConfiguration | None = None
+        self._admit_script = None
+        self._record_tokens_script = None
+
+    def setup(self, config: ChatUserLimitConfiguration) -> None:
+        self._config = config
+
+    async def start(self) -> None:
+        if self._config is None:
+            raise RuntimeError("UserRateLimiter 未配置，请先调用 setup()")
+        self._admit_script = redis_manager.client.register_script(_ADMIT_SCRIPT)
+        self._record_tokens_script = redis_manager.client.register_script(_RECORD_TOKENS_SCRIPT)
+
+    async def close(self) -> None:
+        self._admit_script = None
+        self._record_tokens_script = None
+
+    async def admit(self, user_id: uuid.UUID, role: str, lease_id: uuid.UUID) -> tuple[str, int] | None:
+        """检查并计入一次生成请求；被拒绝时返回 (原因, 建议重试秒数)，原因为 requests / tokens / streams"""
+        limits = self._config["roles"].get(role)
+        if limits is None or not (limits["requests"] or limits["tokens"] or limits["streams"]):
+            return None
+        try:
+            allowed, reason, retry_ms = await self._admit_script(
+                keys=self._keys(user_id),
+                args=[
+                    int(self._config["window"] * 1000),
+                    limits["requests"],
+                    limits["tokens"],
+                    limits["streams"],
+                    str(lease_id),
+                    _LEASE_TTL * 1000,
+                ],
+            )
+        except RedisError as e:
+            logger.warning("用户限流检查失败，直接放行: {}", str(e))
+            return None
+        if allowed:
+            return None
+        CHAT_USER_LIMIT_REJECTIONS_TOTAL.labels(role, reason).inc()
+        retry_after = math.ceil(retry_ms / 1000) if retry_ms else _STREAMS_RETRY_AFTER
+        return reason, max(retry_after, 1)
+
+    async def release(self, user_id: uuid.UUID, lease_id: uuid.UUID) -> None:
+        """生成结束，释放并发租约"""
+        try:
+            await redis_manager.client.zrem(self._keys(user_id)[1], str(lease_id))
+        except RedisError as e:
+            logger.warning("释放用户生成租约失败: {}", str(e))
+
+    async def record_tokens(self, user_id: uuid.UUID, tokens: int) -> None:
+        """把一次生成的实际 token 用量计入当前窗口"""
+        if tokens <= 0:
+            return
+        try:
+            await self._record_tokens_script(
+                keys=self._keys(user_id)[:1], args=[int(self._config["window"] * 1000), tokens],
+            )
+        except RedisError as e:
+            logger.warning("记录用户 token 用量失败: {}", str(e))
+
+    @staticmethod
+    def _keys(user_id: uuid.UUID) -> list[str]:
+        return [
+            _KEY_FORMAT.format(user_id=user_id, kind="window"),
+            _KEY_FORMAT.format(user_id=user_id, kind="streams"),
+        ]
+
+
+user_rate_limiter = UserRateLimiter()
@@ -3,7 +3,7 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from config.postgres import get_postgres_session
+from config.postgres import get_postgres_session, get_postgres_read_session
 from models.conversation import Conversation
 from models.user import User
 from modules.user.dependencies import get_current_user
@@ -28,7 +28,7 @@ async def api_list_conversations(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
     current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_postgres_session),
+    session: AsyncSession = Depends(get_postgres_read_session),
 ):
     return await list_conversations(session, current_user.id, page, page_size)
 
@@ -39,7 +39,7 @@ async def api_list_conversations(
 )
 async def api_get_conversation_messages(
     conversation: Conversation = Depends(get_user_conversation),
-    session: AsyncSession = Depends(get_postgres_session),
+    session: AsyncSession = Depends(get_postgres_read_session),
 ):
     return await get_conversation_messages(session, conversation.id)
 
@@ -25,6 +25,7 @@ class MessageResponse(BaseModel):
     status: str
     thinking: str | None
     order: int
+    variant: int
     created_at: datetime
 
     model_config = {"from_attributes": True}
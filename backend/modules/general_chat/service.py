@@ -28,11 +28,11 @@ async def get_conversation_messages(
     session: AsyncSession,
     conversation_id: uuid.UUID,
 ) -> list[Message]:
-    """获取某会话的全部消息（按 order 升序）"""
+    """获取某会话的全部消息（按 order、variant 升序）"""
     result = await session.execute(
         select(Message)
         .where(Message.conversation_id == conversation_id)
-        .order_by(Message.order.asc())
+        .order_by(Message.order.asc(), Message.variant.asc())
     )
     return list(result.scalars().all())
 
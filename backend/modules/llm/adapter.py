@@ -17,13 +17,16 @@ class ChunkType(str, Enum):
     """流式块类型"""
     THINKING = "thinking"
     TEXT = "text"
+    # 流结束时由适配器给出的 token 用量，content 为空
+    USAGE = "usage"
 
 
 @dataclass
 class StreamChunk:
-    """流式块，区分 thinking 和 text"""
+    """流式块，区分 thinking、text 和 usage"""
     type: ChunkType
     content: str
+    usage: dict | None = None
 
 
 @dataclass
@@ -43,6 +46,11 @@ class LLMConfig:
     max_tokens: int = 4096
     thinking_enabled: bool = False
     thinking_budget_tokens: int = 10000
+    # 期限（秒），由适配器强制执行，超时抛出 LLMTimeoutError（见 deadline）
+    connect_timeout: float = 10.0
+    first_token_timeout: float = 120.0
+    idle_timeout: float = 60.0
+    total_timeout: float = 900.0
 
 
 @dataclass
@@ -61,10 +69,10 @@ class LLMAdapter(ABC):
     async def chat(
         self, messages: list[LLMMessage], config: LLMConfig,
     ) -> LLMResponse:
-        """非流式对话"""
+        """非流式对话，超过 total_timeout 时抛出 LLMTimeoutError"""
 
     @abstractmethod
-    async def stream(
+    def stream(
         self, messages: list[LLMMessage], config: LLMConfig,
     ) -> AsyncIterator[StreamChunk]:
-        """流式对话，逐块 yield StreamChunk"""
+        """流式对话，返回逐块产出 StreamChunk 的异步迭代器，超过任一期限时抛出 LLMTimeoutError"""
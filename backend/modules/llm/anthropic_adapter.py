@@ -8,8 +8,9 @@
 
 from collections.abc import AsyncIterator
 
-from anthropic import AsyncAnthropic
+from anthropic import AsyncAnthropic, Timeout
 
+from config.tracing import tracer
 from modules.llm.adapter import (
     ChunkType,
     LLMAdapter,
@@ -18,6 +19,7 @@ from modules.llm.adapter import (
     LLMResponse,
     StreamChunk,
 )
+from modules.llm.deadline import client_timeout, enforce_deadlines, enforce_total_deadline
 
 
 class AnthropicAdapter(LLMAdapter):
@@ -71,10 +73,23 @@ class AnthropicAdapter(LLMAdapter):
     async def chat(
         self, messages: list[LLMMessage], config: LLMConfig,
     ) -> LLMResponse:
-        client = AsyncAnthropic(api_key=config.api_key, base_url=config.base_url)
+        return await enforce_total_deadline(self._chat(messages, config), config)
+
+    def stream(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> AsyncIterator[StreamChunk]:
+        return enforce_deadlines(self._stream(messages, config), config)
+
+    async def _chat(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> LLMResponse:
+        client = AsyncAnthropic(
+            api_key=config.api_key, base_url=config.base_url, timeout=client_timeout(config, Timeout),
+        )
         kwargs = self._build_kwargs(messages, config)
 
-        response = await client.messages.create(**kwargs)
+        with tracer.span("llm.anthropic.chat", model=config.model):
+            response = await client.messages.create(**kwargs)
 
         content = ""
         thinking = ""
@@ -97,16 +112,32 @@ class AnthropicAdapter(LLMAdapter):
             thinking=thinking or None,
         )
 
-    async def stream(
+    async def _stream(
         self, messages: list[LLMMessage], config: LLMConfig,
     ) -> AsyncIterator[StreamChunk]:
-        client = AsyncAnthropic(api_key=config.api_key, base_url=config.base_url)
+        client = AsyncAnthropic(
+            api_key=config.api_key, base_url=config.base_url, timeout=client_timeout(config, Timeout),
+        )
         kwargs = self._build_kwargs(messages, config)
 
-        async with client.messages.stream(**kwargs) as stream:
-            async for event in stream:
-                if event.type == "content_block_delta":
-                    if event.delta.type == "thinking_delta":
-                        yield StreamChunk(ChunkType.THINKING, event.delta.thinking)
-                    elif event.delta.type == "text_delta":
-                        yield StreamChunk(ChunkType.TEXT, event.delta.text)
+        with tracer.span("llm.anthropic.stream", model=config.model) as span:
+            async with client.messages.stream(**kwargs) as stream:
+                span.add_event("connected")
+                first_token_seen = False
+                async for event in stream:
+                    if event.type == "content_block_delta":
+                        if not first_token_seen:
+                            first_token_seen = True
+                            span.add_event("first_token")
+                        if event.delta.type == "thinking_delta":
+                            yield StreamChunk(ChunkType.THINKING, event.delta.thinking)
+                        elif event.delta.type == "text_delta":
+                            yield StreamChunk(ChunkType.TEXT, event.delta.text)
+                span.add_event("stream_end")
+
+                message = await stream.get_final_message()
+                if message.usage:
+                    yield StreamChunk(ChunkType.USAGE, "", usage={
+                        "input_tokens": message.usage.input_tokens,
+                        "output_tokens": message.usage.output_tokens,
+                    })
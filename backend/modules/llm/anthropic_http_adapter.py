@@ -0,0 +1,64 @@
+"""Anthropic 直连 HTTP 适配器
+
+流式调用直接读取 Messages API 的 SSE（共享连接池，见 http_client），只解析用到的事件与字段：
+- content_block_delta：thinking_delta / text_delta
+- message_start / message_delta：输入 / 输出 token 用量（output_tokens 为累计值）
+- error：流中途出错
+ping、content_block_start / stop 等事件按事件名跳过，不解析 JSON。
+
+请求参数与非流式调用沿用 AnthropicAdapter（SDK）。
+"""
+
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+
+from config.tracing import tracer
+from modules.llm.adapter import ChunkType, LLMConfig, LLMMessage, StreamChunk
+from modules.llm.anthropic_adapter import AnthropicAdapter
+from modules.llm.http_client import LLMHTTPError, llm_http_client, loads
+
+_DEFAULT_BASE_URL = "https://api.anthropic.com"
+_API_VERSION = "2023-06-01"
+
+
+class AnthropicHTTPAdapter(AnthropicAdapter):
+    """Anthropic LLM 适配器（流式调用直连 HTTP）"""
+
+    async def _stream(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> AsyncIterator[StreamChunk]:
+        body = self._build_kwargs(messages, config)
+        body["stream"] = True
+        url = (config.base_url or _DEFAULT_BASE_URL).rstrip("/") + "/v1/messages"
+        headers = {"x-api-key": config.api_key, "anthropic-version": _API_VERSION}
+
+        with tracer.span("llm.anthropic.stream", model=config.model, transport="http") as span:
+            input_tokens = output_tokens = None
+            first_token_seen = False
+            async with aclosing(llm_http_client.events(url, headers, body, config)) as events:
+                async for event, data in events:
+                    if event == "content_block_delta":
+                        delta = loads(data)["delta"]
+                        if not first_token_seen:
+                            first_token_seen = True
+                            span.add_event("first_token")
+                        if delta["type"] == "thinking_delta":
+                            yield StreamChunk(ChunkType.THINKING, delta["thinking"])
+                        elif delta["type"] == "text_delta":
+                            yield StreamChunk(ChunkType.TEXT, delta["text"])
+                    elif event == "message_start":
+                        span.add_event("connected")
+                        usage = loads(data)["message"].get("usage") or {}
+                        input_tokens = usage.get("input_tokens")
+                    elif event == "message_delta":
+                        usage = loads(data).get("usage") or {}
+                        output_tokens = usage.get("output_tokens", output_tokens)
+                    elif event == "error":
+                        raise LLMHTTPError(loads(data)["error"]["message"])
+            span.add_event("stream_end")
+
+            if input_tokens is not None or output_tokens is not None:
+                yield StreamChunk(ChunkType.USAGE, "", usage={
+                    "input_tokens": input_tokens or 0,
+                    "output_tokens": output_tokens or 0,
+                })
@@ -0,0 +1,97 @@
+"""LLM 调用的期限控制
+
+卡住的上游会一直占用请求、后台任务和连接池资源，这里按 LLMConfig 中的四个期限中止调用：
+
+    - connect_timeout：建立连接（交给 SDK 的 httpx 客户端，见 client_timeout）
+    - first_token_timeout：从发起请求到第一个 thinking / text 块
+    - idle_timeout：首个 token 之后，相邻两个流式块之间的最大间隔
+    - total_timeout：整次调用的总时长
+
+超时通过 asyncio.timeout 取消正在等待的上游读取，由适配器生成器的退出关闭 HTTP 流，
+随后抛出 LLMTimeoutError，调用方据此把消息标记为中止并推送带错误码的 error 事件。
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable
+from contextlib import aclosing
+from typing import TypeVar
+
+import httpx
+
+from modules.llm.adapter import ChunkType, LLMConfig, StreamChunk
+
+T = TypeVar("T")
+
+_PHASE_LABELS = {
+    "first_token": "等待首个 token",
+    "idle": "流式输出中断",
+    "total": "总时长",
+}
+
+
+class LLMTimeoutError(Exception):
+    """上游未在期限内响应，phase 为 first_token / idle / total"""
+
+    def __init__(self, phase: str, timeout: float):
+        self.phase = phase
+        self.timeout = timeout
+        super().__init__(f"模型响应超时（{_PHASE_LABELS[phase]}，限时 {timeout:g} 秒）")
+
+
+def client_timeout(config: LLMConfig, timeout_type: type[httpx.Timeout] = httpx.Timeout) -> httpx.Timeout:
+    """SDK 客户端的传输层超时：连接期限由此保证，读超时只作兜底（首 token 前上游可能长时间静默）
+
+    timeout_type 传 SDK 导出的 Timeout：新版 SDK 基于 httpx 的分叉包，拒绝 httpx 自身的 Timeout 对象
+    """
+    read_timeout = max(config.first_token_timeout, config.idle_timeout)
+    return timeout_type(config.total_timeout, connect=config.connect_timeout, read=read_timeout)
+
+
+async def enforce_total_deadline(call: Awaitable[T], config: LLMConfig) -> T:
+    """非流式调用只限制总时长"""
+    try:
+        async with asyncio.timeout(config.total_timeout):
+            return await call
+    except TimeoutError:
+        raise LLMTimeoutError("total", config.total_timeout) from None
+
+
+async def enforce_deadlines(
+    chunks: AsyncIterator[StreamChunk], config: LLMConfig,
+) -> AsyncIterator[StreamChunk]:
+    """逐块转发 chunks，期限只在等待上游时生效，不计入调用方处理每个块的耗时"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    total_deadline = started + config.total_timeout
+    first_token_deadline = started + config.first_token_timeout
+    first_token_seen = False
+
+    async with aclosing(chunks):
+        while True:
+            if first_token_seen:
+                phase, deadline = "idle", loop.time() + config.idle_timeout
+            else:
+                # 首个 token 之前（含 thinking 模型的静默推理）只受首 token 期限约束
+                phase, deadline = "first_token", first_token_deadline
+            if total_deadline <= deadline:
+                phase, deadline = "total", total_deadline
+
+            try:
+                async with asyncio.timeout_at(deadline):
+                    chunk = await anext(chunks)
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                raise LLMTimeoutError(phase, _timeout_of(phase, config)) from None
+
+            if not first_token_seen and chunk.type != ChunkType.USAGE:
+                first_token_seen = True
+            yield chunk
+
+
+def _timeout_of(phase: str, config: LLMConfig) -> float:
+    return {
+        "first_token": config.first_token_timeout,
+        "idle": config.idle_timeout,
+        "total": config.total_timeout,
+    }[phase]
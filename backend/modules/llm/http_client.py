@@ -0,0 +1,126 @@
+"""
+Module-level Singletons: llm_http_client, local_llm_http_client
+
+直连模型 API 的共享 HTTP 客户端与 SSE 解析，供直连 HTTP 的适配器使用：
+    - llm_http_client：公网 API（见 anthropic_http_adapter / openai_http_adapter）
+    - local_llm_http_client：局域网内的自建推理服务（见 openai_compatible_adapter），独立连接池，不使用代理环境变量
+
+SDK 每次调用新建客户端，并为每个增量事件构造完整的 Pydantic 对象；高并发时这部分 CPU 开销随块数线性增长。
+这里所有调用共享一个 httpx 连接池，SSE 按行解析出 (event, data)，由适配器按事件名跳过不需要的事件，
+只对用到的事件解析 JSON（优先使用 orjson）。
+
+使用方式：
+    1. app.py 启动时调用 setup(config)，并交给 LifeSpan 管理
+    2. 适配器通过 events(url, headers, body, config) 逐个读取 SSE 事件，非流式调用使用 post_json()
+"""
+
+import json
+from collections.abc import AsyncIterator
+
+import httpx
+
+from config.environment import LLMHttpPoolConfiguration
+from config.lifecycle import Manageable
+from modules.llm.adapter import LLMConfig
+from modules.llm.deadline import client_timeout
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # pragma: no cover - 可选依赖
+    loads = json.loads
+
+
+class LLMHTTPError(Exception):
+    """上游返回错误状态码，或在事件流中返回错误事件"""
+
+    def __init__(self, detail: str, status_code: int | None = None):
+        self.status_code = status_code
+        super().__init__(f"上游返回错误（HTTP {status_code}）: {detail}" if status_code else f"上游返回错误: {detail}")
+
+
+class LLMHttpClient(Manageable):
+    """模型 API 的共享连接池，trust_env 为 False 时忽略代理等环境变量"""
+
+    def __init__(self, name: str, trust_env: bool = True):
+        self._name = name
+        self._trust_env = trust_env
+        self._config: LLMHttpPoolConfiguration | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    def setup(self, config: LLMHttpPoolConfiguration) -> None:
+        self._config = config
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError(f"HTTP 客户端 {self._name} 未启动")
+        return self._client
+
+    async def start(self) -> None:
+        if self._config is None:
+            raise RuntimeError(f"HTTP 客户端 {self._name} 未配置，请先调用 setup()")
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self._config["max_connections"],
+                max_keepalive_connections=self._config["max_keepalive"],
+                keepalive_expiry=self._config["keepalive_expiry"],
+            ),
+            trust_env=self._trust_env,
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def post_json(self, url: str, headers: dict[str, str], body: dict, config: LLMConfig) -> dict:
+        """POST body 并返回解析后的 JSON 响应"""
+        response = await self.client.post(url, headers=headers, json=body, timeout=client_timeout(config))
+        if response.status_code >= 400:
+            raise LLMHTTPError(_error_detail(response.text), response.status_code)
+        return loads(response.content)
+
+    async def events(
+        self, url: str, headers: dict[str, str], body: dict, config: LLMConfig,
+    ) -> AsyncIterator[tuple[str | None, str]]:
+        """POST body 并逐个产出 SSE 事件 (event, data)，没有 event 字段的事件 event 为 None
+
+        生成器退出（包括被取消）时关闭 HTTP 响应，连接归还连接池。调用方须用 contextlib.aclosing 包裹迭代，
+        出错、提前 break 或被取消时立即关闭，而不是等异步生成器的终结器。
+        """
+        async with self.client.stream(
+            "POST", url, headers=headers, json=body, timeout=client_timeout(config),
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                raise LLMHTTPError(_error_detail(response.text), response.status_code)
+
+            event = None
+            data: list[str] = []
+            async for line in response.aiter_lines():
+                if not line:
+                    if data:
+                        yield event, "\n".join(data)
+                    event = None
+                    data = []
+                elif line.startswith("data:"):
+                    data.append(line[6:] if line.startswith("data: ") else line[5:])
+                elif line.startswith("event:"):
+                    event = line[6:].strip()
+                # 注释（":" 开头）与 id / retry 字段不使用
+            if data:
+                yield event, "\n".join(data)
+
+
+def _error_detail(text: str) -> str:
+    """从错误响应中取出可读的错误信息：{"error": {"message": ...}}，部分兼容服务为 {"message": ...}"""
+    try:
+        body = loads(text)
+        return body["error"]["message"] if "error" in body else body["message"]
+    except (ValueError, TypeError, KeyError):
+        return text[:500]
+
+
+llm_http_client = LLMHttpClient("llm")
+local_llm_http_client = LLMHttpClient("local_llm", trust_env=False)
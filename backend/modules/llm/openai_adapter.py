@@ -5,8 +5,9 @@
 
 from collections.abc import AsyncIterator
 
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, Timeout
 
+from config.tracing import tracer
 from modules.llm.adapter import (
     ChunkType,
     LLMAdapter,
@@ -15,16 +16,15 @@ from modules.llm.adapter import (
     LLMResponse,
     StreamChunk,
 )
+from modules.llm.deadline import client_timeout, enforce_deadlines, enforce_total_deadline
 
 
 class OpenAIAdapter(LLMAdapter):
     """OpenAI LLM 适配器"""
 
-    async def chat(
-        self, messages: list[LLMMessage], config: LLMConfig,
-    ) -> LLMResponse:
-        client = AsyncOpenAI(api_key=config.api_key, base_url=config.base_url)
-
+    @staticmethod
+    def _build_kwargs(messages: list[LLMMessage], config: LLMConfig) -> dict:
+        """构建 Responses API 调用参数"""
         kwargs: dict = {
             "model": config.model,
             "input": [{"role": m.role, "content": m.content} for m in messages],
@@ -37,7 +37,29 @@ class OpenAIAdapter(LLMAdapter):
         else:
             kwargs["temperature"] = config.temperature
 
-        response = await client.responses.create(**kwargs)
+        return kwargs
+
+    async def chat(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> LLMResponse:
+        return await enforce_total_deadline(self._chat(messages, config), config)
+
+    def stream(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> AsyncIterator[StreamChunk]:
+        return enforce_deadlines(self._stream(messages, config), config)
+
+    async def _chat(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> LLMResponse:
+        client = AsyncOpenAI(
+            api_key=config.api_key, base_url=config.base_url, timeout=client_timeout(config, Timeout),
+        )
+
+        kwargs = self._build_kwargs(messages, config)
+
+        with tracer.span("llm.openai.chat", model=config.model):
+            response = await client.responses.create(**kwargs)
 
         content = ""
         thinking = ""
@@ -65,27 +87,38 @@ class OpenAIAdapter(LLMAdapter):
             thinking=thinking or None,
         )
 
-    async def stream(
+    async def _stream(
         self, messages: list[LLMMessage], config: LLMConfig,
     ) -> AsyncIterator[StreamChunk]:
-        client = AsyncOpenAI(api_key=config.api_key, base_url=config.base_url)
-
-        kwargs: dict = {
-            "model": config.model,
-            "input": [{"role": m.role, "content": m.content} for m in messages],
-            "max_output_tokens": config.max_tokens,
-            "stream": True,
-        }
-
-        if config.thinking_enabled:
-            kwargs["reasoning"] = {"effort": "medium"}
-            kwargs["temperature"] = 1.0
-        else:
-            kwargs["temperature"] = config.temperature
+        client = AsyncOpenAI(
+            api_key=config.api_key, base_url=config.base_url, timeout=client_timeout(config, Timeout),
+        )
 
-        stream = await client.responses.create(**kwargs)
-        async for event in stream:
-            if event.type == "response.output_text.delta":
-                yield StreamChunk(ChunkType.TEXT, event.delta)
-            elif event.type == "response.reasoning_summary_text.delta":
-                yield StreamChunk(ChunkType.THINKING, event.delta)
+        kwargs = self._build_kwargs(messages, config)
+        kwargs["stream"] = True
+
+        with tracer.span("llm.openai.stream", model=config.model) as span:
+            stream = await client.responses.create(**kwargs)
+            span.add_event("connected")
+            # 超时或被取消时立即关闭 HTTP 响应，而不是等连接被回收
+            async with stream:
+                first_token_seen = False
+                async for event in stream:
+                    if event.type == "response.output_text.delta":
+                        if not first_token_seen:
+                            first_token_seen = True
+                            span.add_event("first_token")
+                        yield StreamChunk(ChunkType.TEXT, event.delta)
+                    elif event.type == "response.reasoning_summary_text.delta":
+                        if not first_token_seen:
+                            first_token_seen = True
+                            span.add_event("first_token")
+                        yield StreamChunk(ChunkType.THINKING, event.delta)
+                    elif event.type == "response.completed" and event.response.usage:
+                        usage = event.response.usage
+                        yield StreamChunk(ChunkType.USAGE, "", usage={
+                            "input_tokens": usage.input_tokens,
+                            "output_tokens": usage.output_tokens,
+                            "total_tokens": usage.total_tokens,
+                        })
+            span.add_event("stream_end")
@@ -0,0 +1,118 @@
+"""OpenAI 兼容适配器
+
+对接自建推理服务（vLLM、llama.cpp server、SGLang 等）的 /v1/chat/completions 接口，
+通过局域网专用连接池直连 HTTP（见 http_client.local_llm_http_client），不依赖 SDK：
+- 地址取自供应商 base_url_map 中 openai_compatible 对应的值（如 http://10.0.0.5:8000/v1），必须配置
+- api_key 为空时不发送 Authorization 头
+- 思考过程来自 delta.reasoning_content（vLLM 新版本为 delta.reasoning），thinking 开关通过
+  chat_template_kwargs.enable_thinking 传给模板，服务端不支持时忽略
+- 流式请求携带 stream_options.include_usage，用量在最后一个（choices 为空的）块中返回
+"""
+
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+
+from config.tracing import tracer
+from modules.llm.adapter import (
+    ChunkType,
+    LLMAdapter,
+    LLMConfig,
+    LLMMessage,
+    LLMResponse,
+    StreamChunk,
+)
+from modules.llm.deadline import enforce_deadlines, enforce_total_deadline
+from modules.llm.http_client import LLMHTTPError, loads, local_llm_http_client
+
+_DONE = "[DONE]"
+
+
+class OpenAICompatibleAdapter(LLMAdapter):
+    """OpenAI 兼容（Chat Completions）LLM 适配器"""
+
+    @staticmethod
+    def _build_request(
+        messages: list[LLMMessage], config: LLMConfig,
+    ) -> tuple[str, dict[str, str], dict]:
+        """构建请求地址、请求头与请求体"""
+        if not config.base_url:
+            raise ValueError("OpenAI 兼容接口未配置 base_url，请在供应商的 base_url_map 中设置")
+        url = config.base_url.rstrip("/") + "/chat/completions"
+        headers = {"Authorization": f"Bearer {config.api_key}"} if config.api_key else {}
+        body: dict = {
+            "model": config.model,
+            "messages": [{"role": m.role, "content": m.content} for m in messages],
+            "max_tokens": config.max_tokens,
+            "temperature": config.temperature,
+            "chat_template_kwargs": {"enable_thinking": config.thinking_enabled},
+        }
+        return url, headers, body
+
+    @staticmethod
+    def _usage(usage: dict) -> dict:
+        return {
+            "input_tokens": usage.get("prompt_tokens") or 0,
+            "output_tokens": usage.get("completion_tokens") or 0,
+            "total_tokens": usage.get("total_tokens") or 0,
+        }
+
+    async def chat(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> LLMResponse:
+        return await enforce_total_deadline(self._chat(messages, config), config)
+
+    def stream(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> AsyncIterator[StreamChunk]:
+        return enforce_deadlines(self._stream(messages, config), config)
+
+    async def _chat(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> LLMResponse:
+        url, headers, body = self._build_request(messages, config)
+
+        with tracer.span("llm.openai_compatible.chat", model=config.model):
+            response = await local_llm_http_client.post_json(url, headers, body, config)
+
+        message = response["choices"][0]["message"]
+        thinking = message.get("reasoning_content") or message.get("reasoning")
+        return LLMResponse(
+            content=message.get("content") or "",
+            model=response.get("model") or config.model,
+            usage=self._usage(response["usage"]) if response.get("usage") else None,
+            thinking=thinking or None,
+        )
+
+    async def _stream(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> AsyncIterator[StreamChunk]:
+        url, headers, body = self._build_request(messages, config)
+        body["stream"] = True
+        body["stream_options"] = {"include_usage": True}
+
+        with tracer.span("llm.openai_compatible.stream", model=config.model) as span:
+            first_token_seen = False
+            async with aclosing(local_llm_http_client.events(url, headers, body, config)) as events:
+                async for _, data in events:
+                    if data == _DONE:
+                        break
+                    chunk = loads(data)
+                    if "error" in chunk:
+                        error = chunk["error"]
+                        raise LLMHTTPError(error.get("message") if isinstance(error, dict) else str(error))
+                    if chunk.get("usage"):
+                        yield StreamChunk(ChunkType.USAGE, "", usage=self._usage(chunk["usage"]))
+                    if not chunk.get("choices"):
+                        continue
+
+                    delta = chunk["choices"][0].get("delta") or {}
+                    thinking = delta.get("reasoning_content") or delta.get("reasoning")
+                    content = delta.get("content")
+                    if (thinking or content) and not first_token_seen:
+                        first_token_seen = True
+                        span.add_event("first_token")
+                    if thinking:
+                        yield StreamChunk(ChunkType.THINKING, thinking)
+                    if content:
+                        yield StreamChunk(ChunkType.TEXT, content)
+            span.add_event("stream_end")
@@ -0,0 +1,59 @@
+"""OpenAI 直连 HTTP 适配器
+
+流式调用直接读取 Responses API 的 SSE（共享连接池，见 http_client），只解析用到的事件与字段：
+- response.output_text.delta / response.reasoning_summary_text.delta：文本与思考增量
+- response.completed：token 用量
+- response.failed / error：流中途出错
+其余事件（output_item.added、content_part.done 等）按事件名跳过，不解析 JSON。
+
+请求参数与非流式调用沿用 OpenAIAdapter（SDK）。
+"""
+
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+
+from config.tracing import tracer
+from modules.llm.adapter import ChunkType, LLMConfig, LLMMessage, StreamChunk
+from modules.llm.http_client import LLMHTTPError, llm_http_client, loads
+from modules.llm.openai_adapter import OpenAIAdapter
+
+_DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+class OpenAIHTTPAdapter(OpenAIAdapter):
+    """OpenAI LLM 适配器（流式调用直连 HTTP）"""
+
+    async def _stream(
+        self, messages: list[LLMMessage], config: LLMConfig,
+    ) -> AsyncIterator[StreamChunk]:
+        body = self._build_kwargs(messages, config)
+        body["stream"] = True
+        url = (config.base_url or _DEFAULT_BASE_URL).rstrip("/") + "/responses"
+        headers = {"Authorization": f"Bearer {config.api_key}"}
+
+        with tracer.span("llm.openai.stream", model=config.model, transport="http") as span:
+            first_token_seen = False
+            async with aclosing(llm_http_client.events(url, headers, body, config)) as events:
+                async for event, data in events:
+                    if event == "response.output_text.delta" or event == "response.reasoning_summary_text.delta":
+                        if not first_token_seen:
+                            first_token_seen = True
+                            span.add_event("first_token")
+                        chunk_type = ChunkType.TEXT if event == "response.output_text.delta" else ChunkType.THINKING
+                        yield StreamChunk(chunk_type, loads(data)["delta"])
+                    elif event == "response.created":
+                        span.add_event("connected")
+                    elif event == "response.completed":
+                        usage = loads(data)["response"].get("usage")
+                        if usage:
+                            yield StreamChunk(ChunkType.USAGE, "", usage={
+                                "input_tokens": usage["input_tokens"],
+                                "output_tokens": usage["output_tokens"],
+                                "total_tokens": usage["total_tokens"],
+                            })
+                    elif event == "response.failed":
+                        error = loads(data)["response"].get("error") or {}
+                        raise LLMHTTPError(error.get("message") or "response.failed")
+                    elif event == "error":
+                        raise LLMHTTPError(loads(data).get("message") or data[:500])
+            span.add_event("stream_end")
@@ -6,7 +6,10 @@
 from enums import Manufacturer
 from modules.llm.adapter import LLMAdapter
 from modules.llm.anthropic_adapter import AnthropicAdapter
+from modules.llm.anthropic_http_adapter import AnthropicHTTPAdapter
 from modules.llm.openai_adapter import OpenAIAdapter
+from modules.llm.openai_compatible_adapter import OpenAICompatibleAdapter
+from modules.llm.openai_http_adapter import OpenAIHTTPAdapter
 
 _ADAPTER_MAP: dict[Manufacturer, LLMAdapter] = {}
 
@@ -16,6 +19,12 @@ def register_adapter(manufacturer: Manufacturer, adapter: LLMAdapter) -> None:
     _ADAPTER_MAP[manufacturer] = adapter
 
 
+def register_http_adapters() -> None:
+    """流式调用改用直连 HTTP 的适配器（共享连接池，见 http_client），由 app.py 按配置调用"""
+    register_adapter(Manufacturer.OPENAI, OpenAIHTTPAdapter())
+    register_adapter(Manufacturer.ANTHROPIC, AnthropicHTTPAdapter())
+
+
 def get_adapter(manufacturer: str) -> LLMAdapter:
     """根据原厂商返回适配器实例
 
@@ -31,3 +40,4 @@ def get_adapter(manufacturer: str) -> LLMAdapter:
 # 注册内置适配器
 register_adapter(Manufacturer.OPENAI, OpenAIAdapter())
 register_adapter(Manufacturer.ANTHROPIC, AnthropicAdapter())
+register_adapter(Manufacturer.OPENAI_COMPATIBLE, OpenAICompatibleAdapter())
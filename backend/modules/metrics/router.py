@@ -0,0 +1,19 @@
+"""指标模块路由 — Prometheus 抓取端点
+
+按 Prometheus 惯例不做鉴权，部署时应只对内网 / 抓取器开放。
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from config.metrics import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def api_metrics():
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
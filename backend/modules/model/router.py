@@ -3,7 +3,7 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from config.postgres import get_postgres_session
+from config.postgres import get_postgres_read_session
 from modules.user.dependencies import get_current_user
 from modules.model.schema import AvailableModelsByManufacturer
 from modules.model.service import get_available_models_by_manufacturer
@@ -17,6 +17,6 @@ router = APIRouter(
 
 @router.get("/available/byManufacturer", response_model=AvailableModelsByManufacturer)
 async def api_get_available_models_by_manufacturer(
-    session: AsyncSession = Depends(get_postgres_session),
+    session: AsyncSession = Depends(get_postgres_read_session),
 ):
     return await get_available_models_by_manufacturer(session)
@@ -18,7 +18,14 @@ class ModelCreateRequest(BaseModel):
     display_name: str = Field(min_length=1, max_length=100)
     manufacturer: Manufacturer
     is_enabled: bool = True
+    hedging_enabled: bool = False
+    cache_enabled: bool = False
+    temperature: float = Field(default=1.0, ge=0, le=2)
     provider_ids: list[uuid.UUID] = Field(default_factory=list)
+    connect_timeout: float | None = Field(default=None, gt=0)
+    first_token_timeout: float | None = Field(default=None, gt=0)
+    idle_timeout: float | None = Field(default=None, gt=0)
+    total_timeout: float | None = Field(default=None, gt=0)
 
 
 class ModelUpdateRequest(BaseModel):
@@ -26,7 +33,14 @@ class ModelUpdateRequest(BaseModel):
     display_name: str | None = Field(default=None, min_length=1, max_length=100)
     manufacturer: Manufacturer | None = None
     is_enabled: bool | None = None
+    hedging_enabled: bool | None = None
+    cache_enabled: bool | None = None
+    temperature: float | None = Field(default=None, ge=0, le=2)
     provider_ids: list[uuid.UUID] | None = None
+    connect_timeout: float | None = Field(default=None, gt=0)
+    first_token_timeout: float | None = Field(default=None, gt=0)
+    idle_timeout: float | None = Field(default=None, gt=0)
+    total_timeout: float | None = Field(default=None, gt=0)
 
 
 class ModelResponse(BaseModel):
@@ -35,6 +49,13 @@ class ModelResponse(BaseModel):
     display_name: str
     manufacturer: str
     is_enabled: bool
+    hedging_enabled: bool
+    cache_enabled: bool
+    temperature: float
+    connect_timeout: float | None
+    first_token_timeout: float | None
+    idle_timeout: float | None
+    total_timeout: float | None
     providers: list[ProviderLinkResponse]
     created_at: datetime
     updated_at: datetime
@@ -32,6 +32,13 @@ def _to_response(model: Model) -> ModelResponse:
         display_name=model.display_name,
         manufacturer=model.manufacturer,
         is_enabled=model.is_enabled,
+        hedging_enabled=model.hedging_enabled,
+        cache_enabled=model.cache_enabled,
+        temperature=model.temperature,
+        connect_timeout=model.connect_timeout,
+        first_token_timeout=model.first_token_timeout,
+        idle_timeout=model.idle_timeout,
+        total_timeout=model.total_timeout,
         providers=providers,
         created_at=model.created_at,
         updated_at=model.updated_at,
@@ -72,6 +79,13 @@ async def create_model(
         display_name=data.display_name,
         manufacturer=data.manufacturer.value,
         is_enabled=data.is_enabled,
+        hedging_enabled=data.hedging_enabled,
+        cache_enabled=data.cache_enabled,
+        temperature=data.temperature,
+        connect_timeout=data.connect_timeout,
+        first_token_timeout=data.first_token_timeout,
+        idle_timeout=data.idle_timeout,
+        total_timeout=data.total_timeout,
     )
     session.add(model)
     await session.flush()
@@ -0,0 +1,34 @@
+"""请求分析模块路由 — 管理员预约对指定路由做采样分析"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from config.profiling import request_profiler
+from models.user import UserRole
+from modules.user.dependencies import require_roles
+from modules.profiling.schema import ProfileArmRequest, ArmedProfilesResponse
+
+router = APIRouter(
+    prefix="/api/profiling",
+    tags=["profiling"],
+    dependencies=[Depends(require_roles(UserRole.ADMIN))],
+)
+
+
+@router.get("/armed", response_model=ArmedProfilesResponse)
+async def api_list_armed():
+    return ArmedProfilesResponse(armed=request_profiler.armed)
+
+
+@router.post("/arm", response_model=ArmedProfilesResponse)
+async def api_arm(data: ProfileArmRequest):
+    """预约分析当前 worker 上接下来命中该路由的 N 个请求"""
+    if not request_profiler.enabled:
+        raise HTTPException(status_code=409, detail="请求分析未启用")
+    request_profiler.arm(data.route, data.count)
+    return ArmedProfilesResponse(armed=request_profiler.armed)
+
+
+@router.delete("/armed", status_code=204)
+async def api_disarm(route: str | None = Query(None)):
+    """取消预约，不传 route 时全部取消"""
+    request_profiler.disarm(route)
@@ -0,0 +1,14 @@
+"""请求分析模块请求 / 响应模型"""
+
+from pydantic import BaseModel, Field
+
+
+class ProfileArmRequest(BaseModel):
+    # 路由模板，与路由定义一致，如 /api/chat/conversations/{conversation_id}/messages
+    route: str = Field(min_length=1, max_length=200, pattern=r"^/")
+    count: int = Field(default=1, ge=1, le=100)
+
+
+class ArmedProfilesResponse(BaseModel):
+    # 路由模板 -> 剩余次数
+    armed: dict[str, int]
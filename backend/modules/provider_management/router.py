@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
-from config.postgres import get_postgres_session
+from config.postgres import get_postgres_session, get_postgres_read_session
 from models.user import UserRole
 from modules.user.dependencies import require_roles
 from modules.provider_management.schema import (
@@ -35,14 +35,14 @@ router = APIRouter(
 async def api_list_providers(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    session: AsyncSession = Depends(get_postgres_session),
+    session: AsyncSession = Depends(get_postgres_read_session),
 ):
     return await list_providers(session, page, page_size)
 
 
 @router.get("/providers/all", response_model=list[ProviderResponse])
 async def api_list_all_providers(
-    session: AsyncSession = Depends(get_postgres_session),
+    session: AsyncSession = Depends(get_postgres_read_session),
 ):
     return await list_all_providers(session)
 
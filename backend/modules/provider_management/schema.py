@@ -12,6 +12,9 @@ class ProviderCreateRequest(BaseModel):
     api_key: str = Field(min_length=1, max_length=500)
     base_url_map: dict[Manufacturer, str] = Field(default_factory=dict)
     is_enabled: bool = True
+    rpm_limit: int | None = Field(default=None, gt=0)
+    tpm_limit: int | None = Field(default=None, gt=0)
+    max_concurrency: int | None = Field(default=None, gt=0)
 
 
 class ProviderUpdateRequest(BaseModel):
@@ -19,6 +22,9 @@ class ProviderUpdateRequest(BaseModel):
     api_key: str | None = Field(default=None, min_length=1, max_length=500)
     base_url_map: dict[Manufacturer, str] | None = None
     is_enabled: bool | None = None
+    rpm_limit: int | None = Field(default=None, gt=0)
+    tpm_limit: int | None = Field(default=None, gt=0)
+    max_concurrency: int | None = Field(default=None, gt=0)
 
 
 class ProviderResponse(BaseModel):
@@ -26,6 +32,9 @@ class ProviderResponse(BaseModel):
     name: str
     base_url_map: dict
     is_enabled: bool
+    rpm_limit: int | None
+    tpm_limit: int | None
+    max_concurrency: int | None
     created_at: datetime
     updated_at: datetime
 
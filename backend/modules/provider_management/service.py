@@ -49,6 +49,9 @@ async def create_provider(session: AsyncSession, data: ProviderCreateRequest) ->
         api_key=data.api_key,
         base_url_map={k.value: v for k, v in data.base_url_map.items()},
         is_enabled=data.is_enabled,
+        rpm_limit=data.rpm_limit,
+        tpm_limit=data.tpm_limit,
+        max_concurrency=data.max_concurrency,
     )
     session.add(provider)
     await session.commit()
@@ -6,6 +6,7 @@ from loguru import logger
 from config.environment import Environment, JWTConfiguration
 from config.postgres import get_postgres_session
 from config.redis import redis_manager
+from config.redis_cache import RedisClientCache
 from modules.user.schema import (
     UserRegisterRequest,
     UserRegisterResponse,
@@ -23,6 +24,10 @@ def get_redis() -> Redis:
     return redis_manager.client
 
 
+def get_redis_cache() -> RedisClientCache | None:
+    return redis_manager.cache if redis_manager.cache_enabled else None
+
+
 def get_jwt_config() -> JWTConfiguration:
     return Environment().jwt_configuration
 
@@ -55,9 +60,12 @@ async def refresh(
     data: RefreshRequest,
     session: AsyncSession = Depends(get_postgres_session),
     redis: Redis = Depends(get_redis),
+    redis_cache: RedisClientCache | None = Depends(get_redis_cache),
     jwt_config: JWTConfiguration = Depends(get_jwt_config),
 ):
-    result = await refresh_access_token(session, redis, jwt_config, data.refresh_token)
+    result = await refresh_access_token(
+        session, redis, jwt_config, data.refresh_token, redis_cache=redis_cache,
+    )
     return result
 
 
@@ -12,6 +12,7 @@ from config.auth import (
     make_refresh_key,
 )
 from config.environment import JWTConfiguration
+from config.redis_cache import RedisClientCache
 from models.user import User
 from modules.user.schema import UserRegisterRequest
 
@@ -75,8 +76,12 @@ async def refresh_access_token(
     redis: Redis,
     jwt_config: JWTConfiguration,
     refresh_token: str,
+    redis_cache: RedisClientCache | None = None,
 ) -> dict[str, str]:
-    """用 refresh token 换取新的 access token"""
+    """用 refresh token 换取新的 access token
+
+    启用 Redis 客户端缓存时，撤销检查优先走本地缓存（登出删除 key 后由服务端推送失效）。
+    """
 
     try:
         payload = decode_token(jwt_config, refresh_token)
@@ -93,7 +98,11 @@ async def refresh_access_token(
 
     # 检查 Redis 中是否存在（未被撤销）
     redis_key = make_refresh_key(user_id, jti)
-    if not await redis.exists(redis_key):
+    if redis_cache is not None:
+        token_exists = await redis_cache.exists(redis_key)
+    else:
+        token_exists = await redis.exists(redis_key)
+    if not token_exists:
         raise HTTPException(status_code=401, detail="刷新令牌已被撤销")
 
     # 查询用户最新角色，确保 access token 中的角色信息是最新的
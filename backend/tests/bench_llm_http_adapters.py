@@ -0,0 +1,115 @@
+"""直连 HTTP 适配器与 SDK 适配器的解析开销对比
+
+回放合成的长流（默认 5000 个 text 增量），统计每个适配器消费完整流的耗时：
+
+    python tests/bench_llm_http_adapters.py [增量数] [轮数]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+
+from conftest import sse_transport
+from modules.llm import anthropic_adapter, openai_adapter
+from modules.llm.adapter import LLMConfig, LLMMessage
+from modules.llm.anthropic_adapter import AnthropicAdapter
+from modules.llm.anthropic_http_adapter import AnthropicHTTPAdapter
+from modules.llm.http_client import llm_http_client
+from modules.llm.openai_adapter import OpenAIAdapter
+from modules.llm.openai_http_adapter import OpenAIHTTPAdapter
+from test_llm_http_adapters import _replaying
+
+MESSAGES = [LLMMessage(role="user", content="你好")]
+CONFIG = LLMConfig(api_key="sk-bench", model="bench-model", thinking_enabled=True)
+
+
+def _event(name: str, data: dict) -> bytes:
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+def anthropic_stream(deltas: int) -> bytes:
+    parts = [
+        _event("message_start", {"type": "message_start", "message": {
+            "id": "msg_bench", "type": "message", "role": "assistant", "model": "bench-model",
+            "content": [], "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": 10, "output_tokens": 1},
+        }}),
+        _event("content_block_start", {"type": "content_block_start", "index": 0,
+                                       "content_block": {"type": "text", "text": ""}}),
+    ]
+    delta = _event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                           "delta": {"type": "text_delta", "text": "流式增量 "}})
+    parts.append(delta * deltas)
+    parts += [
+        _event("content_block_stop", {"type": "content_block_stop", "index": 0}),
+        _event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                 "usage": {"output_tokens": deltas}}),
+        _event("message_stop", {"type": "message_stop"}),
+    ]
+    return b"".join(parts)
+
+
+def openai_stream(deltas: int) -> bytes:
+    response = {"id": "resp_bench", "object": "response", "created_at": 0, "model": "bench-model",
+                "status": "in_progress", "output": [], "parallel_tool_calls": True, "tool_choice": "auto",
+                "tools": []}
+    delta = _event("response.output_text.delta", {
+        "type": "response.output_text.delta", "item_id": "msg_bench", "output_index": 0,
+        "content_index": 0, "delta": "流式增量 ", "logprobs": [], "sequence_number": 1,
+    })
+    completed = {**response, "status": "completed",
+                 "usage": {"input_tokens": 10, "output_tokens": deltas, "total_tokens": deltas + 10,
+                           "input_tokens_details": {"cached_tokens": 0},
+                           "output_tokens_details": {"reasoning_tokens": 0}}}
+    return b"".join([
+        _event("response.created", {"type": "response.created", "response": response, "sequence_number": 0}),
+        delta * deltas,
+        _event("response.completed", {"type": "response.completed", "response": completed,
+                                      "sequence_number": deltas + 1}),
+    ])
+
+
+async def consume(adapter) -> int:
+    count = 0
+    async for _ in adapter.stream(MESSAGES, CONFIG):
+        count += 1
+    return count
+
+
+def measure(adapter, rounds: int) -> float:
+    """返回单轮耗时的最小值（秒）"""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        asyncio.run(consume(adapter))
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    deltas = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for label, body, http_adapter, sdk_adapter in (
+        ("anthropic", anthropic_stream(deltas), AnthropicHTTPAdapter(), AnthropicAdapter()),
+        ("openai", openai_stream(deltas), OpenAIHTTPAdapter(), OpenAIAdapter()),
+    ):
+        llm_http_client._client = httpx.AsyncClient(transport=sse_transport(body))
+        anthropic_adapter.AsyncAnthropic = _replaying(AsyncAnthropic, body, None)
+        openai_adapter.AsyncOpenAI = _replaying(AsyncOpenAI, body, None)
+
+        http_seconds = measure(http_adapter, rounds)
+        sdk_seconds = measure(sdk_adapter, rounds)
+        print(
+            f"{label:<10} {deltas} 增量  http {http_seconds * 1000:8.1f} ms  "
+            f"sdk {sdk_seconds * 1000:8.1f} ms  ({sdk_seconds / http_seconds:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""聊天 SSE 事件序列化的微基准：字节拼接（orjson / 标准库）对比原先的 json.dumps + f-string
+
+    python tests/bench_sse.py [次数]
+"""
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from modules.chat import sse  # noqa: E402
+
+CONTENT = '你好！这是一段带 "引号" 与\n换行的流式增量 token'
+
+
+def old_path(content: str, event_id: int) -> bytes:
+    """改造前：构造字典，json.dumps 后用 f-string 拼帧再编码"""
+    payload = json.dumps({"type": "chunk", "content": content}, ensure_ascii=False)
+    return f"id: {event_id}\ndata: {payload}\n\n".encode()
+
+
+def new_path(encode):
+    def build(content: str, event_id: int) -> bytes:
+        return sse.frame(sse._CHUNK_PREFIX + encode(content) + b"}", event_id)
+    return build
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    cases = [("json.dumps + f-string", old_path)]
+    if sse.orjson is not None:
+        cases.append(("bytes + orjson", new_path(sse._json_str_orjson)))
+    cases.append(("bytes + stdlib", new_path(sse._json_str_stdlib)))
+
+    baseline = None
+    for label, build in cases:
+        assert json.loads(build(CONTENT, 1).split(b"data: ")[1]) == {"type": "chunk", "content": CONTENT}
+        seconds = min(timeit.repeat(lambda: build(CONTENT, 12345), number=number, repeat=5))
+        per_event = seconds / number * 1e6
+        baseline = baseline or per_event
+        print(f"{label:<24} {per_event:6.2f} us/event  ({baseline / per_event:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""测试公共设施：backend 目录加入 sys.path，加载录制的 SSE，按任意分块大小回放给 httpx 客户端"""
+
+import sys
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+
+import httpx
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def load_sse(name: str) -> bytes:
+    """读取 fixtures/sse 下录制的事件流"""
+    return (FIXTURES_DIR / "sse" / name).read_bytes()
+
+
+def sse_transport(
+    body: bytes,
+    chunk_size: int | None = None,
+    status_code: int = 200,
+    requests: list[httpx.Request] | None = None,
+    httpx_module=httpx,
+) -> httpx.MockTransport:
+    """每个请求都回放 body；chunk_size 不为空时按该字节数切块发送（会切断行和多字节字符），requests 记录收到的请求
+
+    httpx_module 供 SDK 使用：新版 SDK 可能依赖 httpx 的分叉包，传输层须来自同一个包
+    """
+
+    async def chunks() -> AsyncIterator[bytes]:
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if requests is not None:
+            requests.append(request)
+        content_type = "text/event-stream" if status_code < 400 else "application/json"
+        return httpx_module.Response(
+            status_code,
+            headers={"content-type": content_type},
+            content=chunks() if chunk_size else body,
+        )
+
+    return httpx_module.MockTransport(handler)
+
+
+@pytest.fixture
+def replay_client(monkeypatch) -> Callable[..., list[httpx.Request]]:
+    """把直连 HTTP 适配器的共享连接池换成回放 SSE 的客户端，返回收到的请求列表"""
+    from modules.llm.http_client import llm_http_client, local_llm_http_client
+
+    def install(body: bytes, chunk_size: int | None = None, status_code: int = 200) -> list[httpx.Request]:
+        requests: list[httpx.Request] = []
+        client = httpx.AsyncClient(transport=sse_transport(body, chunk_size, status_code, requests))
+        monkeypatch.setattr(llm_http_client, "_client", client)
+        monkeypatch.setattr(local_llm_http_client, "_client", client)
+        return requests
+
+    return install
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "integration: 依赖 docker-compose 中的外部服务，不可达时跳过")
@@ -0,0 +1,104 @@
+"""Idempotency-Key：同一个键的重试订阅原生成，请求体不同时拒绝"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from config.redis import redis_manager
+from modules.chat.dependencies import admit_generation
+from modules.chat.schema import CompareChatRequest, NewChatRequest
+from modules.chat.stream_store import chat_stream_store
+from modules.chat.user_limiter import user_rate_limiter
+
+
+class FakeRedis:
+    """只实现幂等键用到的 SET NX / GET / DELETE"""
+
+    def __init__(self):
+        self.values: dict[str, str] = {}
+
+    async def set(self, key: str, value: str, nx: bool = False, ex: int | None = None) -> bool | None:
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def get(self, key: str) -> str | None:
+        return self.values.get(key)
+
+    async def delete(self, key: str) -> int:
+        return 1 if self.values.pop(key, None) is not None else 0
+
+
+@pytest.fixture
+def redis(monkeypatch) -> FakeRedis:
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_manager, "_master", fake)
+    monkeypatch.setattr(chat_stream_store, "_config", {"ttl": 60})
+
+    async def admit(user_id, role, lease_id):
+        return None
+
+    monkeypatch.setattr(user_rate_limiter, "admit", admit)
+    return fake
+
+
+USER = SimpleNamespace(id=uuid.uuid4(), role="user")
+REQUEST = SimpleNamespace(url=SimpleNamespace(path="/api/chat/conversations"))
+
+
+def _admit(body, key: str | None = "retry-1"):
+    return asyncio.run(admit_generation(REQUEST, USER, body, key))
+
+
+def test_retry_with_same_body_replays_original_generation(redis):
+    first = _admit(NewChatRequest(model="gpt", content="你好"))
+    retry = _admit(NewChatRequest(model="gpt", content="你好"))
+
+    assert not first.replayed
+    assert first.idempotency_key is not None
+    assert retry.replayed
+    assert retry.message_id == first.message_id
+
+
+@pytest.mark.parametrize("changed", [
+    NewChatRequest(model="claude", content="你好"),
+    NewChatRequest(model="gpt", content="你好！"),
+    NewChatRequest(model="gpt", content="你好", thinking_enabled=True),
+])
+def test_reused_key_with_different_body_is_rejected(redis, changed):
+    _admit(NewChatRequest(model="gpt", content="你好"))
+
+    with pytest.raises(HTTPException) as exc:
+        _admit(changed)
+    assert exc.value.status_code == 422
+
+
+def test_comparison_model_order_is_part_of_the_body(redis):
+    _admit(CompareChatRequest(models=["a", "b"], content="hi"))
+
+    assert _admit(CompareChatRequest(models=["a", "b"], content="hi")).replayed
+    with pytest.raises(HTTPException):
+        _admit(CompareChatRequest(models=["b", "a"], content="hi"))
+
+
+def test_release_removes_claim_with_fingerprint(redis):
+    message_id = uuid.uuid4()
+    path = REQUEST.url.path
+    asyncio.run(chat_stream_store.claim_idempotency_key(USER.id, path, "k", message_id, "f"))
+    asyncio.run(chat_stream_store.release_idempotency_key(USER.id, path, "k", uuid.uuid4()))
+    assert redis.values
+
+    asyncio.run(chat_stream_store.release_idempotency_key(USER.id, path, "k", message_id))
+    assert not redis.values
+
+
+def test_requests_without_key_are_not_recorded(redis):
+    admission = _admit(NewChatRequest(model="gpt", content="你好"), key=None)
+
+    assert not admission.replayed
+    assert admission.idempotency_key is None
+    assert not redis.values
@@ -0,0 +1,346 @@
+"""直连 HTTP 适配器的 SSE 解析：用录制的事件流回放，与 SDK 适配器的输出逐块比对"""
+
+import asyncio
+import json
+import sys
+
+import httpx
+import pytest
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+
+from conftest import load_sse, sse_transport
+from modules.llm import anthropic_adapter, openai_adapter
+from modules.llm.adapter import ChunkType, LLMConfig, LLMMessage, StreamChunk
+from modules.llm.anthropic_adapter import AnthropicAdapter
+from modules.llm.anthropic_http_adapter import AnthropicHTTPAdapter
+from modules.llm.http_client import LLMHTTPError, llm_http_client, local_llm_http_client
+from modules.llm.openai_adapter import OpenAIAdapter
+from modules.llm.openai_compatible_adapter import OpenAICompatibleAdapter
+from modules.llm.openai_http_adapter import OpenAIHTTPAdapter
+
+MESSAGES = [LLMMessage(role="system", content="简短回答"), LLMMessage(role="user", content="你好")]
+CONFIG = LLMConfig(api_key="sk-test", model="test-model", temperature=0)
+# 自建推理服务（vLLM / SGLang 等）不需要 API Key
+LOCAL_CONFIG = LLMConfig(api_key="", model="qwen3-32b", base_url="http://10.0.0.5:8000/v1")
+# 录制的 Messages 流带 thinking 块，与录制时的请求参数保持一致
+THINKING_CONFIG = LLMConfig(api_key="sk-test", model="test-model", thinking_enabled=True)
+DONE = b"data: [DONE]\n\n"
+# None 为整块发送；5 字节会切断行与多字节字符
+CHUNK_SIZES = [None, 5]
+
+TEXT = "有什么可以帮你的？\n\n- 带 \"引号\" 与换行"
+
+
+def collect(adapter, config: LLMConfig = CONFIG) -> tuple[list[tuple], Exception | None]:
+    """消费整个流，返回 (块列表, 流中抛出的异常)"""
+
+    async def run():
+        chunks: list[tuple] = []
+        try:
+            async for chunk in adapter.stream(MESSAGES, config):
+                chunks.append(_as_tuple(chunk))
+        except Exception as e:
+            return chunks, e
+        return chunks, None
+
+    return asyncio.run(run())
+
+
+def _as_tuple(chunk: StreamChunk) -> tuple:
+    return chunk.type, chunk.content, chunk.usage
+
+
+@pytest.fixture
+def sdk_replay(monkeypatch):
+    """让 SDK 适配器内部创建的客户端使用回放 SSE 的传输层"""
+
+    def install(body: bytes, chunk_size: int | None = None) -> None:
+        for module, name, sdk_client in (
+            (anthropic_adapter, "AsyncAnthropic", AsyncAnthropic),
+            (openai_adapter, "AsyncOpenAI", AsyncOpenAI),
+        ):
+            monkeypatch.setattr(module, name, _replaying(sdk_client, body, chunk_size))
+
+    return install
+
+
+def _replaying(sdk_client, body: bytes, chunk_size: int | None):
+    """包装 SDK 客户端类：注入回放传输层，关闭重试"""
+    # SDK 自带的 httpx 包（可能是分叉包），MockTransport 与 AsyncClient 都须取自它
+    base = next(cls for cls in type(sdk_client(api_key="x")._client).__mro__ if cls.__name__ == "AsyncClient")
+    httpx_module = sys.modules[base.__module__.split(".")[0]]
+
+    def create(**kwargs):
+        transport = sse_transport(body, chunk_size, httpx_module=httpx_module)
+        return sdk_client(**kwargs, http_client=httpx_module.AsyncClient(transport=transport), max_retries=0)
+
+    return create
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """记录 HTTP 响应是否已关闭（连接归还连接池）"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.closed = False
+
+    async def __aiter__(self):
+        for line in self.body.splitlines(keepends=True):
+            yield line
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+def _tracked_client(monkeypatch, body: bytes) -> _TrackedStream:
+    stream = _TrackedStream(body)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, stream=stream)))
+    monkeypatch.setattr(llm_http_client, "_client", client)
+    monkeypatch.setattr(local_llm_http_client, "_client", client)
+    return stream
+
+
+# 消费方提前停止（对冲落败、期限到达、客户端断开）或流中出错时，HTTP 响应须立即关闭，
+# 不能等异步生成器的终结器（期间连接一直被占用）
+RELEASE_CASES = [
+    pytest.param(AnthropicHTTPAdapter(), "anthropic_messages.sse", "anthropic_error.sse", THINKING_CONFIG, id="anthropic"),
+    pytest.param(OpenAIHTTPAdapter(), "openai_responses.sse", "openai_responses_failed.sse", CONFIG, id="openai"),
+    pytest.param(
+        OpenAICompatibleAdapter(), "chat_completions.sse", "chat_completions_error.sse", LOCAL_CONFIG,
+        id="openai_compatible",
+    ),
+]
+
+
+@pytest.mark.parametrize("adapter,fixture,error_fixture,config", RELEASE_CASES)
+def test_stream_releases_response_when_consumer_stops(monkeypatch, adapter, fixture, error_fixture, config):
+    stream = _tracked_client(monkeypatch, load_sse(fixture))
+
+    async def run() -> bool:
+        chunks = adapter.stream(MESSAGES, config)
+        await anext(chunks)
+        await chunks.aclose()
+        return stream.closed
+
+    assert asyncio.run(run())
+
+
+@pytest.mark.parametrize("adapter,fixture,error_fixture,config", RELEASE_CASES)
+def test_stream_releases_response_on_error_event(monkeypatch, adapter, fixture, error_fixture, config):
+    stream = _tracked_client(monkeypatch, load_sse(error_fixture))
+
+    async def run() -> bool:
+        with pytest.raises(LLMHTTPError):
+            async for _ in adapter.stream(MESSAGES, config):
+                pass
+        return stream.closed
+
+    assert asyncio.run(run())
+
+
+# ── Anthropic Messages ──
+
+ANTHROPIC_CHUNKS = [
+    (ChunkType.THINKING, "用户在问候，", None),
+    (ChunkType.THINKING, "简短回应即可。", None),
+    (ChunkType.TEXT, "你好！", None),
+    (ChunkType.TEXT, TEXT, None),
+    (ChunkType.USAGE, "", {"input_tokens": 472, "output_tokens": 37}),
+]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_anthropic_http_parses_recorded_stream(replay_client, chunk_size):
+    requests = replay_client(load_sse("anthropic_messages.sse"), chunk_size)
+
+    chunks, error = collect(AnthropicHTTPAdapter(), THINKING_CONFIG)
+
+    assert error is None
+    assert chunks == ANTHROPIC_CHUNKS
+    [request] = requests
+    assert str(request.url) == "https://api.anthropic.com/v1/messages"
+    assert request.headers["x-api-key"] == "sk-test"
+    body = json.loads(request.content)
+    assert body["stream"] is True
+    assert body["thinking"]["type"] == "enabled"
+    assert "temperature" not in body
+    assert body["system"] == "简短回答"
+    assert body["messages"] == [{"role": "user", "content": "你好"}]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_anthropic_http_matches_sdk(replay_client, sdk_replay, chunk_size):
+    body = load_sse("anthropic_messages.sse")
+    replay_client(body, chunk_size)
+    sdk_replay(body, chunk_size)
+
+    assert collect(AnthropicHTTPAdapter(), THINKING_CONFIG) == collect(AnthropicAdapter(), THINKING_CONFIG)
+
+
+def test_anthropic_http_error_event(replay_client, sdk_replay):
+    body = load_sse("anthropic_error.sse")
+    replay_client(body)
+    sdk_replay(body)
+
+    chunks, error = collect(AnthropicHTTPAdapter(), THINKING_CONFIG)
+    sdk_chunks, sdk_error = collect(AnthropicAdapter(), THINKING_CONFIG)
+
+    assert chunks == sdk_chunks == [(ChunkType.TEXT, "部分", None)]
+    assert isinstance(error, LLMHTTPError)
+    assert "Overloaded" in str(error)
+    assert sdk_error is not None
+
+
+def test_anthropic_http_ignores_trailing_done(replay_client):
+    # 部分代理会在 Messages 流末尾追加 OpenAI 风格的 [DONE]
+    replay_client(load_sse("anthropic_messages.sse") + DONE)
+
+    assert collect(AnthropicHTTPAdapter(), THINKING_CONFIG) == (ANTHROPIC_CHUNKS, None)
+
+
+def test_anthropic_http_error_status(replay_client):
+    replay_client(
+        b'{"type":"error","error":{"type":"rate_limit_error","message":"Number of request tokens has exceeded"}}',
+        status_code=429,
+    )
+
+    chunks, error = collect(AnthropicHTTPAdapter())
+
+    assert chunks == []
+    assert isinstance(error, LLMHTTPError)
+    assert error.status_code == 429
+    assert "Number of request tokens has exceeded" in str(error)
+
+
+# ── OpenAI Responses ──
+
+OPENAI_CHUNKS = [
+    (ChunkType.THINKING, "**Greeting**\n\n用户在问候", None),
+    (ChunkType.TEXT, "你好！", None),
+    (ChunkType.TEXT, TEXT, None),
+    (ChunkType.USAGE, "", {"input_tokens": 36, "output_tokens": 87, "total_tokens": 123}),
+]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_openai_http_parses_recorded_stream(replay_client, chunk_size):
+    requests = replay_client(load_sse("openai_responses.sse"), chunk_size)
+
+    chunks, error = collect(OpenAIHTTPAdapter())
+
+    assert error is None
+    assert chunks == OPENAI_CHUNKS
+    [request] = requests
+    assert str(request.url) == "https://api.openai.com/v1/responses"
+    assert request.headers["authorization"] == "Bearer sk-test"
+    body = json.loads(request.content)
+    assert body["stream"] is True
+    assert body["temperature"] == 0
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_openai_http_matches_sdk(replay_client, sdk_replay, chunk_size):
+    body = load_sse("openai_responses.sse")
+    replay_client(body, chunk_size)
+    sdk_replay(body, chunk_size)
+
+    assert collect(OpenAIHTTPAdapter()) == collect(OpenAIAdapter())
+
+
+def test_openai_http_failed_event(replay_client):
+    replay_client(load_sse("openai_responses_failed.sse"))
+
+    chunks, error = collect(OpenAIHTTPAdapter())
+
+    assert chunks == [(ChunkType.TEXT, "部分", None)]
+    assert isinstance(error, LLMHTTPError)
+    assert "The model failed to generate a response." in str(error)
+
+
+def test_openai_http_error_event(replay_client):
+    replay_client(b'event: error\ndata: {"type":"error","code":"server_error","message":"upstream reset"}\n\n')
+
+    chunks, error = collect(OpenAIHTTPAdapter())
+
+    assert chunks == []
+    assert isinstance(error, LLMHTTPError)
+    assert "upstream reset" in str(error)
+
+
+def test_openai_http_ignores_trailing_done(replay_client):
+    replay_client(load_sse("openai_responses.sse") + DONE)
+
+    assert collect(OpenAIHTTPAdapter()) == (OPENAI_CHUNKS, None)
+
+
+def test_openai_http_uses_base_url(replay_client):
+    requests = replay_client(load_sse("openai_responses.sse"))
+
+    collect(OpenAIHTTPAdapter(), LLMConfig(api_key="sk-test", model="test-model", base_url="https://proxy.example/v1/"))
+
+    assert str(requests[0].url) == "https://proxy.example/v1/responses"
+
+
+# ── OpenAI 兼容（Chat Completions，data-only + [DONE]） ──
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_openai_compatible_stops_at_done(replay_client, chunk_size):
+    requests = replay_client(load_sse("chat_completions.sse"), chunk_size)
+    chunks, error = collect(OpenAICompatibleAdapter(), LOCAL_CONFIG)
+
+    assert error is None
+    assert chunks == [
+        (ChunkType.THINKING, "用户在问候，", None),
+        (ChunkType.THINKING, "简短回应即可。", None),
+        (ChunkType.TEXT, "你好！", None),
+        (ChunkType.TEXT, TEXT, None),
+        (ChunkType.USAGE, "", {"input_tokens": 36, "output_tokens": 87, "total_tokens": 123}),
+    ]
+    [request] = requests
+    assert str(request.url) == "http://10.0.0.5:8000/v1/chat/completions"
+    assert "authorization" not in request.headers
+    assert json.loads(request.content)["stream_options"] == {"include_usage": True}
+
+
+def test_openai_compatible_releases_response_at_done(monkeypatch):
+    # [DONE] 之后服务端可能不立即断开，break 时须马上关闭响应
+    stream = _tracked_client(monkeypatch, load_sse("chat_completions.sse"))
+
+    async def run() -> bool:
+        async for _ in OpenAICompatibleAdapter().stream(MESSAGES, LOCAL_CONFIG):
+            pass
+        return stream.closed
+
+    assert asyncio.run(run())
+
+
+def test_openai_compatible_error_chunk(replay_client):
+    replay_client(b'data: {"error":{"message":"model not found","code":404}}\n\n')
+    chunks, error = collect(OpenAICompatibleAdapter(), LOCAL_CONFIG)
+
+    assert chunks == []
+    assert isinstance(error, LLMHTTPError)
+    assert "model not found" in str(error)
+
+
+def test_openai_compatible_requires_base_url():
+    chunks, error = collect(OpenAICompatibleAdapter(), LLMConfig(api_key="", model="qwen3-32b"))
+
+    assert chunks == []
+    assert isinstance(error, ValueError)
+
+
+def test_openai_compatible_chat(replay_client):
+    replay_client(json.dumps({
+        "model": "qwen3-32b",
+        "choices": [{"message": {"content": "你好！", "reasoning_content": "问候"}}],
+        "usage": {"prompt_tokens": 36, "completion_tokens": 4, "total_tokens": 40},
+    }).encode())
+    config = LLMConfig(api_key="sk-local", model="qwen3-32b", base_url="http://10.0.0.5:8000/v1")
+
+    response = asyncio.run(OpenAICompatibleAdapter().chat(MESSAGES, config))
+
+    assert response.content == "你好！"
+    assert response.thinking == "问候"
+    assert response.usage == {"input_tokens": 36, "output_tokens": 4, "total_tokens": 40}
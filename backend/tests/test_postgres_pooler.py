@@ -0,0 +1,113 @@
+"""PgBouncer transaction pooling 集成测试
+
+需要 docker-compose 的 pgbouncer profile：
+
+    docker compose -f docker/docker-compose.yml --profile pgbouncer up -d
+
+连接参数可用 PGBOUNCER_HOST / PGBOUNCER_PORT 及 POSTGRES_USER / POSTGRES_PASSWORD / POSTGRES_DB 覆盖，
+PgBouncer 不可达时跳过。
+"""
+
+import asyncio
+import os
+import socket
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+
+from config.environment import PostgresConfiguration
+from config.postgres import PostgresManager
+
+HOST = os.getenv("PGBOUNCER_HOST", "localhost")
+PORT = int(os.getenv("PGBOUNCER_PORT", "6432"))
+# 并发会话数大于 PgBouncer 给单个客户端分配的后端连接时，语句必然跨后端执行
+SESSIONS = 8
+ROUNDS = 50
+
+
+def _reachable() -> bool:
+    try:
+        with socket.create_connection((HOST, PORT), timeout=1):
+            return True
+    except OSError:
+        return False
+
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not _reachable(), reason=f"PgBouncer {HOST}:{PORT} 不可达"),
+]
+
+
+def _config() -> PostgresConfiguration:
+    return PostgresConfiguration(
+        host=HOST,
+        port=PORT,
+        user=os.getenv("POSTGRES_USER", "alpha_kanban"),
+        password=os.getenv("POSTGRES_PASSWORD", "alpha_kanban_dev"),
+        database=os.getenv("POSTGRES_DB", "alpha_kanban"),
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=False,
+        pooler_mode=True,
+    )
+
+
+async def _with_manager(run) -> None:
+    manager = PostgresManager()
+    manager.setup(_config())
+    await manager.start()
+    try:
+        await run(manager)
+    finally:
+        await manager.close()
+
+
+def test_pooler_mode_uses_null_pool():
+    async def run(manager: PostgresManager):
+        async with manager.session_factory() as session:
+            assert isinstance(session.bind.pool, NullPool)
+
+    asyncio.run(_with_manager(run))
+
+
+def test_repeated_parameterized_queries():
+    # 同一条参数化语句反复执行，asyncpg 每次都会 prepare；
+    # 若语句被缓存或使用固定名称，会在其他后端连接上报 prepared statement 不存在 / 已存在
+    statement = text("SELECT CAST(:value AS integer) + 1 AS next, CAST(:label AS text) AS label")
+
+    async def worker(manager: PostgresManager, worker_id: int) -> None:
+        async with manager.session_factory() as session:
+            for i in range(ROUNDS):
+                row = (await session.execute(statement, {"value": i, "label": f"w{worker_id}"})).one()
+                assert row.next == i + 1
+                assert row.label == f"w{worker_id}"
+                # 每轮结束事务，让 PgBouncer 把后端连接交还池中，下一轮可能换到别的后端
+                await session.commit()
+
+    async def run(manager: PostgresManager):
+        await asyncio.gather(*(worker(manager, n) for n in range(SESSIONS)))
+
+    asyncio.run(_with_manager(run))
+
+
+def test_parameterized_queries_within_transaction():
+    # 一个事务内固定在同一后端连接上，多条参数化语句须全部成功并看到同一事务的数据
+    async def run(manager: PostgresManager):
+        async with manager.session_factory() as session, session.begin():
+            await session.execute(text("CREATE TEMP TABLE pooler_probe (id integer, name text) ON COMMIT DROP"))
+            for i in range(ROUNDS):
+                await session.execute(
+                    text("INSERT INTO pooler_probe (id, name) VALUES (:id, :name)"),
+                    {"id": i, "name": f"row-{i}"},
+                )
+            total = await session.scalar(text("SELECT count(*) FROM pooler_probe WHERE id < :limit"), {"limit": ROUNDS})
+            name = await session.scalar(text("SELECT name FROM pooler_probe WHERE id = :id"), {"id": 7})
+
+        assert total == ROUNDS
+        assert name == "row-7"
+
+    asyncio.run(_with_manager(run))
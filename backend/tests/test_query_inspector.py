@@ -0,0 +1,87 @@
+"""慢查询 EXPLAIN 不能破坏请求自己的事务"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from config.query_inspector import QueryInspector
+
+
+class FakePgCursor:
+    """模拟 PostgreSQL 的事务语义：语句失败后事务进入 aborted 状态，直到回滚（到保存点）"""
+
+    def __init__(self, connection: "FakePgConnection"):
+        self._connection = connection
+        self._rows: list[tuple] = []
+
+    def execute(self, statement: str, parameters=None) -> None:
+        conn = self._connection
+        conn.executed.append(statement)
+        if statement.startswith("ROLLBACK TO SAVEPOINT"):
+            conn.aborted = False
+            return
+        if conn.aborted:
+            raise RuntimeError("current transaction is aborted, commands ignored until end of transaction block")
+        if statement.startswith("EXPLAIN") and conn.explain_error:
+            conn.aborted = True
+            raise RuntimeError(conn.explain_error)
+        self._rows = [("Seq Scan on messages",)] if statement.startswith("EXPLAIN") else []
+
+    def fetchall(self) -> list[tuple]:
+        return self._rows
+
+    def close(self) -> None:
+        pass
+
+
+class FakePgConnection:
+    def __init__(self, explain_error: str | None = None):
+        self.explain_error = explain_error
+        self.aborted = False
+        self.executed: list[str] = []
+
+    def cursor(self) -> FakePgCursor:
+        return FakePgCursor(self)
+
+
+@pytest.fixture
+def inspector() -> QueryInspector:
+    inspector = QueryInspector()
+    inspector.setup({
+        "enabled": True,
+        "slow_query_ms": 0,
+        "explain_slow": True,
+        "explain_analyze": True,
+        "debug_mode": "OFF",
+        "query_budget": 50,
+        "repeat_threshold": 5,
+    })
+    return inspector
+
+
+def test_failed_explain_keeps_transaction_usable(inspector):
+    dbapi = FakePgConnection(explain_error="could not determine data type of parameter $1")
+
+    inspector._explain(SimpleNamespace(connection=dbapi), "SELECT * FROM messages WHERE id = $1", ("x",))
+
+    assert not dbapi.aborted
+    assert dbapi.executed[0].startswith("SAVEPOINT")
+    assert dbapi.executed[-2:] == [
+        "ROLLBACK TO SAVEPOINT query_inspector_explain",
+        "RELEASE SAVEPOINT query_inspector_explain",
+    ]
+    # 请求后续的语句照常执行
+    dbapi.cursor().execute("SELECT 1")
+
+
+def test_explain_analyze_is_rolled_back(inspector):
+    dbapi = FakePgConnection()
+
+    inspector._explain(SimpleNamespace(connection=dbapi), "SELECT * FROM messages", ())
+
+    assert dbapi.executed == [
+        "SAVEPOINT query_inspector_explain",
+        "EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM messages",
+        "ROLLBACK TO SAVEPOINT query_inspector_explain",
+        "RELEASE SAVEPOINT query_inspector_explain",
+    ]
@@ -0,0 +1,120 @@
+"""聊天事件序列化：字节拼接的输出须与 json.dumps 构造的事件等价，orjson 与标准库实现逐字节一致"""
+
+import json
+
+import pytest
+
+from modules.chat import sse
+
+# 需要转义的各类内容：引号、反斜杠、换行与控制字符、中文、emoji、行分隔符、孤立代理项
+CONTENTS = [
+    "",
+    "plain ascii",
+    'say "hi"',
+    "back\\slash",
+    "line1\nline2\r\n\ttab",
+    "\b\f\x00\x1b\x1f\x7f",
+    "你好！有什么可以帮你的？",
+    "emoji 😀 与 👍🏽",
+    "  ",
+    "</script>",
+    "\ud800 孤立代理项",
+]
+
+needs_orjson = pytest.mark.skipif(sse.orjson is None, reason="未安装 orjson")
+
+
+@needs_orjson
+@pytest.mark.parametrize("value", CONTENTS)
+def test_orjson_and_stdlib_escape_identically(value):
+    assert sse._json_str_orjson(value) == sse._json_str_stdlib(value)
+
+
+@pytest.mark.parametrize("encode", [
+    pytest.param(sse._json_str_orjson, marks=needs_orjson, id="orjson"),
+    pytest.param(sse._json_str_stdlib, id="stdlib"),
+])
+@pytest.mark.parametrize("value", CONTENTS)
+def test_json_str_round_trips(encode, value):
+    encoded = encode(value)
+    assert json.loads(encoded) == value
+    # SSE 的 data 行不能含真实换行
+    assert b"\n" not in encoded and b"\r" not in encoded
+
+
+@pytest.mark.parametrize("content", CONTENTS)
+def test_events_match_dict_serialization(content):
+    cases = [
+        (sse.chunk_event(content), {"type": "chunk", "content": content}),
+        (sse.thinking_event(content), {"type": "thinking", "content": content}),
+        (sse.title_event(content), {"type": "title", "title": content}),
+        (sse.error_event(content), {"type": "error", "detail": content, "code": "generation_failed"}),
+        (sse.error_event(content, "upstream_timeout"), {"type": "error", "detail": content, "code": "upstream_timeout"}),
+        (sse.done_event("m-1", content, content), {
+            "type": "done", "message_id": "m-1", "full_content": content, "thinking": content,
+        }),
+    ]
+    for payload, expected in cases:
+        assert json.loads(payload) == expected
+
+
+def test_id_events():
+    assert json.loads(sse.conversation_created_event("c-1")) == {"type": "conversation_created", "conversation_id": "c-1"}
+    assert json.loads(sse.message_created_event("m-1", "c-1")) == {
+        "type": "message_created", "message_id": "m-1", "conversation_id": "c-1",
+    }
+    assert json.loads(sse.queued_event(3)) == {"type": "queued", "position": 3}
+    assert json.loads(sse.done_event("m-1", "全文", None))["thinking"] is None
+
+
+def _old_frame(data: dict, event_id: int) -> bytes:
+    """改造前的实现：json.dumps + f-string"""
+    return f"id: {event_id}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+def _parse_frame(raw: bytes) -> tuple[bytes, dict]:
+    assert raw.endswith(b"\n\n")
+    id_line, data_line = raw[:-2].split(b"\n")
+    return id_line, json.loads(data_line.removeprefix(b"data: "))
+
+
+def test_frame():
+    payload = sse.chunk_event('带 "引号"\n换行')
+
+    assert sse.frame(payload) == b"data: " + payload + b"\n\n"
+    assert sse.frame(payload, 42) == b"id: 42\ndata: " + payload + b"\n\n"
+    assert _parse_frame(sse.frame(payload, 42)) == _parse_frame(
+        _old_frame({"type": "chunk", "content": '带 "引号"\n换行'}, 42),
+    )
+    assert sse.KEEPALIVE_FRAME.startswith(b":") and sse.KEEPALIVE_FRAME.endswith(b"\n\n")
+
+
+@pytest.mark.parametrize("first,second", [("你好", "！\n"), ('"a', 'b"'), ("", "x"), ("😀", "\\")])
+def test_merge_deltas(first, second):
+    merged = sse.merge_deltas(sse.chunk_event(first), sse.chunk_event(second))
+    assert merged == sse.chunk_event(first + second)
+
+    merged = sse.merge_deltas(sse.thinking_event(first), sse.thinking_event(second))
+    assert merged == sse.thinking_event(first + second)
+
+
+def test_merge_deltas_rejects_other_events():
+    assert sse.merge_deltas(sse.chunk_event("a"), sse.thinking_event("b")) is None
+    assert sse.merge_deltas(sse.thinking_event("a"), sse.chunk_event("b")) is None
+    assert sse.merge_deltas(sse.chunk_event("a"), sse.done_event("m", "a", None)) is None
+    assert sse.merge_deltas(sse.title_event("a"), sse.title_event("b")) is None
+    # 带 model 的对比事件不是以增量前缀开头，不参与合并
+    assert sse.merge_deltas(sse.with_model(sse.chunk_event("a"), "m"), sse.with_model(sse.chunk_event("b"), "m")) is None
+
+
+@pytest.mark.parametrize("model", ["gpt-4o", 'odd "name"\n', "模型"])
+def test_with_model(model):
+    for payload in (
+        sse.chunk_event('内容 "x"'),
+        sse.done_event("m-1", "全文", None),
+        sse.error_event("失败", "discarded"),
+        sse.queued_event(0),
+    ):
+        tagged = json.loads(sse.with_model(payload, model))
+        assert tagged.pop("model") == model
+        assert tagged == json.loads(payload)
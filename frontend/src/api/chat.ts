@@ -16,9 +16,12 @@ export interface Message {
   role: 'system' | 'user' | 'assistant'
   content: string
   model: string | null
-  status: 'generating' | 'completed' | 'aborted'
+  // discarded：多模型对比中未被选中的回复
+  status: 'generating' | 'completed' | 'aborted' | 'discarded'
   thinking: string | null
   order: number
+  // 多模型对比的回复共用同一个 order，按 variant 区分（普通消息为 0）
+  variant: number
   created_at: string
 }
 
@@ -32,11 +35,24 @@ export type AvailableModelsByManufacturer = Record<string, AvailableModel[]>
 
 export type ChatSSEEvent =
   | { type: 'conversation_created'; conversation_id: string }
+  | { type: 'message_created'; message_id: string; conversation_id: string }
   | { type: 'thinking'; content: string }
   | { type: 'chunk'; content: string }
   | { type: 'done'; message_id: string; full_content: string; thinking: string | null }
   | { type: 'title'; title: string }
-  | { type: 'error'; detail: string }
+  // 等待上游调用名额时的排队位置（从 1 开始），0 表示排队结束
+  | { type: 'queued'; position: number }
+  // code: upstream_timeout（上游模型超时）/ provider_busy（供应商繁忙）/ overloaded（服务过载）/
+  // discarded（对比中已选择其他回复）/ generation_failed（其他错误）
+  | { type: 'error'; detail: string; code: string }
+
+// 多模型对比的事件流：各模型的事件带 model 字段，conversation_created 不带
+export type ComparisonSSEEvent = ChatSSEEvent & { model?: string }
+
+export interface SelectVariantResponse {
+  message_id: string
+  discarded: string[]
+}
 
 interface PaginatedResponse<T> {
   items: T[]
@@ -62,6 +78,10 @@ export function deleteConversation(conversationId: string) {
   return authClient.delete(`/general-chat/conversations/${conversationId}`)
 }
 
+export function selectVariant(messageId: string) {
+  return authClient.post<SelectVariantResponse>(`/chat/messages/${messageId}/select`)
+}
+
 // ── Model API ──
 
 export function getAvailableModels() {
@@ -88,3 +108,22 @@ export function buildContinueChatRequest(
     body: { model, content, thinking_enabled: thinkingEnabled },
   }
 }
+
+export function buildNewComparisonRequest(models: string[], content: string, thinkingEnabled = false) {
+  return {
+    url: '/api/chat/comparisons',
+    body: { models, content, thinking_enabled: thinkingEnabled },
+  }
+}
+
+export function buildContinueComparisonRequest(
+  conversationId: string,
+  models: string[],
+  content: string,
+  thinkingEnabled = false,
+) {
+  return {
+    url: `/api/chat/conversations/${conversationId}/comparisons`,
+    body: { models, content, thinking_enabled: thinkingEnabled },
+  }
+}
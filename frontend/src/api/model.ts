@@ -15,6 +15,17 @@ export interface Model {
   display_name: string
   manufacturer: string
   is_enabled: boolean
+  // 关联多个供应商时开启请求对冲
+  hedging_enabled: boolean
+  // 缓存确定性调用（temperature 为 0 且未开启 thinking）的响应
+  cache_enabled: boolean
+  // 采样温度（0 ~ 2）
+  temperature: number
+  // 调用期限（秒），为空时使用服务端默认值
+  connect_timeout: number | null
+  first_token_timeout: number | null
+  idle_timeout: number | null
+  total_timeout: number | null
   providers: ProviderLink[]
   created_at: string
   updated_at: string
@@ -25,7 +36,14 @@ export interface ModelCreateData {
   display_name: string
   manufacturer: string
   is_enabled?: boolean
+  hedging_enabled?: boolean
+  cache_enabled?: boolean
+  temperature?: number
   provider_ids: string[]
+  connect_timeout?: number | null
+  first_token_timeout?: number | null
+  idle_timeout?: number | null
+  total_timeout?: number | null
 }
 
 export interface ModelUpdateData {
@@ -33,7 +51,14 @@ export interface ModelUpdateData {
   display_name?: string
   manufacturer?: string
   is_enabled?: boolean
+  hedging_enabled?: boolean
+  cache_enabled?: boolean
+  temperature?: number
   provider_ids?: string[]
+  connect_timeout?: number | null
+  first_token_timeout?: number | null
+  idle_timeout?: number | null
+  total_timeout?: number | null
 }
 
 // ── Model API ──
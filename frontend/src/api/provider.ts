@@ -17,6 +17,10 @@ export interface Provider {
   name: string
   base_url_map: Record<string, string>
   is_enabled: boolean
+  // 每分钟请求数 / token 数与并发上限，为空表示不限制
+  rpm_limit: number | null
+  tpm_limit: number | null
+  max_concurrency: number | null
   created_at: string
   updated_at: string
 }
@@ -26,6 +30,9 @@ export interface ProviderCreateData {
   api_key: string
   base_url_map?: Record<string, string>
   is_enabled?: boolean
+  rpm_limit?: number | null
+  tpm_limit?: number | null
+  max_concurrency?: number | null
 }
 
 export interface ProviderUpdateData {
@@ -33,6 +40,9 @@ export interface ProviderUpdateData {
   api_key?: string
   base_url_map?: Record<string, string>
   is_enabled?: boolean
+  rpm_limit?: number | null
+  tpm_limit?: number | null
+  max_concurrency?: number | null
 }
 
 // ── Provider API ──
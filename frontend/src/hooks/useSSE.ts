@@ -17,11 +17,14 @@ export function useSSE<T>() {
 
     try {
       const token = localStorage.getItem('access_token')
+      // 每次发送一个新的幂等键，代理 / 网络层重试同一请求时服务端只生成一次
+      const idempotencyKey = crypto.randomUUID()
 
       await fetchEventSource(url, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey,
           ...(token ? { Authorization: `Bearer ${token}` } : {}),
         },
         body: JSON.stringify(body),
@@ -4,4 +4,5 @@ export default {
   selectModel: 'Select model',
   noConversations: 'No conversations',
   untitled: 'Untitled',
+  useVariant: 'Use this reply',
 }
@@ -4,4 +4,5 @@ export default {
   selectModel: '选择模型',
   noConversations: '暂无会话',
   untitled: '未命名会话',
+  useVariant: '选用此回复',
 }
@@ -1,11 +1,13 @@
 export enum Manufacturer {
   OPENAI = 'openai',
   ANTHROPIC = 'anthropic',
+  OPENAI_COMPATIBLE = 'openai_compatible',
 }
 
 export const ManufacturerLabel: Record<Manufacturer, string> = {
   [Manufacturer.OPENAI]: 'OpenAI',
   [Manufacturer.ANTHROPIC]: 'Anthropic',
+  [Manufacturer.OPENAI_COMPATIBLE]: 'OpenAI Compatible',
 }
 
 export const MANUFACTURERS = Object.values(Manufacturer)
@@ -31,6 +31,7 @@ export default defineComponent({
       selectConversation,
       startNewChat: startNewChatRaw,
       sendMessage,
+      selectVariant,
       changeModel,
       loadMoreConversations,
     } = useChat({
@@ -92,6 +93,7 @@ export default defineComponent({
                   streamingThinking={streamingThinking.value}
                   isStreaming={isStreaming.value}
                   inputHeight={chatInputHeight.value}
+                  onSelectVariant={selectVariant}
                 />
                 <div class={styles.chatInputWrapper}>
                   <ChatInput
@@ -4,6 +4,7 @@ import {
   listConversations,
   getConversationMessages,
   deleteConversation as apiDeleteConversation,
+  selectVariant as apiSelectVariant,
   getAvailableModels,
   buildNewChatRequest,
   buildContinueChatRequest,
@@ -25,6 +26,8 @@ export function useChat(options?: UseChatOptions) {
   const messages = ref<Message[]>([])
   const streamingContent = ref('')
   const streamingThinking = ref('')
+  // 排队位置，0 表示未在排队
+  const queuePosition = ref(0)
   const messageLoadError = ref<string | null>(null)
   const availableModels = ref<AvailableModelsByManufacturer>({})
   const currentModel = ref<string | null>(null)
@@ -40,6 +43,8 @@ export function useChat(options?: UseChatOptions) {
 
   // 流式过程中暂存用户首条消息内容（用于临时标题）
   let pendingUserContent: string = ''
+  // 本次生成的助手消息 ID（message_created 事件给出），出错时据此保留已生成的部分
+  let streamingMessageId: string | null = null
 
   // ── 计算属性 ──
   const currentMessages = computed(() => messages.value)
@@ -130,12 +135,14 @@ export function useChat(options?: UseChatOptions) {
       status: 'completed',
       thinking: null,
       order: messages.value.length + 1,
+      variant: 0,
       created_at: new Date().toISOString(),
     }
     messages.value = [...messages.value, tempUserMsg]
     streamingContent.value = ''
     streamingThinking.value = ''
     pendingUserContent = content
+    streamingMessageId = null
 
     // 构建请求
     const isNew = activeConversationId.value === null
@@ -168,6 +175,14 @@ export function useChat(options?: UseChatOptions) {
         break
       }
 
+      case 'message_created':
+        streamingMessageId = event.message_id
+        break
+
+      case 'queued':
+        queuePosition.value = event.position
+        break
+
       case 'thinking':
         streamingThinking.value += event.content
         break
@@ -186,11 +201,13 @@ export function useChat(options?: UseChatOptions) {
           status: 'completed',
           thinking: event.thinking,
           order: messages.value.length + 1,
+          variant: 0,
           created_at: new Date().toISOString(),
         }
         messages.value = [...messages.value, assistantMsg]
         streamingContent.value = ''
         streamingThinking.value = ''
+        streamingMessageId = null
         break
       }
 
@@ -206,6 +223,23 @@ export function useChat(options?: UseChatOptions) {
 
       case 'error':
         console.error('服务端错误:', event.detail)
+        queuePosition.value = 0
+        // 服务端已把生成的部分保存为 aborted，本地同样保留，与重新加载后的历史一致
+        if (streamingMessageId && streamingContent.value) {
+          const partialMsg: Message = {
+            id: streamingMessageId,
+            role: 'assistant',
+            content: streamingContent.value,
+            model: currentModel.value,
+            status: 'aborted',
+            thinking: streamingThinking.value || null,
+            order: messages.value.length + 1,
+            variant: 0,
+            created_at: new Date().toISOString(),
+          }
+          messages.value = [...messages.value, partialMsg]
+        }
+        streamingMessageId = null
         streamingContent.value = ''
         streamingThinking.value = ''
         break
@@ -225,6 +259,21 @@ export function useChat(options?: UseChatOptions) {
     }
   }
 
+  // 多模型对比：选用其中一条回复，其余回复被舍弃，不再作为上下文
+  async function selectVariant(messageId: string) {
+    try {
+      const { data } = await apiSelectVariant(messageId)
+      const discarded = new Set(data.discarded)
+      messages.value = messages.value.map((m) =>
+        discarded.has(m.id) ? { ...m, status: 'discarded' as const } : m,
+      )
+    } catch (err) {
+      console.error('选择回复失败', err)
+      // 回复状态可能已在其他标签页变化，以服务端为准
+      if (activeConversationId.value) await loadMessages(activeConversationId.value)
+    }
+  }
+
   function changeModel(modelName: string) {
     currentModel.value = modelName
   }
@@ -240,6 +289,7 @@ export function useChat(options?: UseChatOptions) {
     currentModel,
     streamingContent,
     streamingThinking,
+    queuePosition,
     // 会话列表分页状态
     hasMoreConversations,
     conversationsLoading,
@@ -250,6 +300,7 @@ export function useChat(options?: UseChatOptions) {
     startNewChat,
     sendMessage,
     deleteConversation,
+    selectVariant,
     changeModel,
     abortSSE,
     loadMoreConversations,
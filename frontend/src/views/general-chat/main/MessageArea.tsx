@@ -1,4 +1,5 @@
-import { defineComponent, type PropType, ref, watch, nextTick, onMounted } from 'vue'
+import { defineComponent, type PropType, ref, computed, watch, nextTick, onMounted } from 'vue'
+import { useI18n } from 'vue-i18n'
 import ChatMessage from '@/components/ChatMessage'
 import type { Message } from '@/api/chat'
 import styles from './MessageArea.module.css'
@@ -12,7 +13,9 @@ export default defineComponent({
     isStreaming: { type: Boolean, default: false },
     inputHeight: { type: Number, default: 0 },
   },
-  setup(props) {
+  emits: ['selectVariant'],
+  setup(props, { emit }) {
+    const { t } = useI18n()
     const bottomAnchorRef = ref<HTMLElement>()
     const areaRef = ref<HTMLElement>()
     // 用户是否在底部附近（阈值 80px）
@@ -63,18 +66,59 @@ export default defineComponent({
     // 首次渲染滚动到底部
     onMounted(() => scrollToBottom(true))
 
+    // 多模型对比的回复共用同一个 order，合并为一行并列展示；已舍弃的回复不再显示
+    const rows = computed(() => {
+      const result: Message[][] = []
+      for (const msg of props.messages) {
+        if (msg.status === 'discarded') continue
+        const last = result[result.length - 1]?.[0]
+        if (msg.role === 'assistant' && last?.role === 'assistant' && last.order === msg.order) {
+          result[result.length - 1]!.push(msg)
+        } else {
+          result.push([msg])
+        }
+      }
+      return result
+    })
+
+    const renderMessage = (msg: Message) => (
+      <div key={msg.id} class={styles.messageRow}>
+        <ChatMessage
+          content={msg.content}
+          align={msg.role === 'user' ? 'right' : 'left'}
+          mode={msg.role === 'user' ? 'bubble' : 'flat'}
+        />
+      </div>
+    )
+
+    const renderVariants = (variants: Message[]) => (
+      <div key={variants[0]!.id} class={styles.variantGroup}>
+        {variants.map((msg) => (
+          <div key={msg.id} class={styles.variant}>
+            <div class={styles.variantHeader}>
+              <span class={styles.variantModel}>{msg.model}</span>
+              {msg.status === 'completed' && (
+                <button
+                  class={styles.selectButton}
+                  disabled={props.isStreaming}
+                  onClick={() => emit('selectVariant', msg.id)}
+                >
+                  {t('chat.useVariant')}
+                </button>
+              )}
+            </div>
+            <ChatMessage content={msg.content} align="left" mode="flat" />
+          </div>
+        ))}
+      </div>
+    )
+
     return () => (
       <div ref={areaRef} class={styles.area} onScroll={handleScroll}>
         <div class={styles.messageList}>
-          {props.messages.map((msg) => (
-            <div key={msg.id} class={styles.messageRow}>
-              <ChatMessage
-                content={msg.content}
-                align={msg.role === 'user' ? 'right' : 'left'}
-                mode={msg.role === 'user' ? 'bubble' : 'flat'}
-              />
-            </div>
-          ))}
+          {rows.value.map((row) =>
+            row.length > 1 ? renderVariants(row) : renderMessage(row[0]!),
+          )}
           {/* 流式中的助手消息（含等待光标） */}
           {props.isStreaming && (
             <div class={styles.messageRow}>